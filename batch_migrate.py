@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import time
+import traceback
+from collections import deque
+from contextlib import redirect_stderr, redirect_stdout
+
+from movify.MatchCache import MatchCache
+
+DEFAULT_STATE_DIR = ".movify_batch"
+DEFAULT_FETCH_CACHE = ".movify_fetch_cache.sqlite"
+REQUIRED_SETTINGS = ("SPOTIFY_CLIENT_ID", "SPOTIFY_CLIENT_SECRET", "SPOTIFY_REDIRECT_URI")
+# Scopes of every playlist write (with and without --sync), so one authorization serves all runs of a job
+PLAYLIST_SCOPE = "playlist-modify-private playlist-read-private"
+
+
+def load_manifest(path: str) -> list[dict]:
+    """Jobs of a JSON manifest, either a list of jobs or {"defaults": {...}, "jobs": [...]}.
+
+    A job has a unique "name", a "config" (path to a config.py-style file, or a dict of its settings), and
+    optionally "from_text" (sections file), "user" (Spotify user ID, replacing SPOTIFY_USER_ID) and "args" (extra
+    migrate_playlists.py arguments). Defaults apply to every job; their "args" come before the job's own. Relative
+    paths are relative to the manifest.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    defaults = manifest.get("defaults") or {}
+    base = os.path.dirname(os.path.abspath(path))
+
+    jobs, names = [], set()
+    for number, entry in enumerate(manifest.get("jobs") or [], start=1):
+        job = {**defaults, **entry, "args": list(defaults.get("args") or []) + list(entry.get("args") or [])}
+        name = str(job.get("name") or "")
+        if not re.fullmatch(r"[\w.-]+", name):
+            raise ValueError(f"Job {number}: 'name' must be letters, digits, '.', '-' or '_' (got {name!r})")
+        if name in names:
+            raise ValueError(f"Job {number}: duplicate name {name!r}")
+        names.add(name)
+        if job.get("config") is None:
+            raise ValueError(f"Job {name}: no 'config'")
+        for key in ("config", "from_text"):
+            if isinstance(job.get(key), str) and job[key] != "-":
+                job[key] = os.path.join(base, job[key])
+                if not os.path.exists(job[key]):
+                    raise ValueError(f"Job {name}: {key} {job[key]} not found")
+        jobs.append(job)
+    return jobs
+
+
+def load_job_config(job: dict):
+    """The config module of a job: its config file or settings dict, with the job's user and a default for
+    PLAYLIST_URLS."""
+    import types
+
+    source = job["config"]
+    if isinstance(source, dict):
+        config = types.ModuleType(f"movify_config_{job['name']}")
+        config.__dict__.update(source)
+    else:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(f"movify_config_{job['name']}", source)
+        config = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(config)
+    missing = [name for name in REQUIRED_SETTINGS if not getattr(config, name, None)]
+    if missing:
+        raise ValueError(f"Job {job['name']}: config is missing {', '.join(missing)}")
+    if job.get("user"):
+        config.SPOTIFY_USER_ID = job["user"]
+    if getattr(config, "PLAYLIST_URLS", None) is None:
+        config.PLAYLIST_URLS = []
+    return config
+
+
+def job_paths(job: dict, state_dir: str) -> dict[str, str]:
+    """Per-job files: everything a job writes except the shared caches."""
+    directory = os.path.join(state_dir, job["name"])
+    return {"directory": directory, "log": os.path.join(directory, "run.log"),
+            "journal": os.path.join(directory, "journal.jsonl"),
+            "playlist_ids": os.path.join(directory, "playlists.json"),
+            "metrics": os.path.join(directory, "metrics.json"),
+            "variation_stats": os.path.join(directory, "variation-stats.json"),
+            "token": os.path.join(directory, "spotify-token.json")}
+
+
+def job_argv(job: dict, paths: dict, args) -> list[str]:
+    """migrate_playlists.py arguments of a job: its own, then its state files and the shared caches unless it sets
+    them itself."""
+    argv = list(job["args"])
+    if job.get("from_text"):
+        argv += ["--from-text", job["from_text"]]
+
+    def add(option: str, *values: str):
+        if option not in argv:
+            argv.extend((option,) + values)
+
+    add("--journal", paths["journal"])
+    add("--playlist-ids", paths["playlist_ids"])
+    add("--metrics", paths["metrics"])
+    add("--variation-stats", paths["variation_stats"])
+    add("--token-cache", paths["token"])
+    if "--no-cache" not in argv:
+        add("--cache-path", args.cache_path)
+        add("--fetch-cache", args.fetch_cache_path)
+    if args.resume:
+        add("--resume")
+    return argv
+
+
+def run_job(job: dict, argv: list[str], paths: dict, sender):
+    """Child process: run one migration with its output in the job's log and send back its result."""
+    result = {"name": job["name"], "status": "ok", "error": None}
+    started = time.perf_counter()
+    with open(paths["log"], "w", encoding="utf-8", buffering=1) as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            import migrate_playlists
+            migrate_playlists.main(argv, config=load_job_config(job))
+        except SystemExit as e:  # Argument errors
+            if e.code not in (None, 0):
+                result.update(status="failed", error=f"exited with {e.code}")
+        except BaseException as e:
+            traceback.print_exc()
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.perf_counter() - started
+    sender.send(result)
+    sender.close()
+
+
+def run_jobs(jobs: list[dict], args) -> list[dict]:
+    """Run the jobs in at most args.jobs processes at once, each job in a fresh process: a failing or crashing job
+    (or its leftover state) cannot affect the others. Results are returned in manifest order."""
+    from multiprocessing import get_context
+    from multiprocessing.connection import wait
+
+    context = get_context("spawn")
+    pending = deque(jobs)
+    running = {}  # Process sentinel -> (job, process, receiving end of its result pipe)
+    results = {}
+    while pending or running:
+        while pending and len(running) < max(1, args.jobs):
+            job = pending.popleft()
+            paths = job_paths(job, args.state_dir)
+            os.makedirs(paths["directory"], exist_ok=True)
+            if os.path.exists(paths["metrics"]):
+                os.remove(paths["metrics"])  # Never report the numbers of an earlier run
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=run_job, args=(job, job_argv(job, paths, args), paths, sender),
+                                      name=f"movify-{job['name']}")
+            process.start()
+            sender.close()
+            running[process.sentinel] = (job, process, receiver)
+            print(f"▶️  {job['name']} started (log: {paths['log']})")
+
+        for sentinel in wait(list(running)):
+            job, process, receiver = running.pop(sentinel)
+            process.join()
+            try:
+                result = receiver.recv()
+            except EOFError:  # The process died before reporting
+                result = {"name": job["name"], "status": "crashed", "error": f"process exit code {process.exitcode}",
+                          "seconds": None}
+            receiver.close()
+            result.update(job_metrics(job_paths(job, args.state_dir)["metrics"]))
+            results[job["name"]] = result
+            icon = "✅" if result["status"] == "ok" else "❌"
+            print(f"{icon} {job['name']} {result['status']}" + (f": {result['error']}" if result["error"] else ""))
+    return [results[job["name"]] for job in jobs]
+
+
+def job_metrics(path: str) -> dict:
+    """Tracks and match cache hits of a finished job, from its metrics file."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            metrics = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    match_cache = metrics.get("caches", {}).get("match") or {}
+    return {"tracks": metrics.get("tracks"), "tracks_matched": metrics.get("tracks_matched"),
+            "match_cache_hits": match_cache.get("hits"), "search_requests": metrics.get("search_requests")}
+
+
+def authorize(jobs: list[dict], state_dir: str):
+    """Run the Spotify authorization of every job in this process, one after another, and cache each token in the
+    job's state directory. Job processes cannot answer the authorization prompt themselves."""
+    from spotipy import SpotifyOAuth
+
+    for job in jobs:
+        config = load_job_config(job)
+        paths = job_paths(job, state_dir)
+        os.makedirs(paths["directory"], exist_ok=True)
+        print(f"🔑 Authorizing {job['name']} ({getattr(config, 'SPOTIFY_USER_ID', None) or 'default user'})...")
+        auth = SpotifyOAuth(config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET, config.SPOTIFY_REDIRECT_URI,
+                            username=getattr(config, "SPOTIFY_USER_ID", None), scope=PLAYLIST_SCOPE,
+                            cache_path=paths["token"])
+        auth.get_access_token(as_dict=False)
+    print(f"✅ {len(jobs)} tokens cached under {state_dir}")
+
+
+def print_summary(results: list[dict], seconds: float):
+    print(f"\n📋 Batch summary ({len(results)} jobs, {seconds:.1f}s)")
+    print(f"   {'job':<20} {'status':<8} {'seconds':>8} {'matched':>15} {'cache hits':>11} {'searches':>9}")
+    def cell(value) -> str:
+        return "-" if value is None else str(value)
+
+    for result in results:
+        matched = f"{result['tracks_matched']}/{result['tracks']}" if result.get("tracks") is not None else "-"
+        duration = f"{result['seconds']:.1f}" if result.get("seconds") is not None else "-"
+        print(f"   {result['name']:<20} {result['status']:<8} {duration:>8} {matched:>15} "
+              f"{cell(result.get('match_cache_hits')):>11} {cell(result.get('search_requests')):>9}")
+    failed = [result["name"] for result in results if result["status"] != "ok"]
+    if failed:
+        print(f"❌ {len(failed)} jobs failed: {', '.join(failed)} (see their run.log; rerun with --resume)")
+    else:
+        print("🎉 All jobs finished.")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Run the migrations of several accounts from a manifest")
+    parser.add_argument("manifest", help="JSON manifest with the jobs (see README)")
+    parser.add_argument("--jobs", type=int, default=2, help="Number of migrations running at once (default: 2)")
+    parser.add_argument("--state-dir", dest="state_dir", default=DEFAULT_STATE_DIR,
+                        help=f"Directory for the logs, journals, metrics and tokens of the jobs "
+                             f"(default: {DEFAULT_STATE_DIR})")
+    parser.add_argument("--cache-path", dest="cache_path", default=MatchCache.default_path,
+                        help=f"Song match cache shared by all jobs (default: {MatchCache.default_path})")
+    parser.add_argument("--fetch-cache", dest="fetch_cache_path", default=DEFAULT_FETCH_CACHE,
+                        help=f"YouTube Music response cache shared by all jobs (default: {DEFAULT_FETCH_CACHE})")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue every job from its journal, e.g. after some jobs failed")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="Run only these jobs")
+    parser.add_argument("--authorize", action="store_true",
+                        help="Authorize the Spotify account of every job and cache its token, then exit")
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot load manifest: {e}")
+    if args.only:
+        unknown = set(args.only) - {job["name"] for job in jobs}
+        if unknown:
+            parser.error(f"unknown jobs: {', '.join(sorted(unknown))}")
+        jobs = [job for job in jobs if job["name"] in args.only]
+    if not jobs:
+        parser.error("the manifest has no jobs")
+
+    if args.authorize:
+        authorize(jobs, args.state_dir)
+        return
+
+    print(f"🚀 Running {len(jobs)} jobs, {max(1, args.jobs)} at a time, sharing {args.cache_path} and "
+          f"{args.fetch_cache_path}")
+    started = time.perf_counter()
+    results = run_jobs(jobs, args)
+    print_summary(results, time.perf_counter() - started)
+    if any(result["status"] != "ok" for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
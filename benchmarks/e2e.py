@@ -0,0 +1,232 @@
+"""End-to-end benchmark: runs migrate_playlists.main against a local fake Spotify and replayed YouTube Music data.
+
+    python -m benchmarks.e2e --tracks 1000
+    python -m benchmarks.e2e --tracks 10000 --latency 40 --throttle steady:50 -- --workers 16 --stream
+    python -m benchmarks.e2e --tracks 1000 --record .bench/search-1k.jsonl   # then --replay the same file
+
+Everything after `--` is passed to migrate_playlists.py. Fixtures are generated once per size (and seed) under
+.bench/. The migration runs in a fresh child process, so the reported peak RSS is that of the migration (including
+the replayed YouTube Music responses) and not of the harness. ytmusicapi is replaced in-process by a reader of the
+fixture responses because its wire protocol is not practical to fake; Spotify is a real HTTP server.
+"""
+from multiprocessing import get_context
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+
+from benchmarks import fixtures
+from benchmarks.fake_spotify import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FixtureYTMusic:
+    """Replays ytmusicapi responses from the fixture file, with optional latency per call."""
+
+    data = {}
+    latency_ms = 0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_playlist(self, playlist_id, limit=None, **kwargs):
+        self._delay()
+        return self.data["playlists"][playlist_id]
+
+    def get_watch_playlist(self, video_id=None, **kwargs):
+        self._delay()
+        raise KeyError(f"No fixture for video {video_id}")
+
+    def get_song(self, video_id, **kwargs):
+        self._delay()
+        raise KeyError(f"No fixture for video {video_id}")
+
+    def _delay(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+
+class BenchAuth:
+    """Stands in for SpotifyClientCredentials/SpotifyOAuth: the fake server accepts any token."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def get_access_token(self, as_dict=False, **kwargs):
+        return "bench-token"
+
+
+def run_migration(port: int, fixture_dir: str, workdir: str, migrate_args: list, yt_latency_ms: float, results):
+    """Child process: patch the service clients to the local fakes and run migrate_playlists.main()."""
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    prefix = f"http://127.0.0.1:{port}/v1/"
+
+    config = types.ModuleType("config")
+    config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET = "bench", "bench"
+    config.SPOTIFY_USER_ID, config.SPOTIFY_REDIRECT_URI = "bench_user", "http://127.0.0.1/callback"
+    config.PLAYLIST_URLS = []
+    sys.modules["config"] = config
+
+    with open(os.path.join(fixture_dir, "ytmusic.json"), "r", encoding="utf-8") as f:
+        FixtureYTMusic.data = json.load(f)
+    FixtureYTMusic.latency_ms = yt_latency_ms
+
+    import spotipy
+    import movify.RequestScheduler as request_scheduler
+    import movify.SpotifyTarget as spotify_target
+    import movify.YoutubeMusicSource as youtube_music_source
+
+    youtube_music_source.YTMusic = FixtureYTMusic
+    spotipy.SpotifyClientCredentials = BenchAuth
+    spotify_target.SpotifyOAuth = BenchAuth
+    original_init = request_scheduler.ScheduledSpotify.__init__
+
+    def scheduled_spotify_init(self, *args, **kwargs):
+        original_init(self, *args, **kwargs)
+        self.prefix = prefix
+
+    request_scheduler.ScheduledSpotify.__init__ = scheduled_spotify_init
+    try:
+        import movify.AsyncSpotifyTarget as async_spotify_target
+        async_spotify_target.SpotifyOAuth = BenchAuth
+        original_async_init = async_spotify_target.AsyncSpotifyTarget.__init__
+
+        def async_target_init(self, *args, **kwargs):
+            kwargs["prefix"] = prefix
+            original_async_init(self, *args, **kwargs)
+
+        async_spotify_target.AsyncSpotifyTarget.__init__ = async_target_init
+    except ImportError:
+        pass
+
+    import migrate_playlists
+    metrics_path = os.path.join(workdir, "bench-metrics.json")
+    if "--metrics" not in migrate_args:
+        migrate_args = migrate_args + ["--metrics", metrics_path]
+    else:
+        metrics_path = migrate_args[migrate_args.index("--metrics") + 1]
+    sys.argv = ["migrate_playlists.py", "--from-text", os.path.join(fixture_dir, "playlists.txt")] + migrate_args
+    started = time.perf_counter()
+    migrate_playlists.main()
+    seconds = time.perf_counter() - started
+    metrics = {}
+    if metrics_path.endswith(".json") and os.path.exists(metrics_path):
+        with open(metrics_path, "r", encoding="utf-8") as f:
+            metrics = json.load(f)
+    results.put({"seconds": seconds, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                 "fallback_searches": metrics.get("fallback_searches"), "candidates": metrics.get("candidates")})
+
+
+def precision(labels: dict, playlists: dict) -> dict:
+    """Compare the tracks written to each playlist with the labeled catalog IDs (as multisets)."""
+    written = correct = total = 0
+    for title, expected in labels.items():
+        remaining = {}
+        for track_id in expected:
+            remaining[track_id] = remaining.get(track_id, 0) + 1
+        total += len(expected)
+        for track_id in playlists.get(title, []):
+            written += 1
+            if remaining.get(track_id, 0) > 0:
+                remaining[track_id] -= 1
+                correct += 1
+    return {"written": written, "correct": correct, "labeled": total,
+            "precision": round(correct / written, 4) if written else None,
+            "recall": round(correct / total, 4) if total else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end migration benchmark against local fakes")
+    parser.add_argument("--tracks", type=int, default=1000, help="Number of YouTube tracks (e.g. 1000, 10000, 100000)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--duplicates", type=float, default=0,
+                        help="Share of playlist entries repeating an earlier upload (e.g. 0.3)")
+    parser.add_argument("--fixtures", help="Fixture directory (default: .bench/fixtures-<tracks>-<seed>)")
+    parser.add_argument("--latency", type=float, default=0, help="Mean injected Spotify latency in ms")
+    parser.add_argument("--yt-latency", dest="yt_latency", type=float, default=0,
+                        help="Injected YouTube Music latency per call in ms")
+    parser.add_argument("--throttle", help="429 profile: steady:<requests per second> or burst:<period seconds>")
+    parser.add_argument("--record", help="Record the Spotify search responses to this JSON-lines file")
+    parser.add_argument("--replay", help="Serve Spotify search responses only from this recorded file")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args, migrate_args = parser.parse_known_args()
+    migrate_args = [arg for arg in migrate_args if arg != "--"]
+
+    fixture_name = f"fixtures-{args.tracks}-{args.seed}" + (f"-dup{args.duplicates:g}" if args.duplicates else "")
+    fixture_dir = args.fixtures or os.path.join(ROOT, ".bench", fixture_name)
+    if not os.path.exists(os.path.join(fixture_dir, "playlists.txt")):
+        print(f"Generating fixtures for {args.tracks} tracks in {fixture_dir}...")
+        fixtures.generate(fixture_dir, args.tracks, seed=args.seed, duplicates=args.duplicates)
+    with open(os.path.join(fixture_dir, "labels.json"), "r", encoding="utf-8") as f:
+        labels = json.load(f)
+
+    context = get_context("spawn")
+    ready, stop, results = context.Queue(), context.Event(), context.Queue()
+    server = context.Process(target=serve, args=(fixtures.load_catalog(fixture_dir), ready, stop), kwargs=dict(
+        latency_ms=args.latency, throttle=args.throttle, record_path=args.record, replay_path=args.replay,
+        seed=args.seed))
+    server.start()
+    port = ready.get()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="movify-bench-") as workdir:
+            client = context.Process(target=run_migration,
+                                     args=(port, fixture_dir, workdir, migrate_args, args.yt_latency, results))
+            client.start()
+            client.join()
+            if client.exitcode != 0:
+                raise SystemExit(f"Migration failed with exit code {client.exitcode}")
+            run = results.get()
+    finally:
+        stop.set()
+        stats = ready.get()
+        server.join()
+
+    api_calls = sum(stats["requests"].values())
+    result = {
+        "tracks": args.tracks,
+        "seconds": round(run["seconds"], 3),
+        "tracks_per_second": round(args.tracks / run["seconds"], 1),
+        "api_calls": api_calls,
+        "api_calls_per_track": round(api_calls / args.tracks, 3),
+        "api_calls_by_endpoint": stats["requests"],
+        "searches_by_limit": stats["searches"],
+        "fallback_searches": run["fallback_searches"],
+        "candidates": run["candidates"],
+        "throttled": stats["throttled"],
+        "replay_misses": stats["replay_misses"],
+        "peak_rss_mb": round(run["peak_rss_mb"], 1),
+        "matching": precision(labels, stats["playlists"]),
+        "options": {"latency_ms": args.latency, "yt_latency_ms": args.yt_latency, "throttle": args.throttle,
+                    "replay": args.replay, "migrate_args": migrate_args},
+    }
+
+    print("\n📏 Benchmark results")
+    print(f"   {result['tracks']} tracks in {result['seconds']:.1f}s ({result['tracks_per_second']} tracks/s)")
+    print(f"   {api_calls} Spotify API calls ({result['api_calls_per_track']} per track), "
+          f"{result['throttled']} answered with 429")
+    for endpoint, count in sorted(stats["requests"].items()):
+        print(f"      {endpoint:<32} {count}")
+    if run["candidates"] is not None:
+        candidates = run["candidates"]
+        print(f"   {result['fallback_searches']} title-only fallback searches, {candidates['returned']} search results "
+              f"with {candidates['scored']} distinct candidates scored")
+    print(f"   Peak RSS {result['peak_rss_mb']} MB")
+    matching = result["matching"]
+    print(f"   Precision {matching['precision']} ({matching['correct']}/{matching['written']} written tracks correct), "
+          f"recall {matching['recall']}")
+    if args.replay:
+        print(f"   {result['replay_misses']} searches were not in the recording")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
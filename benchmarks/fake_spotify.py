@@ -0,0 +1,281 @@
+"""Local stand-in for the Spotify Web API, used by the end-to-end benchmark.
+
+Serves search (over a fixture catalog), the current user, playlist creation, playlist reads/writes and saved albums.
+Responses can be recorded to a JSON-lines fixture and replayed from it, so runs are reproducible even if the search
+logic here changes. Latency and HTTP 429 throttling profiles can be injected:
+
+    steady:R      at most R requests per second, further requests get 429 with Retry-After: 1
+    burst:P       for 2 of every P seconds every request gets 429 with Retry-After: 2
+"""
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+import json
+import random
+import re
+import string
+import threading
+import time
+
+_token_pattern = re.compile(r"\w+")
+
+
+class FakeCatalogSearch:
+    """Token search over a catalog, returning Spotify-shaped track objects ranked by the number of matched words."""
+
+    def __init__(self, catalog: List[dict]):
+        self.catalog = catalog
+        self.postings = defaultdict(list)
+        for index, track in enumerate(catalog):
+            tokens = set(_token_pattern.findall((track["title"] + " " + " ".join(track["artists"])).lower()))
+            for token in tokens:
+                self.postings[token].append(index)
+
+    def search(self, query: str, limit: int, type: str = "track") -> dict:
+        tokens = set(_token_pattern.findall(query.lower()))
+        counts = Counter()
+        for token in tokens:
+            counts.update(self.postings.get(token, ()))
+        # Like the real search, most of the query has to match
+        required = max(1, (len(tokens) + 1) // 2)
+        ranked = sorted((index for index, count in counts.items() if count >= required),
+                        key=lambda index: (-counts[index], index))[:limit]
+        if type == "album":
+            # Every catalog track doubles as a single-track album of the same name
+            return {"albums": {"items": [self.album_object(self.catalog[index]) for index in ranked],
+                               "limit": limit, "total": len(ranked)}}
+        return {"tracks": {"items": [self.track_object(self.catalog[index]) for index in ranked],
+                           "limit": limit, "total": len(ranked)}}
+
+    @staticmethod
+    def track_object(track: dict) -> dict:
+        return {"id": track["id"], "name": track["title"], "type": "track", "uri": f"spotify:track:{track['id']}",
+                "artists": [{"name": name, "id": None} for name in track["artists"]],
+                "album": {"album_type": "album", "release_date": "2020-01-01"},
+                "duration_ms": track["duration_ms"]}
+
+    @staticmethod
+    def album_object(track: dict) -> dict:
+        return {"id": track["id"], "name": track["title"], "type": "album", "uri": f"spotify:album:{track['id']}",
+                "artists": [{"name": name, "id": None} for name in track["artists"]],
+                "album_type": "album", "release_date": "2020-01-01"}
+
+
+class ThrottleProfile:
+    def __init__(self, spec: Optional[str]):
+        self.kind, _, value = (spec or "none").partition(":")
+        self.value = float(value) if value else 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> Optional[int]:
+        """Retry-After seconds if this request is throttled, else None."""
+        now = time.monotonic()
+        if self.kind == "steady":
+            with self._lock:
+                if now - self._window_start >= 1:
+                    self._window_start, self._window_count = now, 0
+                self._window_count += 1
+                return 1 if self._window_count > self.value else None
+        if self.kind == "burst":
+            return 2 if (now - self._started) % self.value < 2 else None
+        return None
+
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, catalog: List[dict], port: int = 0, latency_ms: float = 0, throttle: str = None,
+                 record_path: str = None, replay_path: str = None, seed: int = 0):
+        super().__init__(("127.0.0.1", port), FakeSpotifyHandler)
+        self.search_engine = FakeCatalogSearch(catalog)
+        self.latency_ms = latency_ms
+        self.throttle = ThrottleProfile(throttle)
+        self.record_path = record_path
+        self.replayed = {}
+        if replay_path:
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.replayed[record["request"]] = record["response"]
+        self.recorded = {}
+        self.requests = Counter()
+        self.searches = Counter()  # (type, limit) -> count
+        self.throttled = 0
+        self.replay_misses = 0
+        self.playlists = {}  # ID -> {"name", "owner", "tracks"}
+        self.saved_albums = []
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    def delay(self):
+        if self.latency_ms:
+            with self.lock:
+                seconds = self._random.expovariate(1000 / self.latency_ms)
+            time.sleep(seconds)
+
+    def new_id(self) -> str:
+        with self.lock:
+            return "".join(self._random.choice(string.ascii_letters + string.digits) for _ in range(22))
+
+    def save_recording(self):
+        if self.record_path:
+            with open(self.record_path, "w", encoding="utf-8") as f:
+                for request, response in sorted(self.recorded.items()):
+                    f.write(json.dumps({"request": request, "response": response}) + "\n")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": dict(self.requests), "throttled": self.throttled,
+                    "searches": {f"{kind}:{limit}": count for (kind, limit), count in sorted(self.searches.items())},
+                    "replay_misses": self.replay_misses,
+                    "playlists": {playlist["name"]: playlist["tracks"] for playlist in self.playlists.values()}}
+
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    server: FakeSpotifyServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method: str):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/")
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null") if length else None
+
+        if path == "/bench/stats":
+            return self._send(200, self.server.stats())
+
+        endpoint = re.sub(r"/[A-Za-z0-9]{22}(?=/|$)", "/{id}", re.sub(r"^/v1/users/[^/]+", "/v1/users/{id}", path))
+        with self.server.lock:
+            self.server.requests[f"{method} {endpoint}"] += 1
+
+        retry_after = self.server.throttle.retry_after()
+        if retry_after is not None:
+            with self.server.lock:
+                self.server.throttled += 1
+            return self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                              {"Retry-After": str(retry_after)})
+
+        self.server.delay()
+        try:
+            status, response = self._route(method, path, query, body)
+        except (KeyError, ValueError, TypeError) as e:
+            status, response = 400, {"error": {"status": 400, "message": str(e)}}
+        self._send(status, response)
+
+    def _route(self, method: str, path: str, query: dict, body):
+        server = self.server
+        if method == "GET" and path == "/v1/search":
+            with server.lock:
+                server.searches[(query.get("type", "track"), int(query.get("limit", 10)))] += 1
+            request = json.dumps({"q": query.get("q", ""), "type": query.get("type"), "limit": query.get("limit")},
+                                 sort_keys=True)
+            if server.replayed:
+                response = server.replayed.get(request)
+                if response is None:
+                    with server.lock:
+                        server.replay_misses += 1
+                    response = {"tracks": {"items": []}}
+                return 200, response
+            response = server.search_engine.search(query.get("q", ""), int(query.get("limit", 10)),
+                                                   query.get("type", "track"))
+            if server.record_path:
+                with server.lock:
+                    server.recorded[request] = response
+            return 200, response
+
+        if method == "GET" and path == "/v1/me":
+            return 200, {"id": "bench_user", "display_name": "Benchmark"}
+
+        if method == "GET" and path == "/v1/me/playlists":
+            offset, limit = int(query.get("offset", 0)), int(query.get("limit", 50))
+            with server.lock:
+                items = [{"id": playlist_id, "name": playlist["name"], "owner": {"id": playlist["owner"]}}
+                         for playlist_id, playlist in server.playlists.items()]
+            return 200, self._page(items, offset, limit)
+
+        match = re.fullmatch(r"/v1/users/([^/]+)/playlists", path)
+        if method == "POST" and match:
+            playlist_id = server.new_id()
+            with server.lock:
+                server.playlists[playlist_id] = {"name": body["name"], "owner": match.group(1), "tracks": []}
+            return 201, {"id": playlist_id, "name": body["name"]}
+
+        match = re.fullmatch(r"/v1/playlists/([A-Za-z0-9]+)/(?:tracks|items)", path)
+        if match:
+            with server.lock:
+                tracks = server.playlists[match.group(1)]["tracks"]
+                if method == "POST":
+                    uris = body if isinstance(body, list) else body["uris"]  # Newer spotipy posts a bare list
+                    if len(uris) > 100:
+                        raise ValueError("Too many tracks requested")
+                    tracks.extend(uri.rsplit(":", 1)[-1] for uri in uris)
+                    return 201, {"snapshot_id": "bench"}
+                if method == "DELETE":
+                    removed = {item["uri"].rsplit(":", 1)[-1] for item in body.get("items") or body["tracks"]}
+                    tracks[:] = [track_id for track_id in tracks if track_id not in removed]
+                    return 200, {"snapshot_id": "bench"}
+                offset, limit = int(query.get("offset", 0)), int(query.get("limit", 100))
+                items = [{"track": {"id": track_id, "type": "track"}} for track_id in tracks]
+            return 200, self._page(items, offset, limit)
+
+        if method == "PUT" and path in ("/v1/me/albums", "/v1/me/library"):  # Newer spotipy saves via /me/library
+            with server.lock:
+                ids = [uri.rsplit(":", 1)[-1] for uri in (query.get("ids") or query.get("uris", "")).split(",")]
+                if len(ids) > 50:
+                    raise ValueError("Too many ids requested")
+                server.saved_albums.extend(ids)
+            return 200, None
+
+        return 404, {"error": {"status": 404, "message": f"No fake for {method} {path}"}}
+
+    def _page(self, items: list, offset: int, limit: int) -> dict:
+        next_url = None
+        if offset + limit < len(items):
+            parsed = urlparse(self.path)
+            next_url = (f"http://{self.server.server_address[0]}:{self.server.server_address[1]}{parsed.path}"
+                        f"?offset={offset + limit}&limit={limit}")
+        return {"items": items[offset:offset + limit], "offset": offset, "limit": limit, "total": len(items),
+                "next": next_url}
+
+    def _send(self, status: int, payload, headers: dict = None):
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(catalog: List[dict], ready, stop, **options):
+    """Run a server until `stop` (a multiprocessing Event) is set; its port is put on the `ready` queue, followed
+    by the final stats once stopped."""
+    server = FakeSpotifyServer(catalog, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    ready.put(server.server_address[1])
+    stop.wait()
+    server.shutdown()
+    server.save_recording()
+    ready.put(server.stats())
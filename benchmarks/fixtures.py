@@ -0,0 +1,121 @@
+"""Deterministic synthetic fixtures for the benchmarks: a Spotify catalog, YouTube Music playlists built from it with
+the kind of messy titles real uploads have, and the labels (which catalog track each upload really is)."""
+from typing import List, Tuple
+import json
+import os
+import random
+import string
+
+WORDS = ("love night fire dream heart rain city gold blue wild light dark summer ocean river star moon shadow storm "
+         "echo ghost glass silver paper stone neon velvet golden broken electric midnight highway thunder crystal "
+         "winter sugar honey diamond wolf tiger angel devil heaven paradise runaway forever tonight yesterday").split()
+CHANNELS = ("Epic Music World", "Cinematic Records", "Trap Nation", "MrSuicideSheep", "Proximity", "Cercle",
+            "Chill Nation", "Audio Library", "Music Channel", "Lyrics Studio")
+
+
+def _pseudo_word(rng: random.Random) -> str:
+    consonants, vowels = "bcdfghklmnprstvz", "aeiou"
+    return "".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(rng.randint(2, 4)))
+
+
+def _track_id(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(22))
+
+
+def make_catalog(size: int, seed: int = 1) -> List[dict]:
+    """Catalog of Spotify-like tracks: {id, title, artists, duration_ms}. Titles mix common words with rarer ones
+    so that search results are realistic (many partial matches, one right answer)."""
+    rng = random.Random(seed)
+    vocabulary = WORDS + [_pseudo_word(rng) for _ in range(max(200, size // 5))]
+    artists = [" ".join(_pseudo_word(rng).title() for _ in range(rng.randint(1, 2))) for _ in range(max(50, size // 8))]
+    catalog = []
+    for _ in range(size):
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 4))).title()
+        roll = rng.random()
+        if roll < 0.06:
+            title += " (Remix)"
+        elif roll < 0.1:
+            title += " - Live"
+        catalog.append({"id": _track_id(rng), "title": title,
+                        "artists": rng.sample(artists, rng.randint(1, 2) if rng.random() < 0.2 else 1),
+                        "duration_ms": rng.randint(90_000, 420_000)})
+    return catalog
+
+
+def messy_upload(track: dict, rng: random.Random) -> Tuple[str, List[str]]:
+    """(title, artist names) as the track could appear on YouTube."""
+    title, artist = track["title"], track["artists"][0]
+    roll = rng.random()
+    if roll < 0.2:
+        title = f"{title} (Official Video)"
+    elif roll < 0.3:
+        title = f"{title} [Official Music Video]"
+    elif roll < 0.45:
+        title = f"{rng.choice(CHANNELS)} - {artist} - {title}"
+    elif roll < 0.55:
+        title = f'{artist} "{title}"'
+    elif roll < 0.62:
+        title = f"{artist} - {title} (Lyrics)"
+
+    roll = rng.random()
+    if roll < 0.7:
+        artists = list(track["artists"])
+    elif roll < 0.85:
+        artists = [rng.choice(CHANNELS)]
+    else:
+        artists = [f"user{rng.randint(1000, 99999)}"]  # Numeric uploader names
+    return title, artists
+
+
+def make_playlists(catalog: List[dict], tracks: int, playlist_size: int = 100, seed: int = 2,
+                   duplicates: float = 0):
+    """YouTube Music playlists (as returned by ytmusicapi.get_playlist) sampled from the catalog, and the label
+    (catalog ID) of every playlist entry. A `duplicates` share of the entries repeats an earlier upload, like a song
+    saved to several playlists."""
+    rng = random.Random(seed)
+    playlists, labels = {}, {}
+    uploads = []  # (entry, label) of every entry so far
+    for number in range(0, tracks, playlist_size):
+        playlist_id = f"PLbench{number // playlist_size:05d}"
+        entries, entry_labels = [], []
+        for position in range(min(playlist_size, tracks - number)):
+            if duplicates and uploads and rng.random() < duplicates:
+                entry, label = rng.choice(uploads)
+                entries.append(dict(entry))
+                entry_labels.append(label)
+                continue
+            track = rng.choice(catalog)
+            title, artists = messy_upload(track, rng)
+            seconds = track["duration_ms"] // 1000 + rng.randint(-3, 3)
+            entries.append({"videoId": f"v{number + position:010d}", "title": title,
+                            "artists": [{"name": name, "id": None} for name in artists],
+                            "duration": f"{seconds // 60}:{seconds % 60:02d}", "duration_seconds": seconds})
+            entry_labels.append(track["id"])
+            uploads.append((entries[-1], track["id"]))
+        playlists[playlist_id] = {"id": playlist_id, "title": f"Bench playlist {number // playlist_size}",
+                                  "tracks": entries, "trackCount": len(entries)}
+        labels[playlist_id] = entry_labels
+    return playlists, labels
+
+
+def generate(directory: str, tracks: int, seed: int = 1, playlist_size: int = 100, duplicates: float = 0):
+    """Write catalog.jsonl, ytmusic.json, labels.json and playlists.txt (input for --from-text) to directory."""
+    os.makedirs(directory, exist_ok=True)
+    catalog = make_catalog(max(1000, tracks // 2), seed=seed)
+    playlists, labels = make_playlists(catalog, tracks, playlist_size, seed=seed + 1, duplicates=duplicates)
+
+    with open(os.path.join(directory, "catalog.jsonl"), "w", encoding="utf-8") as f:
+        for track in catalog:
+            f.write(json.dumps(track) + "\n")
+    with open(os.path.join(directory, "ytmusic.json"), "w", encoding="utf-8") as f:
+        json.dump({"playlists": playlists}, f)
+    with open(os.path.join(directory, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump({playlists[playlist_id]["title"]: ids for playlist_id, ids in labels.items()}, f)
+    with open(os.path.join(directory, "playlists.txt"), "w", encoding="utf-8") as f:
+        for playlist_id, playlist in playlists.items():
+            f.write(f"# {playlist['title']}\nhttps://music.youtube.com/playlist?list={playlist_id}\n\n")
+
+
+def load_catalog(directory: str) -> List[dict]:
+    with open(os.path.join(directory, "catalog.jsonl"), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
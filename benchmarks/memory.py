@@ -0,0 +1,104 @@
+"""Memory benchmark: the tracks of a large library held as pandas DataFrames versus a TrackStore.
+
+    python -m benchmarks.memory --tracks 100000
+
+Both paths run in a fresh process over the same fixture playlists (ytmusicapi responses, loaded before measuring)
+and do what a migration does with the tracks: build one table per playlist, combine them, produce one record per
+track for the Spotify lookup, attach the Spotify IDs and group the IDs by playlist. The "dataframe" path is the
+pipeline as it was before TrackStore (object columns, artists as "['A', 'B']" strings, copy/concat/dropna/groupby);
+the "store" path is the current one. Reported: peak and retained traced memory (tracemalloc) and the growth of
+the peak RSS.
+"""
+from multiprocessing import get_context
+import argparse
+import gc
+import resource
+import time
+import tracemalloc
+
+from benchmarks import fixtures
+
+
+def dataframe_path(playlists: dict, labels: dict):
+    import pandas as pd
+    from movify.SpotifyTarget import SpotifyTarget
+    from movify.YoutubeMusicSource import YoutubeMusicSource
+
+    sections = []
+    for playlist_id, playlist in playlists.items():
+        df = pd.DataFrame(playlist["tracks"])
+        df.insert(0, "playlist_title", playlist["title"])
+        df.insert(0, "playlist_id", playlist_id)
+        df["artists"] = YoutubeMusicSource.parse_artists(df["artists"])
+        df = df[["playlist_title", "playlist_id", "title", "artists", "duration"]].copy()
+        sections.append(df)
+    full_df = pd.concat(sections, ignore_index=True, sort=False)
+    del sections
+    records = full_df.to_dict("records")  # What get_spotify_song_ids matched
+    full_df.insert(0, "spotify_id", [track_id for ids in labels.values() for track_id in ids][:len(records)])
+    playlist_ids = list(SpotifyTarget._playlist_song_ids(full_df))
+    return full_df, records, playlist_ids
+
+
+def store_path(playlists: dict, labels: dict):
+    from movify.SpotifyTarget import SpotifyTarget
+    from movify.TrackStore import TrackStore
+
+    store = TrackStore()
+    for playlist_id, playlist in playlists.items():
+        store.extend(TrackStore.from_ytmusic(playlist["tracks"], playlist["title"], playlist_id))
+    for _ in store:  # get_spotify_song_ids builds each Track on access
+        pass
+    store.set_spotify_ids([track_id for ids in labels.values() for track_id in ids][:len(store)])
+    playlist_ids = list(SpotifyTarget._playlist_song_ids(store))
+    return store, None, playlist_ids
+
+
+def measure(path: str, tracks: int, seed: int, results):
+    catalog = fixtures.make_catalog(max(1000, tracks // 2), seed=seed)
+    playlists, labels = fixtures.make_playlists(catalog, tracks, seed=seed + 1)
+    del catalog
+    import pandas  # noqa: F401  Imported up front by both paths, so its own memory is not counted
+    import movify.SpotifyTarget  # noqa: F401
+    gc.collect()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = {"dataframe": dataframe_path, "store": store_path}[path](playlists, labels)
+    seconds = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    results.put({"path": path, "seconds": seconds, "peak_mb": peak / 2 ** 20, "retained_mb": retained / 2 ** 20,
+                 "rss_growth_mb": rss_growth / 1024, "playlists": len(kept[2])})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory of DataFrame tracks versus TrackStore")
+    parser.add_argument("--tracks", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    context = get_context("spawn")
+    results = context.Queue()
+    rows = []
+    for path in ("dataframe", "store"):
+        process = context.Process(target=measure, args=(path, args.tracks, args.seed, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+
+    print(f"🧮 Track memory for {args.tracks} tracks")
+    print(f"   {'path':<10} {'peak MB':>9} {'retained MB':>12} {'RSS growth MB':>14} {'seconds':>8}")
+    for row in rows:
+        print(f"   {row['path']:<10} {row['peak_mb']:>9.1f} {row['retained_mb']:>12.1f} {row['rss_growth_mb']:>14.1f} "
+              f"{row['seconds']:>8.2f}")
+    dataframe, store = rows
+    print(f"   TrackStore peak is {dataframe['peak_mb'] / store['peak_mb']:.1f}x smaller, retained "
+          f"{dataframe['retained_mb'] / store['retained_mb']:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Micro-benchmarks for the CPU-bound matching functions, with a regression gate.
+
+    python -m benchmarks.micro                          # report latency and allocations per call
+    python -m benchmarks.micro --check                  # fail (exit 1) if slower than benchmarks/micro_baseline.json
+    python -m benchmarks.micro --save                   # record a new baseline
+
+The corpus is synthetic but shaped like real uploads: "(Official Video)" suffixes, compilation-channel titles such as
+"Trap Nation - Artist - Title", quoted titles and numeric uploader names, each paired with the 20 search results the
+fake Spotify search returns for it. Latency is the best of `--repeat` passes over the corpus; allocations are the
+mean peak of memory allocated during one call, measured in a separate tracemalloc pass so tracing does not distort
+the timings.
+
+Every timed pass alternates with a pass of a fixed calibration workload, and the gate compares timings relative to
+that workload, so a baseline recorded on one machine can gate runs on another (or on a busy CI runner).
+"""
+from typing import Callable, List, Tuple
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks import fixtures
+from benchmarks.fake_spotify import FakeCatalogSearch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "micro_baseline.json")
+
+
+class Case:
+    """One benchmarked function: `func` is called once per argument tuple of the corpus."""
+
+    def __init__(self, name: str, func: Callable, arguments: List[tuple], unit: str = "call"):
+        self.name = name
+        self.func = func
+        self.arguments = arguments
+        self.unit = unit
+
+    def run_once(self, loops: int = 1) -> float:
+        func, arguments = self.func, self.arguments
+        started = time.perf_counter()
+        for _ in range(loops):
+            for args in arguments:
+                func(*args)
+        return time.perf_counter() - started
+
+    def latency_ns(self, repeat: int, min_pass_seconds: float = 0.05) -> Tuple[float, float]:
+        """(ns per call, ns of the calibration workload measured alongside). Timed passes alternate with calibration
+        passes, so both see the same machine load."""
+        # Warm up caches (regexes, interned strings) and size the passes so that timer resolution and scheduler
+        # noise stay small compared to a pass
+        loops = max(1, round(min_pass_seconds / max(self.run_once(), 1e-6)))
+        timings, calibrations = [], []
+        for _ in range(repeat):
+            calibrations.append(calibration_pass())
+            timings.append(self.run_once(loops))
+        return min(timings) * 1e9 / (loops * len(self.arguments)), min(calibrations) * 1e9
+
+    def peak_allocation_bytes(self) -> float:
+        func = self.func
+        total = 0
+        tracemalloc.start()
+        try:
+            for args in self.arguments:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                func(*args)
+                total += tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            tracemalloc.stop()
+        return total / len(self.arguments)
+
+
+_calibration_pattern = re.compile(r"\(([^)]*)\)")
+_calibration_words = [f"Word{i} (Official Video) feat. Someone {i}" for i in range(2000)]
+
+
+def calibration_pass() -> float:
+    """Seconds for a fixed string/regex workload, used to compare timings across machines and load levels."""
+    started = time.perf_counter()
+    for word in _calibration_words:
+        _calibration_pattern.sub("", word.lower()).strip().split()
+    return time.perf_counter() - started
+
+
+def make_corpus(size: int, seed: int = 7):
+    """(song, search results) pairs: songs as the pipeline sees them and the candidates searched for them."""
+    catalog = fixtures.make_catalog(max(1000, size * 2), seed=seed)
+    search = FakeCatalogSearch(catalog)
+    rng = random.Random(seed)
+    corpus = []
+    for track in rng.sample(catalog, size):
+        title, artists = fixtures.messy_upload(track, rng)
+        artists_json = [{"name": name, "id": None} for name in artists]
+        song = pd.Series({"title": title, "artists": str([name for name in artists]),
+                          "duration_seconds": track["duration_ms"] // 1000})
+        items = search.search(f"{title} {' '.join(artists)}", 20)["tracks"]["items"]
+        if not items:
+            items = search.search(title, 20)["tracks"]["items"]
+        corpus.append((song, artists_json, items))
+    return corpus
+
+
+def make_cases(corpus) -> List[Case]:
+    from movify import FuzzyScorer as fuzzy_scorer
+    from movify.Candidate import TrackCandidate
+    from movify.SpotifyTarget import SpotifyTarget
+    from movify.YoutubeMusicSource import YoutubeMusicSource
+
+    target = SpotifyTarget("bench", "bench")
+    fuzzy_target = SpotifyTarget("bench", "bench", scorer="fuzzy")
+
+    def fuzzy_select_cold(song, records):
+        # Without the per-string signature caches, as for strings seen for the first time
+        fuzzy_scorer.signature.cache_clear()
+        fuzzy_scorer._title_features.cache_clear()
+        fuzzy_scorer._artist_features.cache_clear()
+        return fuzzy_target.select_best_record(song, records)
+    songs = [song for song, _, _ in corpus]
+    candidate_frames = [pd.DataFrame([{"title": item["name"], "artists": str([a["name"] for a in item["artists"]]),
+                                       "id": item["id"]} for item in items])
+                        for _, _, items in corpus]
+    candidate_records = [TrackCandidate.from_items(items) for _, _, items in corpus]
+    pairs = [(song, frame.iloc[0]) for song, frame in zip(songs, candidate_frames) if not frame.empty]
+    artist_batches = [[artists_json for _, artists_json, _ in corpus[start:start + 100]]
+                      for start in range(0, len(corpus), 100)]
+
+    return [
+        Case("similarity_score_df", SpotifyTarget.similarity_score_df, pairs),
+        Case("_generate_search_variations", target._generate_search_variations, [(song,) for song in songs]),
+        Case("generate_search_string", SpotifyTarget.generate_search_string, [(song,) for song in songs]),
+        Case("parse_artists", YoutubeMusicSource.parse_artists, [(batch,) for batch in artist_batches],
+             unit="100 tracks"),
+        Case("select_best_candidate", target.select_best_candidate,
+             [(song, frame) for song, frame in zip(songs, candidate_frames)], unit="20 candidates"),
+        Case("select_best_record", target.select_best_record,
+             [(song, records) for song, records in zip(songs, candidate_records)], unit="20 candidates"),
+        Case("select_best_record[fuzzy]", fuzzy_target.select_best_record,
+             [(song, records) for song, records in zip(songs, candidate_records)], unit="20 candidates"),
+        Case("select_best_record[fuzzy,cold]", fuzzy_select_cold,
+             [(song, records) for song, records in zip(songs, candidate_records)], unit="20 candidates"),
+    ]
+
+
+def measure(cases: List[Case], repeat: int) -> dict:
+    calibration_pass()
+    results = {}
+    for case in cases:
+        ns_per_call, calibration = case.latency_ns(repeat)
+        results[case.name] = {"ns_per_call": round(ns_per_call, 1),
+                              "relative": round(ns_per_call / calibration, 6),
+                              "peak_bytes_per_call": round(case.peak_allocation_bytes(), 1),
+                              "unit": case.unit, "calls": len(case.arguments)}
+    return results
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions against the baseline: timings relative to the calibration workload, allocations as is."""
+    regressions = []
+    for name, expected in baseline["results"].items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        slowdown = actual["relative"] / expected["relative"] - 1
+        if slowdown > tolerance:
+            regressions.append(f"{name}: {100 * slowdown:.0f}% slower ({actual['ns_per_call'] / 1000:.1f} µs per call)")
+        allowed_bytes = expected["peak_bytes_per_call"] * (1 + tolerance) + 1024
+        if actual["peak_bytes_per_call"] > allowed_bytes:
+            regressions.append(f"{name}: {actual['peak_bytes_per_call'] / 1024:.1f} KiB allocated per call, allowed "
+                               f"{allowed_bytes / 1024:.1f} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the matching hot paths")
+    parser.add_argument("--corpus", type=int, default=500, help="Number of messy titles in the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=7, help="Timed passes over the corpus per function")
+    parser.add_argument("--only", action="append", help="Only run this function (repeatable)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file for --check and --save")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a function regressed")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Allowed slowdown (and allocation growth) before --check fails (default: 0.3 = 30%%)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    cases = make_cases(make_corpus(args.corpus, args.seed))
+    if args.only:
+        cases = [case for case in cases if case.name in args.only]
+    results = measure(cases, args.repeat)
+
+    baseline = None
+    if args.check or (os.path.exists(args.baseline) and not args.save):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.save:
+        # A baseline should not come from one lucky (or unlucky) round: keep the median of three
+        rounds = [results] + [measure(cases, args.repeat) for _ in range(2)]
+        results = {name: sorted((round_[name] for round_ in rounds), key=lambda r: r["relative"])[1]
+                   for name in results}
+
+    regressions = []
+    if args.check:
+        regressions = check(results, baseline, args.tolerance)
+        if regressions:
+            # Confirm by measuring the regressed functions again, so a noisy pass alone cannot fail the gate
+            retried = measure([case for case in cases if any(r.startswith(case.name + ":") for r in regressions)],
+                              args.repeat)
+            for name, result in retried.items():
+                if result["relative"] < results[name]["relative"]:
+                    results[name] = result
+            regressions = check(results, baseline, args.tolerance)
+
+    print(f"⏱️  Matching micro-benchmarks ({args.corpus} messy titles, best of {args.repeat} passes)")
+    print(f"   {'function':<28} {'µs/call':>10} {'KiB/call':>10}  {'vs baseline':>11}  per")
+    for name, result in results.items():
+        expected = baseline["results"].get(name) if baseline else None
+        change = (f"{100 * (result['relative'] / expected['relative'] - 1):+10.0f}%"
+                  if expected else " " * 11)
+        print(f"   {name:<28} {result['ns_per_call'] / 1000:>10.1f} {result['peak_bytes_per_call'] / 1024:>10.1f}  "
+              f"{change}  {result['unit']}")
+
+    data = {"python": sys.version.split()[0], "corpus": args.corpus, "seed": args.seed, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        print(f"💾 Saved baseline to {args.baseline}")
+    if regressions:
+        print("❌ Performance regressions:")
+        for regression in regressions:
+            print(f"   {regression}")
+        sys.exit(1)
+    if args.check:
+        print(f"✅ No function is more than {100 * args.tolerance:.0f}% slower than the baseline")
+
+if __name__ == "__main__":
+    main()
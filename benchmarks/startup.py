@@ -0,0 +1,108 @@
+"""Cold-start benchmark for migrate_playlists.py.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --check        # fail if a cheap command imports a heavy dependency or is slow
+
+Every command runs in a fresh interpreter. The reported time is the median wall time minus that of a bare
+`python -c pass`, so it measures what the CLI itself costs. Cheap commands (--help, --dry-run) must not import
+pandas, numpy, spotipy, ytmusicapi, tqdm, aiohttp or asyncio; --check verifies that from `python -X importtime`,
+which unlike timings is deterministic.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import fixtures
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "spotipy", "ytmusicapi", "tqdm", "aiohttp", "asyncio")
+CONFIG = """SPOTIFY_CLIENT_ID = "bench"
+SPOTIFY_CLIENT_SECRET = "bench"
+SPOTIFY_USER_ID = "bench"
+SPOTIFY_REDIRECT_URI = "http://127.0.0.1/callback"
+PLAYLIST_URLS = []
+"""
+
+
+def run_command(argv: list, env: dict) -> float:
+    started = time.perf_counter()
+    subprocess.run(argv, env=env, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def imported_modules(argv: list, env: dict) -> dict:
+    """Top-level packages imported by a command -> cumulative import time in ms."""
+    result = subprocess.run([argv[0], "-X", "importtime"] + argv[1:], env=env, cwd=ROOT, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line.split("|"))
+        if cumulative.isdigit() and name and not name.startswith(" "):
+            package = name.split(".")[0]
+            modules[package] = max(modules.get(package, 0), int(cumulative) / 1000)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of the migrate_playlists.py commands")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per command (default: 10)")
+    parser.add_argument("--check", action="store_true",
+                        help="Exit with status 1 if a cheap command imports a heavy module or exceeds --max-ms")
+    parser.add_argument("--max-ms", dest="max_ms", type=float, default=150,
+                        help="Allowed startup cost of cheap commands on top of the interpreter (default: 150 ms)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="movify-startup-") as workdir:
+        with open(os.path.join(workdir, "config.py"), "w", encoding="utf-8") as f:
+            f.write(CONFIG)
+        fixture_dir = os.path.join(workdir, "fixtures")
+        fixtures.generate(fixture_dir, 1000)
+        env = dict(os.environ, PYTHONPATH=workdir, PYTHONDONTWRITEBYTECODE="1")
+        script = os.path.join(ROOT, "migrate_playlists.py")
+        commands = {
+            "python -c pass": ([sys.executable, "-c", "pass"], False),
+            "--help": ([sys.executable, script, "--help"], True),
+            "--dry-run --from-text": ([sys.executable, script, "--dry-run", "--from-text",
+                                       os.path.join(fixture_dir, "playlists.txt")], True),
+            "migration imports": ([sys.executable, "-c", "import migrate_playlists, movify.SpotifyTarget, "
+                                                         "movify.YoutubeMusicSource"], False),
+        }
+
+        for argv, _ in commands.values():
+            run_command(argv, env)  # Warm the OS file cache, so the first command is not penalized
+        timings = {name: statistics.median(run_command(argv, env) for _ in range(args.repeat)) * 1000
+                   for name, (argv, _) in commands.items()}
+        interpreter_ms = timings.pop("python -c pass")
+
+        problems = []
+        print(f"🚀 Cold start (median of {args.repeat} runs, interpreter alone {interpreter_ms:.0f} ms)")
+        for name, (argv, cheap) in commands.items():
+            if name not in timings:
+                continue
+            modules = imported_modules(argv, env)
+            heavy = sorted(module for module in HEAVY_MODULES if module in modules)
+            cost = timings[name] - interpreter_ms
+            print(f"   {name:<24} {timings[name]:7.0f} ms  (+{cost:.0f} ms)  heavy imports: "
+                  + (", ".join(f"{module} {modules[module]:.0f} ms" for module in heavy) or "none"))
+            if cheap and heavy:
+                problems.append(f"{name} imports {', '.join(heavy)}")
+            if cheap and cost > args.max_ms:
+                problems.append(f"{name} takes {cost:.0f} ms on top of the interpreter, allowed {args.max_ms:.0f} ms")
+
+    if args.check:
+        if problems:
+            print("❌ Startup regressions:")
+            for problem in problems:
+                print(f"   {problem}")
+            sys.exit(1)
+        print("✅ Cheap commands start without heavy imports")
+
+
+if __name__ == "__main__":
+    main()
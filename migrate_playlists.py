@@ -1,250 +1,592 @@
+from __future__ import annotations
+
 import argparse
+import json
 import os
-import re
-import pandas as pd
-
-from movify.SpotifyTarget import SpotifyTarget
-from movify.YoutubeMusicSource import YoutubeMusicSource
-from config import (
-    SPOTIFY_CLIENT_ID,
-    SPOTIFY_CLIENT_SECRET,
-    SPOTIFY_USER_ID,
-    SPOTIFY_REDIRECT_URI,
-    PLAYLIST_URLS,
-)
-
-# INDIVIDUAL_LINKS is optional - import it if it exists
-try:
-    from config import INDIVIDUAL_LINKS
-except ImportError:
-    INDIVIDUAL_LINKS = None
-
-
-def parse_text_playlists_file(path: str) -> list[tuple[str, list[str]]]:
-    """
-    Parse a text file containing sections that start with a line beginning with '#',
-    followed by one or more YouTube/YouTube Music links. Blank lines are ignored.
-
-    Example:
-    # sample playlist
-    https://youtube.com/link1
-    https://music.youtube.com/link2
-
-    Returns a list of (playlist_title, urls) tuples.
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+# Only cheap modules are imported up front, so --help, --dry-run and --prune-cache start quickly; pandas, spotipy,
+# ytmusicapi and the modules using them are imported once a migration actually runs
+from movify.Candidate import EXACT_TITLE_SCORE
+from movify.LinkParser import Link, LinkParser
+from movify.MatchCache import MatchCache
+from movify.ResponseCache import ResponseCache
+from movify.RunJournal import RunJournal
+from movify.RunMetrics import RunMetrics
+from movify.VariationStats import VariationStats
+
+if TYPE_CHECKING:
+    from movify.CatalogIndex import CatalogIndex
+    from movify.RequestScheduler import RequestScheduler
+    from movify.TrackStore import TrackStore
+    from movify.YoutubeMusicSource import YoutubeMusicSource
+
+
+def load_config():
+    """The user's config.py, imported only when a command needs it."""
+    import config
+    return config
+
+
+def fetch_link(yt: YoutubeMusicSource, title: str, link: Link) -> tuple[TrackStore, list[str]]:
+    """Fetch the tracks behind one link of a section: a whole playlist or a single track.
+    Also returns the problems reported while fetching, so they can be printed with their section.
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"File not found: {path}")
-
-    header_pattern = re.compile(r"^\s*#\s*(.+?)\s*$")
-    url_pattern = re.compile(r"^(?:https?://)?(?:(?:[a-zA-Z0-9.-]+\.)?youtube\.com/|youtu\.be/)", re.IGNORECASE)
-
-    playlists: list[tuple[str, list[str]]] = []
-    current_title: str | None = None
-    current_urls: list[str] = []
-
-    with open(path, "r", encoding="utf-8") as f:
-        for raw_line in f:
-            line = raw_line.strip()
-            if not line:
-                continue
-
-            header_match = header_pattern.match(line)
-            if header_match:
-                # Commit previous section
-                if current_title and current_urls:
-                    playlists.append((current_title, current_urls))
-                current_title = header_match.group(1)
-                current_urls = []
-                continue
-
-            # URL line
-            if url_pattern.search(line):
-                normalized = line if line.startswith("http") else ("https://" + line)
-                current_urls.append(normalized)
-
-    # Commit last section
-    if current_title and current_urls:
-        playlists.append((current_title, current_urls))
-
-    return playlists
-
-
-def parse_text_playlists_text(content: str) -> list[tuple[str, list[str]]]:
-    """Parse in-memory text into (playlist_title, urls) tuples. Same format as file parser."""
-    header_pattern = re.compile(r"^\s*#\s*(.+?)\s*$")
-    url_pattern = re.compile(r"^(?:https?://)?(?:(?:[a-zA-Z0-9.-]+\.)?youtube\.com/|youtu\.be/)", re.IGNORECASE)
-
-    playlists: list[tuple[str, list[str]]] = []
-    current_title: str | None = None
-    current_urls: list[str] = []
-
-    for raw_line in content.splitlines():
-        line = raw_line.strip()
-        if not line:
-            continue
-
-        header_match = header_pattern.match(line)
-        if header_match:
-            if current_title and current_urls:
-                playlists.append((current_title, current_urls))
-            current_title = header_match.group(1)
-            current_urls = []
+    from movify.TrackStore import TrackStore
+
+    messages: list[str] = []
+    if link.is_playlist:
+        return yt.get_playlist_store(link.fetch_url, playlist_title=title), messages
+    # Single track URL (a video or a playlist position)
+    track = yt.get_track(link.fetch_url, playlist_title=title, report=messages.append)
+    return TrackStore.from_tracks([track] if track is not None else []), messages
+
+
+def fetch_journaled(journal: RunJournal | None, section: str, url: str, fetch, metrics: RunMetrics | None = None):
+    """Run fetch() for a link unless a resumed journal already has its tracks. fetch returns (tracks, messages)."""
+    if journal is not None:
+        tracks = journal.ingested(section, url)
+        if tracks is not None:
+            from movify.TrackStore import TrackStore
+            return TrackStore.from_records(tracks), []
+    with metrics.stage("ingest") if metrics is not None else nullcontext():
+        tracks, messages = fetch()
+    if journal is not None and len(tracks):
+        journal.record_ingested(section, url, tracks.records())
+    return tracks, messages
+
+
+def collect_section(title: str, futures: Iterable[tuple[str, Future | None]], store: TrackStore) -> TrackStore | None:
+    """Append the fetched links of one section to store in link order and return the section as a view of store.
+    A failing or unsupported link is reported and skipped."""
+    start = len(store)
+    for url, future in futures:
+        if future is None:
+            print(f"   - Skipping unsupported link: {url}")
             continue
+        try:
+            tracks, messages = future.result()
+            for message in messages:
+                print(message)
+            store.extend(tracks)
+        except Exception as e:
+            print(f"   - Skipping URL due to error: {url} -> {e}")
+
+    if len(store) == start:
+        print(f"   ❌ No tracks found for '{title}'")
+        return None
+    print(f"   ✅ Added {len(store) - start} tracks to '{title}'")
+    return store[start:]
+
+
+def iter_links(args, config, parser: LinkParser) -> Iterator[tuple[str, str, Link]]:
+    """Every link of the input as (banner, playlist title, Link), read lazily from the text file (or stdin) and
+    INDIVIDUAL_LINKS in config.py (text or a {title: [links]} dict), deduplicated by parser."""
+    if args.from_text:
+        banner = "🎵 Building playlists from text file..."
+        links = parser.links
+        for title, link in parser.parse_file(args.from_text):
+            yield banner, title, link
+        if parser.links == links:
+            print("❌ No playlists found in the provided text file.")
 
-        if url_pattern.search(line):
-            normalized = line if line.startswith("http") else ("https://" + line)
-            current_urls.append(normalized)
+    individual_links = getattr(config, "INDIVIDUAL_LINKS", None)
+    if isinstance(individual_links, str) and individual_links.strip():
+        banner = "🎵 Building playlists from INDIVIDUAL_LINKS in config.py..."
+        for title, link in parser.parse_text(individual_links):
+            yield banner, title, link
+    elif isinstance(individual_links, dict) and individual_links:
+        banner = "🎵 Building playlists from INDIVIDUAL_LINKS dict in config.py..."
+        for title, link in parser.parse_mapping(individual_links):
+            yield banner, title, link
+
+
+def iter_sections(yt: YoutubeMusicSource, links: Iterable[tuple[str, str, Link]], playlist_urls: list[str],
+                  workers: int, journal: RunJournal | None = None, metrics: RunMetrics | None = None,
+                  store: TrackStore | None = None, lookahead: int = None):
+    """Fetch the links of all sections (and PLAYLIST_URLS) with one bounded worker pool and yield the tracks of
+    each section as soon as it is complete, in the original section order.
+    links are (banner, section title, Link) items as yielded by iter_links; consecutive items with the same title
+    form a section. They are consumed lazily, at most `lookahead` links (default 4 per worker) ahead of the link
+    being collected, so memory does not grow with the length of the input.
+    With a store, the tracks of all sections are appended to it and each section is a view of it, so the whole run
+    is available without copying; otherwise every section gets its own store and can be freed once processed.
+    Links already fetched by a resumed run are taken from the journal."""
+    from movify.TrackStore import TrackStore
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    lookahead = lookahead or 4 * max(1, workers)
+    links = iter(links)
+    pending: deque = deque()  # (banner, title, link as written, future or None) submitted ahead
+
+    def submit_link(title: str, link: Link) -> Future:
+        return executor.submit(fetch_journaled, journal, title, link.fetch_url, lambda: fetch_link(yt, title, link),
+                               metrics)
+
+    def submit_playlist(url: str) -> Future:
+        return executor.submit(fetch_journaled, journal, "", url, lambda: (yt.get_playlist_store(url), []),
+                               metrics)
+
+    def top_up():
+        while len(pending) < lookahead:
+            item = next(links, None)
+            if item is None:
+                return
+            banner, title, link = item
+            pending.append((banner, title, link.url, submit_link(title, link) if link.fetch_url else None))
+
+    def section_links(banner: str, title: str):
+        while pending and pending[0][0] == banner and pending[0][1] == title:
+            _, _, url, future = pending.popleft()
+            top_up()
+            yield url, future
+
+    try:
+        submitted_playlists = [(url, submit_playlist(url)) for url in playlist_urls]
+        top_up()
+
+        current_banner = None
+        number = 0
+        while pending:
+            banner, title = pending[0][:2]
+            if banner != current_banner:
+                print(banner)
+                current_banner = banner
+            number += 1
+            print(f"\n📋 Processing section {number}: {title}")
+            section = collect_section(title, section_links(banner, title),
+                                      store if store is not None else TrackStore())
+            if section is not None:
+                yield section
+
+        # Process PLAYLIST_URLS if defined (original functionality)
+        if submitted_playlists:
+            print("🎵 Migrating playlists from PLAYLIST_URLS in config.py...")
+        for i, (url, future) in enumerate(submitted_playlists):
+            print(f"\n📋 Processing playlist {i+1}/{len(submitted_playlists)}: {url}")
+            try:
+                tracks, _ = future.result()
+                if not len(tracks):
+                    print(f"❌ No tracks found in playlist {i+1}")
+                    continue
+                if store is not None:
+                    start = len(store)
+                    store.extend(tracks)
+                    tracks = store[start:]
+                # Tracks without a playlist title (e.g. from an old journal) still need a target playlist
+                if tracks.playlist_title(0) is None:
+                    tracks.set_playlist_title(f"Playlist {i+1}")
+                yield tracks
+            except Exception as e:
+                print(f"❌ Error processing playlist {i+1}: {e}")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    if current_title and current_urls:
-        playlists.append((current_title, current_urls))
 
-    return playlists
+def print_link_summary(parser: LinkParser):
+    if parser.duplicates or parser.repeats:
+        print(f"🔗 {parser.links} links in {parser.sections} sections: {parser.duplicates} duplicate links dropped, "
+              f"{parser.repeats} shared with an earlier section (fetched once)")
 
 
-def clean_url_for_individual_track(url: str) -> str:
-    """Clean a URL by removing &list= and everything after it.
-    This ensures individual video URLs work even if they contain playlist parameters.
-    """
-    if "&list=" in url:
-        return url.split("&list=")[0]
-    return url
+def load_playlist_ids(path: str) -> dict[str, str]:
+    """Playlist title -> Spotify playlist ID stored by earlier runs, used by --sync."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {str(title): str(playlist_id) for title, playlist_id in json.load(f).items()}
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ignoring unreadable playlist IDs in {path}: {e}")
+        return {}
 
 
-def main():
-    parser = argparse.ArgumentParser(description="Migrate YouTube/YouTube Music links into Spotify playlists")
+def save_playlist_ids(path: str, playlist_ids: dict[str, str]):
+    if not playlist_ids:
+        return
+    stored = load_playlist_ids(path)
+    stored.update(playlist_ids)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def print_cache_summary(fetch_cache: ResponseCache, match_cache: MatchCache | None, search_cache: ResponseCache,
+                        catalog: CatalogIndex | None = None, scheduler: RequestScheduler | None = None):
+    if scheduler is not None:
+        print(scheduler.summary())
+    if catalog is not None:
+        print(catalog.summary())
+    print(f"🗄️  YouTube Music: {fetch_cache.misses} playlists/videos fetched, "
+          f"{fetch_cache.hits + fetch_cache.coalesced} reused")
+    fetch_cache.close()
+    if match_cache is not None:
+        print(f"🗄️  Match cache: {match_cache.hits} hits, {match_cache.misses} misses")
+        match_cache.close()
+    print(f"🗄️  Search cache: {search_cache.misses} searches sent, "
+          f"{search_cache.hits + search_cache.coalesced} answered from the cache")
+    search_cache.close()
+
+
+def main(argv: list[str] | None = None, config=None):
+    """Command line entry point. argv defaults to sys.argv[1:] and config to the user's config.py; batch_migrate
+    passes both for each job."""
+    parser = argparse.ArgumentParser(prog="migrate_playlists.py",
+                                     description="Migrate YouTube/YouTube Music links into Spotify playlists")
     parser.add_argument(
         "--from-text",
         dest="from_text",
-        help="Path to a text file with sections '# Title' followed by YouTube links",
+        help="Path to a text file with sections '# Title' followed by YouTube links ('-' reads stdin)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of songs looked up on Spotify concurrently (default: 4, use 1 for sequential lookups)",
+    )
+    parser.add_argument(
+        "--ingest-workers",
+        dest="ingest_workers",
+        type=int,
+        default=8,
+        help="Number of YouTube links fetched concurrently (default: 8, use 1 for sequential fetching)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Look up and create each playlist as soon as its links are fetched, while later sections are still "
+             "being fetched, instead of collecting all tracks first",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the asyncio Spotify backend (requires aiohttp); --workers then sets the number of songs in flight",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=20,
+        help="Maximum sustained Spotify API requests per second (default: 20); on HTTP 429 all requests pause for "
+             "the Retry-After time and fewer requests are sent in parallel",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0,
+        help=f"Stop searching for a song once a match scores at least this much, trying the historically best "
+             f"search variations first (default: 0, off: every variation runs in the original order; "
+             f"{EXACT_TITLE_SCORE} requires an exact title match)",
+    )
+    parser.add_argument(
+        "--variation-stats",
+        dest="variation_stats_path",
+        default=VariationStats.default_path,
+        help=f"Where the hit rates of the search variations used by --confidence are kept "
+             f"(default: {VariationStats.default_path})",
+    )
+    parser.add_argument(
+        "--scorer",
+        choices=("rules", "fuzzy"),
+        default="rules",
+        help="How search candidates are scored: the original substring rules (default) or fuzzy edit distance and "
+             "trigram similarity, which also credits near misses (uses rapidfuzz if installed)",
+    )
+    parser.add_argument(
+        "--catalog",
+        dest="catalog_path",
+        help="Local Spotify catalog (CSV, JSON lines or Parquet with id, title, artists, duration columns) used to "
+             "match songs offline; the Spotify search is only used for songs the catalog cannot match confidently",
+    )
+    parser.add_argument(
+        "--catalog-threshold",
+        dest="catalog_threshold",
+        type=float,
+        default=EXACT_TITLE_SCORE,
+        help=f"Minimum score for a catalog match to be used (default: {EXACT_TITLE_SCORE})",
+    )
+    parser.add_argument(
+        "--cache-path",
+        dest="cache_path",
+        default=MatchCache.default_path,
+        help=f"Location of the persistent song match cache (default: {MatchCache.default_path})",
+    )
+    parser.add_argument(
+        "--cache-ttl-days",
+        dest="cache_ttl_days",
+        type=float,
+        default=MatchCache.default_ttl / 86400,
+        help="Days after which cached matches are looked up again (default: 30)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        help="Bypass the match cache: search every song on Spotify and do not store the results",
+    )
+    parser.add_argument(
+        "--warm-cache",
+        dest="warm_cache",
+        action="store_true",
+        help="Only look up songs and fill the match cache, without creating any Spotify playlists",
+    )
+    parser.add_argument(
+        "--search-cache",
+        dest="search_cache_path",
+        nargs="?",
+        const=".movify_search_cache.sqlite",
+        default=None,
+        help="Also keep raw Spotify search responses on disk (for 7 days) so they are reused across runs "
+             "(default location: .movify_search_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--fetch-cache",
+        dest="fetch_cache_path",
+        nargs="?",
+        const=".movify_fetch_cache.sqlite",
+        default=None,
+        help="Also keep YouTube Music playlists and videos on disk (for 24 hours) so they are reused across runs "
+             "(default location: .movify_fetch_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Update existing Spotify playlists (found by stored ID or by title) instead of creating new ones: "
+             "only songs missing from a playlist are added",
+    )
+    parser.add_argument(
+        "--remove-stale",
+        dest="remove_stale",
+        action="store_true",
+        help="With --sync, also remove songs that are no longer part of the migrated playlist",
+    )
+    parser.add_argument(
+        "--playlist-ids",
+        dest="playlist_ids_path",
+        default=".movify_playlists.json",
+        help="Where the IDs of the created playlists are stored for --sync (default: .movify_playlists.json)",
+    )
+    parser.add_argument(
+        "--token-cache",
+        dest="token_cache_path",
+        help="Where the authorized Spotify user token is cached (default: spotipy's .cache-<user ID>)",
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics_path",
+        help="Write run metrics (stage timings, API calls, latencies, cache hit rates) to this file: Prometheus "
+             "textfile format if it ends in .prom, JSON otherwise",
+    )
+    parser.add_argument(
+        "--journal",
+        dest="journal_path",
+        help=f"Record the run in this journal so it can be resumed with --resume (default with --resume: "
+             f"{RunJournal.default_path}; without either option no journal is written)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its journal: fetched links, matched songs, created playlists and "
+             "added tracks are not repeated",
+    )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="Only validate the input (text file and config.py) and show the playlists that would be migrated, "
+             "without contacting YouTube Music or Spotify",
+    )
+    parser.add_argument(
+        "--prune-cache",
+        dest="prune_cache",
+        action="store_true",
+        help="Remove expired entries from the match cache and exit",
+    )
+    args = parser.parse_args(argv)
+
+    cache_ttl = args.cache_ttl_days * 86400
+    if args.prune_cache:
+        match_cache = MatchCache(args.cache_path, ttl=cache_ttl)
+        removed = match_cache.prune()
+        print(f"🧹 Removed {removed} entries from the match cache ({len(match_cache)} remaining)")
+        match_cache.close()
+        if args.search_cache_path and os.path.exists(args.search_cache_path):
+            search_cache = ResponseCache(args.search_cache_path, namespace="spotify_search")
+            print(f"🧹 Removed {search_cache.prune()} expired search responses")
+            search_cache.close()
+        if args.fetch_cache_path and os.path.exists(args.fetch_cache_path):
+            fetch_cache = ResponseCache(args.fetch_cache_path, namespace="ytmusic", ttl=24 * 3600)
+            print(f"🧹 Removed {fetch_cache.prune()} expired YouTube Music responses")
+            fetch_cache.close()
+        return
 
-    sp = SpotifyTarget(SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET)
-    yt = YoutubeMusicSource()
+    if args.stream and args.use_async:
+        parser.error("--stream cannot be combined with --async")
+    if args.no_cache and args.warm_cache:
+        parser.error("--warm-cache cannot be combined with --no-cache")
+    if args.sync and args.use_async:
+        parser.error("--sync cannot be combined with --async")
+    if args.remove_stale and not args.sync:
+        parser.error("--remove-stale requires --sync")
+    if args.from_text and args.from_text != "-" and not os.path.exists(args.from_text):
+        parser.error(f"file not found: {args.from_text}")
+    if config is None:
+        try:
+            config = load_config()
+        except ImportError as e:
+            parser.error(f"cannot load config.py ({e}); copy config_template.py to config.py and fill it in")
+
+    if args.dry_run:
+        dry_run(args, config)
+        return
 
-    final_df_list: list[pd.DataFrame] = []
+    match_cache = None if args.no_cache else MatchCache(args.cache_path, ttl=cache_ttl)
+    # Identical search queries are always shared within a run; persisting them is opt-in
+    search_cache_path = None if args.no_cache else args.search_cache_path
+    search_cache = ResponseCache(search_cache_path, namespace="spotify_search")
+
+    variation_stats = VariationStats(args.variation_stats_path)
+
+    # The journal is opt-in: it holds every fetched track and match and is fsync-ed per playlist batch
+    journal = None
+    if args.journal_path or args.resume:
+        journal = RunJournal(args.journal_path or RunJournal.default_path, resume=args.resume)
+        if args.resume:
+            print(f"⏯️  Resuming from {journal.path} ({journal.replayed} journal records)")
+    metrics = RunMetrics()
+    metrics.track_cache("match", match_cache)
+    metrics.track_cache("search", search_cache)
+    try:
+        run(args, config, match_cache, search_cache, variation_stats, journal, metrics)
+    finally:
+        if journal is not None:
+            journal.close()
+        print(metrics.summary())
+        if args.metrics_path:
+            metrics.export(args.metrics_path)
+            print(f"📊 Metrics written to {args.metrics_path}")
+
+
+def dry_run(args, config):
+    """Show what a run would migrate, without fetching anything."""
+    link_parser = LinkParser()
+    playlist_urls = config.PLAYLIST_URLS or []
+    current_banner = current_title = None
+    counts: dict[str, int] = {}
+
+    def print_section():
+        if current_title is not None:
+            videos = counts.get(Link.VIDEO, 0) + counts.get(Link.INDEX, 0)
+            invalid = counts.get(Link.UNSUPPORTED, 0)
+            print(f"   📋 {current_title}: {videos} videos, {counts.get(Link.PLAYLIST, 0)} playlists"
+                  + (f", {invalid} invalid links" if invalid else ""))
+
+    for banner, title, link in iter_links(args, config, link_parser):
+        if (banner, title) != (current_banner, current_title):
+            print_section()
+            if banner != current_banner:
+                print(banner)
+            current_banner, current_title, counts = banner, title, {}
+        counts[link.kind] = counts.get(link.kind, 0) + 1
+    print_section()
+    print_link_summary(link_parser)
+
+    if playlist_urls:
+        print(f"🎵 {len(playlist_urls)} playlists from PLAYLIST_URLS in config.py")
+    if not link_parser.links and not playlist_urls:
+        print("❌ Nothing to migrate.")
+        return
+    print(f"✅ {link_parser.sections + len(playlist_urls)} playlists with "
+          f"{link_parser.links + len(playlist_urls)} links would be migrated (dry run, nothing was fetched)")
+
+
+def run(args, config, match_cache: MatchCache | None, search_cache: ResponseCache, variation_stats: VariationStats,
+        journal: RunJournal | None, metrics: RunMetrics):
+    import asyncio
+
+    from movify.CatalogIndex import CatalogIndex
+    from movify.RequestScheduler import RequestScheduler
+    from movify.SpotifyTarget import SpotifyTarget
+    from movify.StreamingPipeline import StreamingPipeline
+    from movify.TrackStore import TrackStore
+    from movify.YoutubeMusicSource import YoutubeMusicSource
+
+    catalog = None
+    if args.catalog_path:
+        catalog = CatalogIndex(args.catalog_path, threshold=args.catalog_threshold,
+                               scorer=SpotifyTarget.scorers[args.scorer])
+        if catalog.build_seconds is not None:
+            print(f"📚 Indexed {len(catalog)} catalog tracks in {catalog.build_seconds:.1f}s "
+                  f"({catalog.size_bytes / 1e6:.1f} MB)")
+
+    scheduler = RequestScheduler(rate=args.rate, max_concurrency=args.workers, metrics=metrics)
+    sp_options = dict(match_cache=match_cache, search_cache=search_cache, confidence_threshold=args.confidence or None,
+                      variation_stats=variation_stats, journal=journal, catalog=catalog, scheduler=scheduler,
+                      metrics=metrics, scorer=args.scorer, token_cache_path=args.token_cache_path)
+    if args.use_async:
+        from movify.AsyncSpotifyTarget import AsyncSpotifyTarget
+        sp = AsyncSpotifyTarget(config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET, max_concurrency=args.workers,
+                                **sp_options)
+    else:
+        sp = SpotifyTarget(config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET, match_workers=args.workers,
+                           **sp_options)
+    # Client ID, client secret, redirect URI and user ID for the playlist writes
+    user_credentials = (config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET, config.SPOTIFY_REDIRECT_URI,
+                        config.SPOTIFY_USER_ID)
+    if args.sync:
+        # IDs created earlier in a resumed run take precedence over the stored ones
+        for title, playlist_id in load_playlist_ids(args.playlist_ids_path).items():
+            sp.created_playlists.setdefault(title, playlist_id)
+    fetch_cache = ResponseCache(None if args.no_cache else args.fetch_cache_path, namespace="ytmusic", ttl=24 * 3600)
+    yt = YoutubeMusicSource(fetch_cache=fetch_cache)
+    metrics.track_cache("fetch", fetch_cache)
+
+    # Links are read lazily while the sections are fetched
+    link_parser = LinkParser()
+    links = iter_links(args, config, link_parser)
+
+    # Without streaming all tracks of the run live in one compact store, and sections are views of it
+    store = None if args.stream else TrackStore()
+    sections = iter_sections(yt, links, config.PLAYLIST_URLS or [], args.ingest_workers, journal, metrics, store)
+
+    def lookup_section(section: TrackStore) -> TrackStore:
+        section.set_spotify_ids(sp.get_spotify_song_ids(section))
+        return section
+
+    def write_section(section: TrackStore):
+        # Stale songs are removed once all sections are written: a title can span several sections
+        sp.add_playlists_to_library(section, *user_credentials, sync=args.sync)
+        save_playlist_ids(args.playlist_ids_path, sp.created_playlists)
+        print(f"📤 Added '{section.playlist_title(0)}' to Spotify")
+
+    if args.stream:
+        # Ingest, match and write concurrently, one section at a time
+        print("🚰 Streaming sections through ingest → Spotify lookup → playlist creation...")
+        pipeline = StreamingPipeline(lookup_section, (lambda section: None) if args.warm_cache else write_section)
+        pipeline.run(sections)
+        if args.remove_stale and not args.warm_cache:
+            sp.remove_stale_songs(*user_credentials)
+        print_link_summary(link_parser)
+        print_cache_summary(fetch_cache, match_cache, search_cache, sp.catalog, sp.scheduler)
+        variation_stats.save()
+        if pipeline.tracks_written == 0:
+            print("❌ No tracks to process.")
+        elif args.warm_cache:
+            print("\n🎉 Match cache warmed, no playlists were created.")
+        else:
+            print(f"\n🎉 All playlists processed! ({pipeline.tracks_written} tracks in {pipeline.sections_written} sections)")
+        return
 
-    # Process text file if provided
-    if args.from_text:
-        # Parse the text file into sections of (playlist_title, urls)
-        sections = parse_text_playlists_file(args.from_text)
-        if not sections:
-            print("❌ No playlists found in the provided text file.")
-            return
-
-        print("🎵 Building playlists from text file...")
-        for idx, (title, urls) in enumerate(sections, start=1):
-            print(f"\n📋 Processing section {idx}/{len(sections)}: {title} ({len(urls)} links)")
-            per_section_tracks: list[pd.DataFrame] = []
-            for url in urls:
-                try:
-                    if "list=" in url and ("/playlist" in url or "/watch" not in url):
-                        # Playlist URL
-                        pl_df = yt.get_playlist_from_url(url)
-                        if not pl_df.empty:
-                            pl_df = pl_df.copy()
-                            pl_df["playlist_title"] = title
-                            per_section_tracks.append(pl_df)
-                    else:
-                        # Single track URL
-                        t_df = yt.get_track_from_url(url, playlist_title=title)
-                        if not t_df.empty:
-                            per_section_tracks.append(t_df)
-                except Exception as e:
-                    print(f"   - Skipping URL due to error: {url} -> {e}")
-
-            if per_section_tracks:
-                section_df = pd.concat(per_section_tracks, ignore_index=True, sort=False)
-                final_df_list.append(section_df)
-                print(f"   ✅ Added {len(section_df)} tracks to '{title}'")
-            else:
-                print(f"   ❌ No tracks found for '{title}'")
-
-    # Process INDIVIDUAL_LINKS if defined (can be string or dict)
-    if isinstance(INDIVIDUAL_LINKS, str) and INDIVIDUAL_LINKS.strip():
-        sections = parse_text_playlists_text(INDIVIDUAL_LINKS)
-        if sections:
-            print("🎵 Building playlists from INDIVIDUAL_LINKS in config.py...")
-            for idx, (title, urls) in enumerate(sections, start=1):
-                print(f"\n📋 Processing section {idx}/{len(sections)}: {title} ({len(urls)} links)")
-                per_section_tracks: list[pd.DataFrame] = []
-                for url in urls:
-                    try:
-                        # Clean the URL for individual track processing
-                        cleaned_url = clean_url_for_individual_track(url)
-                        if "list=" in cleaned_url and ("/playlist" in cleaned_url or "/watch" not in cleaned_url):
-                            pl_df = yt.get_playlist_from_url(cleaned_url)
-                            if not pl_df.empty:
-                                pl_df = pl_df.copy()
-                                pl_df["playlist_title"] = title
-                                per_section_tracks.append(pl_df)
-                        else:
-                            t_df = yt.get_track_from_url(cleaned_url, playlist_title=title)
-                            if not t_df.empty:
-                                per_section_tracks.append(t_df)
-                    except Exception as e:
-                        print(f"   - Skipping URL due to error: {url} -> {e}")
-
-                if per_section_tracks:
-                    section_df = pd.concat(per_section_tracks, ignore_index=True, sort=False)
-                    final_df_list.append(section_df)
-                    print(f"   ✅ Added {len(section_df)} tracks to '{title}'")
-                else:
-                    print(f"   ❌ No tracks found for '{title}'")
-
-    elif isinstance(INDIVIDUAL_LINKS, dict) and INDIVIDUAL_LINKS:
-        # Accept dict format: { "Playlist Title": ["url1", "url2", ...], ... }
-        items = list(INDIVIDUAL_LINKS.items())
-        print("🎵 Building playlists from INDIVIDUAL_LINKS dict in config.py...")
-        for idx, (title, urls) in enumerate(items, start=1):
-            print(f"\n📋 Processing section {idx}/{len(items)}: {title} ({len(urls)} links)")
-            per_section_tracks: list[pd.DataFrame] = []
-            for url in urls:
-                try:
-                    normalized = url if isinstance(url, str) and url.startswith("http") else (f"https://{url}" if isinstance(url, str) else "")
-                    if not normalized:
-                        continue
-                    # Clean the URL for individual track processing
-                    cleaned_url = clean_url_for_individual_track(normalized)
-                    if "list=" in cleaned_url and ("/playlist" in cleaned_url or "/watch" not in cleaned_url):
-                        pl_df = yt.get_playlist_from_url(cleaned_url)
-                        if not pl_df.empty:
-                            pl_df = pl_df.copy()
-                            pl_df["playlist_title"] = title
-                            per_section_tracks.append(pl_df)
-                    else:
-                        t_df = yt.get_track_from_url(cleaned_url, playlist_title=title)
-                        if not t_df.empty:
-                            per_section_tracks.append(t_df)
-                except Exception as e:
-                    print(f"   - Skipping URL due to error: {url} -> {e}")
-
-            if per_section_tracks:
-                section_df = pd.concat(per_section_tracks, ignore_index=True, sort=False)
-                final_df_list.append(section_df)
-                print(f"   ✅ Added {len(section_df)} tracks to '{title}'")
-            else:
-                print(f"   ❌ No tracks found for '{title}'")
-
-    # Process PLAYLIST_URLS if defined (original functionality)
-    if PLAYLIST_URLS:
-        print("🎵 Migrating playlists from PLAYLIST_URLS in config.py...")
-        for i, url in enumerate(PLAYLIST_URLS):
-            print(f"\n📋 Processing playlist {i+1}/{len(PLAYLIST_URLS)}: {url}")
-            try:
-                pl_lib = yt.get_playlist_from_url(url)
-                if pl_lib.empty:
-                    print(f"❌ No tracks found in playlist {i+1}")
-                    continue
-                # Add playlist_title column if it doesn't exist
-                if "playlist_title" not in pl_lib.columns:
-                    pl_lib.insert(0, "playlist_title", f"Playlist {i+1}")
-                final_df_list.append(pl_lib)
-            except Exception as e:
-                print(f"❌ Error processing playlist {i+1}: {e}")
+    # Fetch everything: each section is appended to the store as it is collected
+    section_count = sum(1 for _ in sections)
+    print_link_summary(link_parser)
 
     # Check if we have any tracks to process
-    if not final_df_list:
+    if not section_count:
         print("❌ No tracks to process.")
         print("Please add either:")
         print("- PLAYLIST_URLS in config.py for YouTube Music playlists")
@@ -252,19 +594,36 @@ def main():
         print("- Use --from-text <file> for text file input")
         return
 
-    full_df = pd.concat(final_df_list, ignore_index=True, sort=False)
-    print(f"✅ Collected {len(full_df)} tracks across {full_df['playlist_title'].nunique()} playlist(s)")
+    print(f"✅ Collected {len(store)} tracks across {len(store.playlist_titles())} playlist(s)")
 
     # Lookup on Spotify
     print("🔍 Looking up songs on Spotify...")
-    sp_ids = sp.get_spotify_song_ids(full_df)
-    full_df.insert(0, "spotify_id", sp_ids)
+    if args.use_async:
+        async def lookup():
+            try:
+                return await sp.get_spotify_song_ids_async(store)
+            finally:
+                await sp.close()
+        sp_ids = asyncio.run(lookup())
+    else:
+        sp_ids = sp.get_spotify_song_ids(store)
+    store.set_spotify_ids(sp_ids)
+    variation_stats.save()
+    print_cache_summary(fetch_cache, match_cache, search_cache, sp.catalog, sp.scheduler)
+
+    if args.warm_cache:
+        print("\n🎉 Match cache warmed, no playlists were created.")
+        return
 
     # Add to Spotify
     print("📤 Adding to Spotify library...")
-    sp.add_playlists_to_library(
-        full_df, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_REDIRECT_URI, SPOTIFY_USER_ID
-    )
+    if args.use_async:
+        asyncio.run(sp.add_playlists_to_library_async(store, *user_credentials))
+    else:
+        sp.add_playlists_to_library(
+            store, *user_credentials, sync=args.sync, remove_stale=args.remove_stale
+        )
+    save_playlist_ids(args.playlist_ids_path, sp.created_playlists)
 
     print("\n🎉 All playlists processed!")
 
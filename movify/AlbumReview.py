@@ -0,0 +1,63 @@
+from typing import Optional
+import json
+import os
+import threading
+
+from .MatchCache import MatchCache
+
+
+class AlbumReview:
+    """Review file for albums whose best Spotify match is neither good enough to save nor bad enough to drop.
+
+    A run writes each such album with its best candidate and "decision": "pending". Change the decision to "accept"
+    (replacing "spotify_id" first if the candidate is the wrong album) or "reject", and the next run with the same
+    file saves the accepted albums and skips the rejected ones without searching them again. Pending albums are
+    looked up again and stay in the file.
+    """
+
+    PENDING, ACCEPT, REJECT = "pending", "accept", "reject"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for entry in json.load(f):
+                    self._entries[MatchCache.key(entry.get("title"), entry.get("artists"))] = entry
+
+    def decision(self, album) -> Optional[dict]:
+        """The reviewed entry of an album if it was accepted or rejected, else None."""
+        entry = self._entries.get(MatchCache.key(album.get("title"), album.get("artists")))
+        if entry is None or entry.get("decision") not in (self.ACCEPT, self.REJECT):
+            return None
+        return entry
+
+    def add(self, album, candidate, score: float):
+        """Queue an album for review with its best candidate."""
+        entry = {"title": album.get("title"), "artists": album.get("artists"), "year": self._string(album.get("year")),
+                 "spotify_id": candidate["id"], "spotify_title": candidate["title"],
+                 "spotify_artists": candidate["artists"], "spotify_year": candidate.get("year"),
+                 "score": float(score), "decision": self.PENDING}
+        with self._lock:
+            self._entries[MatchCache.key(album.get("title"), album.get("artists"))] = entry
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for entry in self._entries.values() if entry.get("decision") not in (self.ACCEPT, self.REJECT))
+
+    def save(self):
+        """Write all entries, reviewed ones included, replacing the file atomically."""
+        with self._lock:
+            entries = list(self._entries.values())
+        if not entries and not os.path.exists(self.path):
+            return
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        os.replace(temporary_path, self.path)
+
+    @staticmethod
+    def _string(value) -> Optional[str]:
+        return str(value) if value is not None and value == value else None
@@ -0,0 +1,261 @@
+from typing import List, Optional, Union
+import asyncio
+import time
+
+import pandas as pd
+from spotipy import SpotifyException
+from tqdm import tqdm
+
+from .RequestScheduler import RateLimitError, RequestScheduler
+from .SpotifyTarget import SpotifyTarget
+from .TrackStore import TrackStore
+
+# aiohttp is only needed for the asyncio backend
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncSpotifyClient:
+    """Minimal asyncio client for the Spotify Web API calls used by the migration.
+
+    Access tokens come from a regular spotipy auth manager (SpotifyClientCredentials or SpotifyOAuth). The API
+    prefix can point to a local fake server for testing.
+    """
+
+    default_prefix = "https://api.spotify.com/v1/"
+
+    def __init__(self, auth_manager, prefix: str = default_prefix, max_concurrency: int = 64,
+                 requests_timeout: float = 10, scheduler: RequestScheduler = None):
+        if aiohttp is None:
+            raise ImportError("The asyncio Spotify backend requires aiohttp (pip install aiohttp)")
+        self.auth_manager = auth_manager
+        self.scheduler = scheduler
+        self.prefix = prefix if prefix.endswith("/") else prefix + "/"
+        self.requests_timeout = requests_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._token: Optional[str] = None
+
+    async def search(self, q: str, type: str = "track", limit: int = 10) -> dict:
+        return await self._request("GET", "search", params={"q": q, "type": type, "limit": limit})
+
+    async def current_user(self) -> dict:
+        return await self._request("GET", "me")
+
+    async def user_playlist_create(self, user: str, name: str, public: bool = True, description: str = "") -> dict:
+        payload = {"name": name, "public": public, "description": description}
+        return await self._request("POST", f"users/{user}/playlists", payload=payload)
+
+    async def playlist_add_items(self, playlist_id: str, items: List[str]) -> dict:
+        uris = [item if item.startswith("spotify:") else f"spotify:track:{item}" for item in items]
+        return await self._request("POST", f"playlists/{playlist_id}/tracks", payload={"uris": uris})
+
+    async def current_user_saved_albums_add(self, albums: List[str]):
+        return await self._request("PUT", "me/albums", params={"ids": ",".join(albums)})
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _access_token(self, refresh: bool = False) -> str:
+        if self._token is None or refresh:
+            self._token = await asyncio.to_thread(self.auth_manager.get_access_token, as_dict=False)
+        return self._token
+
+    async def _request(self, method: str, path: str, params: dict = None, payload: dict = None):
+        if self.scheduler is None:
+            return await self._send(method, path, params, payload)
+        return await self.scheduler.call_async(lambda: self._measured_send(method, path, params, payload))
+
+    async def _measured_send(self, method: str, path: str, params: dict = None, payload: dict = None):
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = await self._send(method, path, params, payload)
+            status = 200
+            return result
+        except SpotifyException as e:
+            status = e.http_status
+            raise
+        finally:
+            if self.scheduler.metrics is not None:
+                self.scheduler.metrics.record_api_call(path, status, time.perf_counter() - started)
+
+    async def _send(self, method: str, path: str, params: dict = None, payload: dict = None):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.requests_timeout))
+        url = self.prefix + path
+
+        async with self._semaphore:
+            for attempt in range(2):
+                headers = {"Authorization": f"Bearer {await self._access_token(refresh=attempt > 0)}"}
+                async with self._session.request(method, url, params=params, json=payload, headers=headers) as response:
+                    if response.status == 401 and attempt == 0:
+                        continue  # Expired token: fetch a new one and retry once
+                    if response.status >= 400:
+                        text = await response.text()
+                        raise SpotifyException(response.status, -1, f"{url}:\n {text}", headers=dict(response.headers))
+                    if response.status == 204 or response.content_length == 0:
+                        return None
+                    return await response.json(content_type=None)
+
+
+class AsyncSpotifyTarget(SpotifyTarget):
+    """SpotifyTarget with an asyncio backend: thousands of searches can be in flight on one event loop.
+
+    The matching logic is the same generator as in the synchronous path (SpotifyTarget._song_search_steps), so both
+    backends produce the same matches. The synchronous methods remain available.
+    """
+
+    def __init__(self, client_id=None, client_secret=None, max_concurrency: int = 64,
+                 prefix: str = AsyncSpotifyClient.default_prefix, auth_manager=None, **kwargs):
+        kwargs.setdefault("scheduler", RequestScheduler(max_concurrency=max_concurrency))
+        super().__init__(client_id, client_secret, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.prefix = prefix
+        self.client = AsyncSpotifyClient(auth_manager or self.auth_manager, prefix, max_concurrency,
+                                         scheduler=self.scheduler)
+        self._in_flight_searches: dict[tuple, asyncio.Task] = {}
+
+    async def get_spotify_song_ids_async(self, df: Union[pd.DataFrame, TrackStore],
+                                         concurrency: int = None) -> List[str]:
+        """Async get_spotify_song_ids: all rows are matched concurrently, at most `concurrency` at a time."""
+        target_songs = self._target_songs(df)
+        if not target_songs:
+            return []
+
+        skipped_before = self.searches_skipped
+        song_ids_add = [pd.NA] * len(target_songs)
+        not_found_indices = []
+        throttled_indices = []
+        semaphore = asyncio.Semaphore(concurrency or self.max_concurrency)
+        groups = self._duplicate_groups(target_songs)
+
+        print("Looking up songs on spotify...")
+        with self.metrics.stage("lookup"), tqdm(total=len(groups)) as progress:
+            async def lookup(positions: List[int]):
+                try:
+                    async with semaphore:
+                        song, score = await self.search_for_song_async(target_songs[positions[0]])
+                except RateLimitError:
+                    throttled_indices.extend(positions)
+                    progress.update(1)
+                    return
+                for position in positions:
+                    if score > 0:
+                        song_ids_add[position] = song["id"]
+                    else:
+                        not_found_indices.append(position)
+                progress.update(1)
+
+            await asyncio.gather(*(lookup(positions) for positions in groups))
+
+        self._report_lookup(target_songs, not_found_indices, skipped_before, throttled_indices, len(groups))
+        return song_ids_add
+
+    async def search_for_song_async(self, song):
+        # The match cache and the journal do blocking file I/O: keep it off the event loop
+        cached = await asyncio.to_thread(lambda: self._cached_match(song) or self._local_match(song))
+        if cached is not None:
+            return cached
+
+        steps = self._song_search_steps(song)
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    started = time.perf_counter()
+                    try:
+                        response = await self.search_async(*request)
+                    finally:
+                        self.metrics.add_stage_time("search", time.perf_counter() - started)
+                except Exception as e:
+                    response = e
+                request = steps.send(response)
+        except StopIteration as stop:
+            best_candidate, best_score = stop.value
+
+        await asyncio.to_thread(self._remember_match, song, best_candidate, best_score)
+        return best_candidate, best_score
+
+    async def search_async(self, query: str, type: str = "track", limit: int = 20) -> dict:
+        """Async search sharing the response cache; concurrent identical queries share one request."""
+        key, cached = self._cached_search(query, type, limit)
+        if cached is None:
+            cached = self.search_cache.peek(key)
+        if cached is None:
+            cached = await asyncio.to_thread(self.search_cache.get, key)  # May read the persistent tier
+        if cached is not None:
+            return cached
+
+        task = self._in_flight_searches.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_search(key, query, type, limit))
+            self._in_flight_searches[key] = task
+            task.add_done_callback(lambda _: self._in_flight_searches.pop(key, None))
+        else:
+            self.search_cache.coalesced += 1
+        # Shielded so a cancelled waiter does not cancel the request other waiters depend on
+        return await asyncio.shield(task)
+
+    async def _fetch_search(self, key: tuple, query: str, type: str, limit: int) -> dict:
+        response = await self.client.search(query, type=type, limit=limit)
+        compact = self._compact_search_response(response, type + "s")
+        await asyncio.to_thread(self.search_cache.put, key, compact)
+        return compact
+
+    async def add_playlists_to_library_async(self, playlists: Union[pd.DataFrame, TrackStore], client_id,
+                                             client_secret, redirect_uri, username, auth_manager=None):
+        """Async add_playlists_to_library: playlists are created concurrently, each filled in batches of 100."""
+        if auth_manager is None:
+            auth_manager = self.user_auth(client_id, client_secret, redirect_uri, username, "playlist-modify-private")
+        user_client = AsyncSpotifyClient(auth_manager, self.prefix, self.max_concurrency, scheduler=self.scheduler)
+        started = time.perf_counter()
+        try:
+            user_id = (await user_client.current_user())["id"]
+
+            async def create(playlist_title: str, song_ids: List[str]):
+                playlist_id = self.created_playlists.get(playlist_title)
+                if playlist_id is None:
+                    response = await user_client.user_playlist_create(user_id, playlist_title, public=False)
+                    playlist_id = self.created_playlists[playlist_title] = response["id"]
+                    if self.journal is not None:
+                        await asyncio.to_thread(self.journal.record_playlist, playlist_title, playlist_id)
+                if self.journal is not None:
+                    song_ids = await asyncio.to_thread(self.journal.pending_ids, playlist_title, song_ids)
+                # Batches of one playlist are added in order
+                for start in range(0, len(song_ids), 100):
+                    batch = song_ids[start:start + 100]
+                    await user_client.playlist_add_items(playlist_id, batch)
+                    if self.journal is not None:
+                        await asyncio.to_thread(self.journal.record_batch, playlist_title, batch)
+
+            await asyncio.gather(*(create(title, song_ids) for title, song_ids in self._playlist_song_ids(playlists)))
+        finally:
+            self.metrics.add_stage_time("playlist_writes", time.perf_counter() - started)
+            await user_client.close()
+
+    async def add_albums_to_library_async(self, spotify_ids: List[str], client_id, client_secret, redirect_uri,
+                                          auth_manager=None):
+        if auth_manager is None:
+            auth_manager = self.user_auth(client_id, client_secret, redirect_uri, None, "user-library-modify")
+        user_client = AsyncSpotifyClient(auth_manager, self.prefix, self.max_concurrency, scheduler=self.scheduler)
+        if self.journal is not None:
+            spotify_ids = self.journal.pending_albums(spotify_ids)
+
+        async def save(batch: List[str]):
+            await user_client.current_user_saved_albums_add(batch)
+            if self.journal is not None:
+                await asyncio.to_thread(self.journal.record_albums, batch)
+
+        try:
+            batches = [spotify_ids[start:start + 50] for start in range(0, len(spotify_ids), 50)]
+            await asyncio.gather(*(save(batch) for batch in batches if batch))
+        finally:
+            await user_client.close()
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,242 @@
+from typing import Optional, Sequence, Tuple
+import re
+
+import numpy as np
+
+
+def _normalize_string(s) -> str:
+    # Same as the normalization in SpotifyTarget.similarity_score_df, without requiring pandas
+    if s is None or (isinstance(s, float) and s != s) or type(s).__name__ in ("NAType", "NaTType"):
+        return ""
+    return str(s).lower().strip()
+
+
+_bracket_pattern = re.compile(r"\[[^\]]*\]")
+_parenthesis_pattern = re.compile(r"\([^\)]*\)")
+_punctuation_pattern = re.compile(r"[^\w\s]")
+_whitespace_pattern = re.compile(r"\s+")
+
+
+def _normalize_for_exact(s: str) -> str:
+    s = _bracket_pattern.sub("", s)
+    s = _parenthesis_pattern.sub("", s)
+    s = _punctuation_pattern.sub(" ", s)
+    return _whitespace_pattern.sub(" ", s).strip()
+
+
+def _strip_suffixes(title: str) -> str:
+    for suffix in BatchScorer.title_suffixes:
+        if title.endswith(suffix):
+            title = title[:-len(suffix)]
+    return title
+
+
+def _contains(haystack: np.ndarray, needle) -> np.ndarray:
+    """Elementwise `needle in haystack` for unicode arrays (either side may be a scalar)."""
+    return np.char.find(haystack, needle) >= 0
+
+
+def _str_array(values: Sequence[str]) -> np.ndarray:
+    return np.array(values, dtype=str) if len(values) else np.zeros(0, dtype="<U1")
+
+
+class CandidateFeatures:
+    """Normalized, columnar view of a candidate set. Computed once and reusable for any number of targets."""
+
+    def __init__(self, titles: Optional[Sequence] = None, artists: Optional[Sequence] = None, size: int = 0):
+        self.has_title = titles is not None
+        self.has_artists = artists is not None
+        self.size = len(titles) if titles is not None else len(artists) if artists is not None else size
+
+        if self.has_title:
+            normalized = [_normalize_string(t) for t in titles]
+            stripped = [_strip_suffixes(t) for t in normalized]
+            self.title = _str_array(normalized)
+            self.title_stripped = _str_array(stripped)
+            self.title_exact = _str_array([_normalize_for_exact(t) for t in stripped])
+            self.title_stripped_len = np.char.str_len(self.title_stripped)
+
+            # Remix/mashup/cover penalty and featured artist penalty only depend on the candidate
+            has_remix = np.zeros(self.size, dtype=bool)
+            for keyword in BatchScorer.remix_keywords:
+                has_remix |= _contains(self.title, keyword)
+            has_feat = _contains(self.title, "feat") | _contains(self.title, "ft")
+            self.title_penalty = np.where(has_remix, -3, 0) + np.where(has_feat, np.where(has_remix, -2, -1), 0)
+
+        if self.has_artists:
+            normalized = [_normalize_string(a) for a in artists]
+            self.artists = _str_array(normalized)
+            # Flattened per-candidate artist lists, with the index of the owning candidate
+            flat, owners, first = [], [], []
+            for position, artist_str in enumerate(normalized):
+                artist_list = [artist.strip() for artist in artist_str.split(",")]
+                flat.extend(artist_list)
+                owners.extend([position] * len(artist_list))
+                first.append(artist_list[0].lower())
+            self.artist_flat = _str_array(flat)
+            self.artist_flat_nonempty = np.char.str_len(self.artist_flat) > 0
+            self.artist_owner = np.asarray(owners, dtype=np.intp)
+            self.artist_first = _str_array(first)
+
+    def subset(self, mask: np.ndarray) -> "CandidateFeatures":
+        """Return the features of the candidates selected by a boolean mask."""
+        sub = CandidateFeatures.__new__(CandidateFeatures)
+        sub.has_title, sub.has_artists = self.has_title, self.has_artists
+        sub.size = int(np.count_nonzero(mask))
+        if self.has_title:
+            for attr in ("title", "title_stripped", "title_exact", "title_stripped_len", "title_penalty"):
+                setattr(sub, attr, getattr(self, attr)[mask])
+        if self.has_artists:
+            sub.artists = self.artists[mask]
+            sub.artist_first = self.artist_first[mask]
+            flat_mask = mask[self.artist_owner]
+            remap = np.cumsum(mask) - 1
+            sub.artist_flat = self.artist_flat[flat_mask]
+            sub.artist_flat_nonempty = self.artist_flat_nonempty[flat_mask]
+            sub.artist_owner = remap[self.artist_owner[flat_mask]]
+        return sub
+
+
+class BatchScorer:
+    """Scores whole candidate sets against a target in one pass.
+
+    Gives exactly the same scores as SpotifyTarget.similarity_score_df, but the target is normalized once per
+    scorer, each candidate once per CandidateFeatures, and the per-pair rules are evaluated as NumPy column operations.
+    """
+
+    title_suffixes = [" (slowed)", " (sped up)", " (remix)", " (instrumental)", " (beat)", " (type beat)", " (free)",
+                      " [free]"]
+    remix_keywords = ["remix", "mashup", "cover", "x", "×"]
+    channel_like_keywords = ["records", "music only", "studios", "channel", "official", "cosmonaut", "cercle", "mix",
+                             "cinematic"]
+    expected_artists = ["clams casino", "post malone", "kanye west", "kendrick lamar"]
+
+    def __init__(self, target):
+        self.has_title = "title" in target
+        self.has_artists = "artists" in target
+
+        if self.has_title:
+            self.title = _normalize_string(target["title"])
+            self.title_stripped = _strip_suffixes(self.title)
+            self.title_exact = _normalize_for_exact(self.title_stripped)
+            self.title_words = [word for word in self.title_stripped.split() if len(word) > 3]
+            self.expected_artist = next((artist for artist in self.expected_artists if artist in self.title), None)
+
+        if self.has_artists:
+            self.artists = _normalize_string(target["artists"])
+            self.artist_list = [artist.strip() for artist in self.artists.split(",")]
+            self.is_channel_like = any(kw in self.artists for kw in self.channel_like_keywords)
+            self.looks_like_artist = not any(char.isdigit() for char in self.artists) or len(self.artists) > 10
+
+    @staticmethod
+    def features(titles: Optional[Sequence] = None, artists: Optional[Sequence] = None,
+                 size: int = 0) -> CandidateFeatures:
+        return CandidateFeatures(titles, artists, size)
+
+    def score(self, candidates: CandidateFeatures) -> np.ndarray:
+        """Exact similarity scores of all candidates, in candidate order."""
+        n = candidates.size
+        score = np.zeros(n, dtype=np.int64)
+        both_titles = self.has_title and candidates.has_title
+        both_artists = self.has_artists and candidates.has_artists
+
+        if both_titles:
+            title_equal = candidates.title_stripped == self.title_stripped
+            title_contained = (_contains(candidates.title_stripped, self.title_stripped)
+                               | _contains(self.title_stripped, candidates.title_stripped))
+            long_titles = (len(self.title_stripped) > 3) & (candidates.title_stripped_len > 3)
+            word_overlap = np.zeros(n, dtype=bool)
+            for word in self.title_words:
+                word_overlap |= _contains(candidates.title_stripped, word)
+
+            score += np.where(title_equal, 20,
+                              np.where(title_contained, np.where(long_titles, 5, 1),
+                                       np.where(word_overlap, 1, 0)))
+            if self.title_exact:
+                score += np.where(candidates.title_exact == self.title_exact, 10, 0)
+
+        if both_artists:
+            artist_matches = self._artist_match_counts(candidates)
+            artists_equal = candidates.artists == self.artists
+            artists_contained = _contains(candidates.artists, self.artists) | _contains(self.artists, candidates.artists)
+            score += np.where(artists_equal, 3, np.where(artists_contained, 1, artist_matches))
+
+        if candidates.has_title:
+            score += candidates.title_penalty
+
+        if candidates.has_artists and self.has_title and self.has_artists and self.expected_artist:
+            score += np.where(_contains(candidates.artist_first, self.expected_artist), 5, 0)
+
+        if both_titles and both_artists:
+            title_similar = title_equal | title_contained
+            artist_match_found = artist_matches > 0
+            if not self.is_channel_like and self.looks_like_artist:
+                score -= np.where(title_similar & ~artist_match_found, 5, 0)
+            score += np.where(title_similar & artist_match_found, 5, 0)
+
+        return score
+
+    def upper_bounds(self, candidates: CandidateFeatures) -> np.ndarray:
+        """Cheap upper bound of score(): only exact title equality and the title penalties are evaluated."""
+        n = candidates.size
+        bound = np.zeros(n, dtype=np.int64)
+        if self.has_title and candidates.has_title:
+            title_equal = candidates.title_stripped == self.title_stripped
+            bound += np.where(title_equal, 20 + (10 if self.title_exact else 0), 5 + 10)
+        if self.has_artists and candidates.has_artists:
+            bound += max(3, len(self.artist_list))
+        if candidates.has_title:
+            bound += candidates.title_penalty
+        if candidates.has_artists and self.has_title and self.has_artists and self.expected_artist:
+            bound += 5
+        if self.has_title and candidates.has_title and self.has_artists and candidates.has_artists:
+            bound += 5
+        return bound
+
+    def best(self, candidates: CandidateFeatures, floor: float = None) -> Tuple[Optional[int], float]:
+        """Index and score of the best candidate (first one on ties), like np.argmax over score().
+
+        With a floor, candidates whose upper bound cannot beat it are skipped; if no candidate scores above the
+        floor, (None, floor) is returned.
+        """
+        if candidates.size == 0:
+            return None, 0 if floor is None else floor
+
+        bounds = self.upper_bounds(candidates)
+        keep = np.ones(candidates.size, dtype=bool) if floor is None else bounds > floor
+        scores = np.full(candidates.size, -np.inf)
+
+        # Score the most promising tier first, then only what can still reach its best score
+        top_tier = keep & (bounds == bounds[keep].max()) if keep.any() else keep
+        if top_tier.any():
+            scores[top_tier] = self.score(candidates.subset(top_tier))
+            keep &= ~top_tier & (bounds >= scores.max())
+        if keep.any():
+            scores[keep] = self.score(candidates.subset(keep))
+
+        best_index = int(np.argmax(scores))
+        best_score = scores[best_index]
+        if floor is not None and not best_score > floor:
+            return None, floor
+        return best_index, int(best_score)
+
+    @staticmethod
+    def score_matrix(targets: Sequence, candidates: CandidateFeatures) -> np.ndarray:
+        """Scores of many targets x candidates, with every candidate normalized only once."""
+        matrix = np.zeros((len(targets), candidates.size), dtype=np.int64)
+        for row, target in enumerate(targets):
+            matrix[row] = BatchScorer(target).score(candidates)
+        return matrix
+
+    def _artist_match_counts(self, candidates: CandidateFeatures) -> np.ndarray:
+        # Number of target artists contained in (or containing) any of the candidate's artists
+        counts = np.zeros(candidates.size, dtype=np.int64)
+        if candidates.artist_flat.size == 0:
+            return counts
+        for artist in self.artist_list:
+            if not artist:
+                continue
+            pair_match = candidates.artist_flat_nonempty & (_contains(candidates.artist_flat, artist)
+                                                            | _contains(artist, candidates.artist_flat))
+            counts += np.bincount(candidates.artist_owner[pair_match], minlength=candidates.size) > 0
+        return counts
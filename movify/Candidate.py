@@ -0,0 +1,109 @@
+from typing import Hashable, Iterable, List, Optional
+
+# Score of an exact title match under both scorers; the default threshold for trusting a match without searching
+EXACT_TITLE_SCORE = 30
+
+
+class TrackCandidate:
+    """Compact record for a Spotify search result, built straight from the JSON response.
+
+    Supports item access (candidate["id"], candidate.get("title"), "artists" in candidate) so it can be used
+    wherever a pd.Series row was used before. `artists` keeps the "['A', 'B']" form used for scoring.
+    """
+
+    __slots__ = ("id", "title", "artist_names", "_artists", "duration_ms", "sources")
+    fields = ("id", "title", "artists")
+
+    def __init__(self, id: Optional[str], title: Optional[str], artist_names: tuple = (), duration_ms: int = None,
+                 artists: str = None):
+        self.id = id
+        self.title = title
+        self.artist_names = artist_names
+        self.duration_ms = duration_ms
+        self._artists = artists
+        self.sources: tuple = ()  # Search variations that returned this candidate (set by CandidatePool)
+
+    @property
+    def artists(self) -> str:
+        # Same string as str(YoutubeMusicSource.parse_artist(...)), built once and only when needed
+        if self._artists is None:
+            self._artists = str(list(self.artist_names))
+        return self._artists
+
+    @classmethod
+    def from_json(cls, item: dict) -> "TrackCandidate":
+        return cls(item.get("id"), item.get("name"), tuple(artist["name"] for artist in item.get("artists") or ()),
+                   item.get("duration_ms"))
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict]) -> List["TrackCandidate"]:
+        return [cls.from_json(item) for item in items if item is not None]
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.fields else default
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def keys(self):
+        return list(self.fields)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class AlbumCandidate(TrackCandidate):
+    """Compact record for a Spotify album search result."""
+
+    __slots__ = ("_type", "year")
+    fields = ("id", "title", "artists", "_type", "year")
+
+    def __init__(self, id: Optional[str], title: Optional[str], artist_names: tuple = (), _type: str = None,
+                 year: str = None, artists: str = None):
+        super().__init__(id, title, artist_names, artists=artists)
+        self._type = _type
+        self.year = year
+
+    @classmethod
+    def from_json(cls, item: dict) -> "AlbumCandidate":
+        return cls(item.get("id"), item.get("name"), tuple(artist["name"] for artist in item.get("artists") or ()),
+                   item.get("album_type"), str(item.get("release_date"))[:4])
+
+
+class CandidatePool:
+    """Search results of all query variations for one song, deduplicated by Spotify ID.
+
+    add() returns only the candidates not seen before, so each distinct track is scored once however many
+    variations return it; the variations that surfaced a candidate are kept in its `sources`.
+    """
+
+    def __init__(self):
+        self.candidates: dict[Hashable, TrackCandidate] = {}
+        self.returned = 0  # Search results added, duplicates included
+
+    def add(self, candidates: Iterable[TrackCandidate], source: str) -> List[TrackCandidate]:
+        new = []
+        for candidate in candidates:
+            self.returned += 1
+            key = candidate.id if candidate.id is not None else ("no id", len(self.candidates))
+            pooled = self.candidates.get(key)
+            if pooled is None:
+                pooled = self.candidates[key] = candidate
+                new.append(candidate)
+            if source not in pooled.sources:
+                pooled.sources += (source,)
+        return new
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __iter__(self):
+        return iter(self.candidates.values())
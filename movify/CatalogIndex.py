@@ -0,0 +1,256 @@
+from typing import Iterator, List, Optional, Tuple
+import ast
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .BatchScorer import BatchScorer
+from .Candidate import EXACT_TITLE_SCORE, TrackCandidate
+
+
+class CatalogIndex:
+    """Offline index over a local Spotify catalog file, used to match songs without calling the search API.
+
+    The catalog (CSV, JSON lines or Parquet with id, title, artists and duration columns) is turned into an inverted
+    index from normalized title/artist tokens to catalog rows. Everything is stored as .npy files next to the catalog
+    and memory-mapped on load, so opening a large index is instant and only the pages that are looked up are read.
+    Tokens are stored as 64-bit hashes; a rare collision only adds a candidate, which scoring then rejects.
+    Candidates are scored with BatchScorer (the rules of SpotifyTarget.similarity_score_df) unless another scorer,
+    such as FuzzyScorer, is given.
+    """
+
+    default_threshold = EXACT_TITLE_SCORE
+    index_version = 1
+
+    _token_pattern = re.compile(r"\w+")
+
+    def __init__(self, catalog_path: str, index_dir: str = None, threshold: float = default_threshold,
+                 candidates: int = 50, max_postings: int = 20_000, scorer=BatchScorer):
+        self.catalog_path = catalog_path
+        self.index_dir = index_dir or catalog_path + ".index"
+        self.threshold = threshold
+        self.candidates = candidates
+        self.max_postings = max_postings
+        self.scorer = scorer
+
+        self.build_seconds = None  # Set when the index was (re)built by this instance
+        self.lookups = 0
+        self.resolved = 0
+        self._latencies: List[float] = []
+        self._lock = threading.Lock()
+
+        if not self._is_current():
+            self.build()
+        self._load()
+
+    # ---------------------- Lookup ----------------------
+    def match(self, song) -> Tuple[Optional[TrackCandidate], float]:
+        """Best catalog candidate for a song and its score, or (None, 0) if no candidate scores above 0."""
+        started = time.perf_counter()
+        candidates = self.lookup(song.get("title"), song.get("artists"))
+        best_candidate, best_score = None, 0
+        if candidates:
+            features = self.scorer.features([c.title for c in candidates], [c.artists for c in candidates])
+            best_index, best_score = self.scorer(song).best(features, floor=0)
+            best_candidate = candidates[best_index] if best_index is not None else None
+
+        with self._lock:
+            self.lookups += 1
+            if best_candidate is not None and best_score >= self.threshold:
+                self.resolved += 1
+            self._latencies.append(time.perf_counter() - started)
+        return best_candidate, best_score
+
+    def lookup(self, title, artists=None) -> List[TrackCandidate]:
+        """Catalog rows sharing the most title (and then artist) tokens with the song, at most `candidates` rows."""
+        title_postings = [p for p in (self._postings(h) for h in self._hashes(title)) if len(p)]
+        if not title_postings:
+            return []
+        # Very common tokens ("the", "love") add little but cost a lot, unless they are all there is
+        rare = [p for p in title_postings if len(p) <= self.max_postings]
+        title_postings = rare or [min(title_postings, key=len)]
+
+        rows, counts = np.unique(np.concatenate(title_postings), return_counts=True)
+        counts = counts * 2
+        for artist_hash in self._hashes(artists):
+            postings = self._postings(artist_hash)
+            if 0 < len(postings) <= self.max_postings:
+                counts += np.isin(rows, postings, assume_unique=True)
+
+        top = rows[np.argsort(-counts, kind="stable")[:self.candidates]]
+        return [self.candidate(int(row)) for row in top]
+
+    def candidate(self, row: int) -> TrackCandidate:
+        duration = int(self._durations[row])
+        return TrackCandidate(self._text("ids", row), self._text("titles", row),
+                              duration_ms=duration if duration >= 0 else None, artists=self._text("artists", row))
+
+    def __len__(self):
+        return len(self._durations)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.index_dir, name)) for name in os.listdir(self.index_dir))
+
+    def summary(self) -> str:
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+        built = f"built in {self.build_seconds:.1f}s" if self.build_seconds is not None else "loaded"
+        text = (f"📚 Catalog: {len(self)} tracks, index {self.size_bytes / 1e6:.1f} MB ({built}), "
+                f"{self.resolved}/{self.lookups} songs resolved locally")
+        if len(latencies):
+            text += (f", lookup {np.percentile(latencies, 50):.2f} ms median / "
+                     f"{np.percentile(latencies, 95):.2f} ms p95")
+        return text
+
+    # ---------------------- Building ----------------------
+    def build(self):
+        """(Re)build the index files from the catalog."""
+        started = time.perf_counter()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        token_hashes, token_rows = [], []
+        texts = {"ids": [], "titles": [], "artists": []}
+        durations = []
+        hash_memo: dict[str, int] = {}
+        row = 0
+        for chunk in self._read_chunks():
+            for track_id, title, artists, duration in self._rows(chunk):
+                texts["ids"].append(track_id)
+                texts["titles"].append(title)
+                texts["artists"].append(artists)
+                durations.append(duration)
+                for token in set(self._tokens(title)) | set(self._tokens(artists)):
+                    token_hash = hash_memo.get(token)
+                    if token_hash is None:
+                        token_hash = hash_memo[token] = self._hash(token)
+                    token_hashes.append(token_hash)
+                    token_rows.append(row)
+                row += 1
+
+        token_hashes = np.array(token_hashes, dtype=np.int64)
+        token_rows = np.array(token_rows, dtype=np.int32)
+        order = np.argsort(token_hashes, kind="stable")  # Keeps the rows of every token ascending
+        vocabulary, starts = np.unique(token_hashes[order], return_index=True)
+        offsets = np.append(starts, len(order)).astype(np.int64)
+
+        self._save("vocabulary", vocabulary)
+        self._save("offsets", offsets)
+        self._save("postings", token_rows[order])
+        self._save("durations", np.array(durations, dtype=np.int32))
+        for name, values in texts.items():
+            encoded = [value.encode("utf-8") for value in values]
+            self._save(name, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            self._save(name + "_offsets", np.cumsum([0] + [len(value) for value in encoded], dtype=np.int64))
+
+        self.build_seconds = time.perf_counter() - started
+        stat = os.stat(self.catalog_path)
+        with open(os.path.join(self.index_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": self.index_version, "source_size": stat.st_size, "source_mtime": stat.st_mtime,
+                       "rows": row, "build_seconds": self.build_seconds}, f)
+
+    def _read_chunks(self, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        extension = os.path.splitext(self.catalog_path)[1].lower()
+        if extension == ".parquet":
+            yield pd.read_parquet(self.catalog_path)  # Requires pyarrow or fastparquet
+        elif extension in (".jsonl", ".ndjson", ".json"):
+            yield from pd.read_json(self.catalog_path, lines=True, chunksize=chunksize, dtype=False)
+        else:
+            yield from pd.read_csv(self.catalog_path, chunksize=chunksize, dtype=str, keep_default_na=False)
+
+    @classmethod
+    def _rows(cls, chunk: pd.DataFrame):
+        """Yield (id, title, artists as "['A', 'B']", duration in ms or -1) for every usable catalog row."""
+        title_column = "title" if "title" in chunk.columns else "name"
+        artists_column = "artists" if "artists" in chunk.columns else "artist"
+        duration_column = next((c for c in ("duration_ms", "duration") if c in chunk.columns), None)
+        if "id" not in chunk.columns or title_column not in chunk.columns:
+            raise ValueError("A catalog needs at least 'id' and 'title' columns")
+
+        ids = chunk["id"].tolist()
+        titles = chunk[title_column].tolist()
+        artists = chunk[artists_column].tolist() if artists_column in chunk.columns else [None] * len(chunk)
+        durations = chunk[duration_column].tolist() if duration_column else [None] * len(chunk)
+        for track_id, title, artist_value, duration in zip(ids, titles, artists, durations):
+            if not isinstance(track_id, str) or not track_id or not isinstance(title, str):
+                continue
+            yield track_id, title, str(cls._artist_names(artist_value)), cls._duration_ms(duration)
+
+    @staticmethod
+    def _artist_names(value) -> List[str]:
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return [str(name) for name in value]
+        if not isinstance(value, str) or not value.strip():
+            return []
+        value = value.strip()
+        if value.startswith("["):
+            try:
+                return [str(name) for name in ast.literal_eval(value)]
+            except (ValueError, SyntaxError):
+                pass
+        return [name.strip() for name in re.split(r"[;,]", value) if name.strip()]
+
+    @staticmethod
+    def _duration_ms(value) -> int:
+        if isinstance(value, str) and ":" in value:
+            try:
+                minutes, seconds = value.rsplit(":", 1)
+                return (int(minutes) * 60 + int(seconds)) * 1000
+            except ValueError:
+                return -1
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return -1
+
+    # ---------------------- Storage ----------------------
+    def _is_current(self) -> bool:
+        try:
+            with open(os.path.join(self.index_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            stat = os.stat(self.catalog_path)
+        except (OSError, ValueError):
+            return False
+        return (meta.get("version") == self.index_version and meta.get("source_size") == stat.st_size
+                and meta.get("source_mtime") == stat.st_mtime)
+
+    def _save(self, name: str, array: np.ndarray):
+        np.save(os.path.join(self.index_dir, name + ".npy"), array)
+
+    def _load(self):
+        def load(name):
+            return np.load(os.path.join(self.index_dir, name + ".npy"), mmap_mode="r")
+
+        self._vocabulary = load("vocabulary")
+        self._offsets = load("offsets")
+        self._postings_array = load("postings")
+        self._durations = load("durations")
+        self._texts = {name: (load(name), load(name + "_offsets")) for name in ("ids", "titles", "artists")}
+
+    def _text(self, name: str, row: int) -> str:
+        blob, offsets = self._texts[name]
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def _postings(self, token_hash: int) -> np.ndarray:
+        position = np.searchsorted(self._vocabulary, token_hash)
+        if position == len(self._vocabulary) or self._vocabulary[position] != token_hash:
+            return self._postings_array[:0]
+        return self._postings_array[self._offsets[position]:self._offsets[position + 1]]
+
+    @classmethod
+    def _tokens(cls, text) -> List[str]:
+        return cls._token_pattern.findall(text.lower()) if isinstance(text, str) else []
+
+    @classmethod
+    def _hashes(cls, text) -> List[int]:
+        return [cls._hash(token) for token in dict.fromkeys(cls._tokens(text))]
+
+    @staticmethod
+    def _hash(token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
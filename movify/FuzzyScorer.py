@@ -0,0 +1,177 @@
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import re
+
+from .BatchScorer import BatchScorer, _normalize_for_exact, _normalize_string, _strip_suffixes
+
+# rapidfuzz computes the edit distance in C; without it the same numbers come from a bit-parallel Python LCS
+try:
+    from rapidfuzz.distance import Indel as _rapidfuzz_indel
+except ImportError:
+    _rapidfuzz_indel = None
+
+_word_pattern = re.compile(r"\w+")
+
+
+class Signature:
+    """Precomputed form of one normalized string: its words, its character trigrams (per word, padded like
+    pg_trgm) and, on first use, the per-character bit masks of the pure-Python LCS."""
+
+    __slots__ = ("text", "tokens", "trigrams", "_masks")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = frozenset(_word_pattern.findall(text))
+        self.trigrams = frozenset(padded[i:i + 3] for padded in (f"  {token} " for token in self.tokens)
+                                  for i in range(len(padded) - 2))
+        self._masks = None
+
+    @property
+    def masks(self) -> dict:
+        if self._masks is None:
+            masks = {}
+            for position, char in enumerate(self.text):
+                masks[char] = masks.get(char, 0) | (1 << position)
+            self._masks = masks
+        return self._masks
+
+    def __repr__(self):
+        return f"Signature({self.text!r})"
+
+
+@lru_cache(maxsize=1 << 16)
+def signature(text: str) -> Signature:
+    """Signature of a normalized string, computed once per process for recurring titles and artists."""
+    return Signature(text)
+
+
+def lcs_length(a: Signature, b: Signature) -> int:
+    """Length of the longest common subsequence of two strings."""
+    if not a.text or not b.text:
+        return 0
+    if _rapidfuzz_indel is not None and FuzzyScorer.backend == "rapidfuzz":
+        return (len(a.text) + len(b.text) - _rapidfuzz_indel.distance(a.text, b.text)) // 2
+    if len(a.text) < len(b.text):
+        a, b = b, a  # Iterate over the shorter string
+    # Hyyrö's bit-parallel LCS: one pass over b with len(a)-bit integers
+    masks = a.masks
+    full = (1 << len(a.text)) - 1
+    row = full
+    for char in b.text:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(a.text) - row.bit_count()
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Normalized Indel similarity in [0, 1] (rapidfuzz's fuzz.ratio / 100): 1 for equal strings."""
+    total = len(a.text) + len(b.text)
+    return 2 * lcs_length(a, b) / total if total else 0.0
+
+
+def containment(part: Signature, whole: Signature) -> float:
+    """Share of the trigrams of part that occur in whole: 1 if part appears in whole, even among other words."""
+    if not part.trigrams:
+        return 0.0
+    return len(part.trigrams & whole.trigrams) / len(part.trigrams)
+
+
+@lru_cache(maxsize=1 << 16)
+def _title_features(title) -> Tuple[Signature, Signature]:
+    # (title without suffixes/parentheticals/punctuation, full lower-case title)
+    normalized = _normalize_string(title)
+    return signature(_normalize_for_exact(_strip_suffixes(normalized))), signature(normalized)
+
+
+@lru_cache(maxsize=1 << 16)
+def _artist_features(artists) -> Tuple[Signature, ...]:
+    names = (_normalize_for_exact(artist.strip()) for artist in _normalize_string(artists).split(","))
+    return tuple(signature(name) for name in names if name)
+
+
+class FuzzyScorer:
+    """Similarity scorer built on edit distance and trigram overlap instead of substring rules.
+
+    Titles score by their normalized Indel similarity, or by how much of one title's trigrams occur in the other
+    (for uploads like "Channel - Artist - Title"); artists by their best pairwise similarity, or by appearing in the
+    target title. Every distinct title and artist string is normalized into a Signature once per process.
+
+    Scores use the scale of BatchScorer, so thresholds keep their meaning: an exact title is worth 30, matching
+    artists another 8. Unlike the rules, near misses (typos, "&" vs "and", missing words) still earn partial
+    points instead of none, so fewer songs end up in the title-only fallback search.
+    Drop-in for BatchScorer: FuzzyScorer(target).best(FuzzyScorer.features(titles, artists), floor).
+    """
+
+    backend = "rapidfuzz" if _rapidfuzz_indel is not None else "python"
+
+    title_points = 30
+    artist_points = 8
+    mismatch_penalty = 5
+    min_title_similarity = 0.4  # Titles below this similarity earn nothing; the points grow linearly up to 1
+    min_artist_similarity = 0.5
+    partial_weight = 0.85  # A title found inside a longer one counts a bit less than an equal title
+    penalty_words = {"remix": 3, "mashup": 3, "cover": 3, "x": 3, "×": 3, "feat": 1, "ft": 1}
+
+    def __init__(self, target):
+        self.has_title = "title" in target
+        self.has_artists = "artists" in target
+        self.title, self.full_title = _title_features(target["title"]) if self.has_title else (None, None)
+        self.artists = _artist_features(target["artists"]) if self.has_artists else ()
+        normalized_artists = _normalize_string(target["artists"]) if self.has_artists else ""
+        self.is_channel_like = any(kw in normalized_artists for kw in BatchScorer.channel_like_keywords)
+        self.looks_like_artist = not any(char.isdigit() for char in normalized_artists) or len(normalized_artists) > 10
+
+    @staticmethod
+    def features(titles: Optional[Sequence] = None, artists: Optional[Sequence] = None,
+                 size: int = 0) -> List[tuple]:
+        """Per candidate (title signatures or None, artist signatures or None)."""
+        size = len(titles) if titles is not None else len(artists) if artists is not None else size
+        return [(_title_features(titles[i]) if titles is not None else None,
+                 _artist_features(artists[i]) if artists is not None else None) for i in range(size)]
+
+    def score(self, candidates: List[tuple]) -> List[float]:
+        return [self._score(title, artists) for title, artists in candidates]
+
+    def best(self, candidates: List[tuple], floor: float = None) -> Tuple[Optional[int], float]:
+        """Index and score of the best candidate (first one on ties). With a floor, (None, floor) if no candidate
+        scores above it."""
+        if not candidates:
+            return None, 0 if floor is None else floor
+        scores = self.score(candidates)
+        best_score = max(scores)
+        if floor is not None and not best_score > floor:
+            return None, floor
+        return scores.index(best_score), best_score
+
+    def _score(self, title: Optional[tuple], artists: Optional[tuple]) -> float:
+        score = 0.0
+        title_similarity = 0.0
+        if self.has_title and title is not None:
+            candidate_title, candidate_full_title = title
+            title_similarity = similarity(self.title, candidate_title)
+            if len(candidate_title.text) > 3 and len(self.title.text) > 3 and title_similarity < 1:
+                title_similarity = max(title_similarity,
+                                       self.partial_weight * containment(candidate_title, self.title),
+                                       self.partial_weight * containment(self.title, candidate_title))
+            score += self.title_points * self._scale(title_similarity, self.min_title_similarity)
+            # Remix/cover/featuring words of the candidate that the target does not mention
+            score -= sum(points for word, points in self.penalty_words.items()
+                         if word in candidate_full_title.tokens and word not in self.full_title.tokens)
+
+        if self.has_artists and artists is not None and self.artists:
+            artist_similarity = max((similarity(a, b) for a in self.artists for b in artists), default=0.0)
+            if self.has_title and artist_similarity < 1:
+                # Uploads by channels often name the artist in the title instead
+                artist_similarity = max([artist_similarity] + [self.partial_weight * containment(b, self.full_title)
+                                                               for b in artists if len(b.text) > 3])
+            score += self.artist_points * self._scale(artist_similarity, self.min_artist_similarity)
+
+            if title_similarity >= 0.8 and artist_similarity < self.min_artist_similarity \
+                    and not self.is_channel_like and self.looks_like_artist:
+                score -= self.mismatch_penalty
+
+        return round(score, 2)
+
+    @staticmethod
+    def _scale(value: float, minimum: float) -> float:
+        return max(0.0, (value - minimum) / (1 - minimum))
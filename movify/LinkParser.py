@@ -0,0 +1,226 @@
+from array import array
+from typing import Iterable, Iterator, Mapping, Optional, Tuple
+import io
+import os
+import re
+import sys
+
+
+class Link:
+    """One YouTube link in canonical form.
+
+    Every way of writing a link (youtu.be, youtube.com, music.youtube.com, m.youtube.com, /shorts/ and /embed/ paths,
+    extra parameters like &si= or &t=) maps to the same key: ("playlist", playlist ID, None), ("video", video ID, None)
+    or ("index", playlist ID, position) for a playlist position link without a video (watch?list=...&index=N), which
+    is resolved from the playlist. A video link that also names a playlist (watch?v=...&list=...) is the video, as
+    before. Links that are none of these are "unsupported" and have no fetch_url.
+    """
+
+    __slots__ = ("kind", "id", "index", "url")
+
+    PLAYLIST, VIDEO, INDEX, UNSUPPORTED = "playlist", "video", "index", "unsupported"
+
+    def __init__(self, kind: str, id: Optional[str], index: Optional[int] = None, url: str = None):
+        self.kind = kind
+        self.id = id
+        self.index = index  # 1-based position in the playlist of an index link
+        self.url = url  # The link as written
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.id if self.kind != self.UNSUPPORTED else self.url, self.index)
+
+    @property
+    def is_playlist(self) -> bool:
+        return self.kind == self.PLAYLIST
+
+    @property
+    def fetch_url(self) -> Optional[str]:
+        """Canonical URL of the link, None if it is unsupported."""
+        if self.kind == self.PLAYLIST:
+            return f"https://music.youtube.com/playlist?list={self.id}"
+        if self.kind == self.VIDEO:
+            return f"https://music.youtube.com/watch?v={self.id}"
+        if self.kind == self.INDEX:
+            return f"https://music.youtube.com/watch?list={self.id}&index={self.index}"
+        return None
+
+    def __eq__(self, other):
+        return isinstance(other, Link) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"Link{self.key}"
+
+
+class _HashSet:
+    """Set of 64-bit hashes in one flat array: 8-16 bytes per entry instead of about 70 for a set of ints."""
+
+    def __init__(self, capacity: int = 64):
+        self._slots = array("Q", bytes(8 * capacity))
+        self._size = 0
+
+    def add(self, value) -> bool:
+        """Add the hash of value; False if it was already present."""
+        value = hash(value) & 0xFFFFFFFFFFFFFFFF or 1  # 0 marks an empty slot
+        slots = self._slots
+        mask = len(slots) - 1
+        slot = value & mask
+        while slots[slot]:
+            if slots[slot] == value:
+                return False
+            slot = (slot + 1) & mask
+        slots[slot] = value
+        self._size += 1
+        if 2 * self._size > len(slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        mask = len(self._slots) - 1
+        for value in old:
+            if value:
+                slot = value & mask
+                while self._slots[slot]:
+                    slot = (slot + 1) & mask
+                self._slots[slot] = value
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class LinkParser:
+    """Incremental parser for playlist sections: a line starting with '#' names a playlist, the YouTube links below
+    it are its songs. Blank lines, other text and links before the first header are ignored.
+
+    Files (or stdin), in-memory text and {title: [links]} mappings are read line by line and yielded lazily as
+    (section title, Link) items, so inputs of any length are parsed without holding them in memory. A link repeated
+    within a section is dropped; one of an earlier section is kept (it belongs to both playlists) and counted in
+    `repeats`. One parser can read several inputs, which then count as one for these statistics. Seen links are
+    remembered as 64-bit hashes only.
+    """
+
+    header_pattern = re.compile(r"^\s*#\s*(.+?)\s*$")
+    link_pattern = re.compile(r"(?:https?://)?(?:[A-Za-z0-9-]+\.)*(?P<host>youtube\.com|youtu\.be)(?::\d+)?"
+                              r"(?P<path>/[^?#]*)?(?:\?(?P<query>[^#]*))?(?:#.*)?$", re.IGNORECASE)
+    id_pattern = re.compile(r"^[A-Za-z0-9_-]+$")
+    video_paths = ("/shorts/", "/embed/", "/live/", "/v/")
+
+    def __init__(self):
+        self.sections = 0  # Sections with at least one link
+        self.links = 0  # Links yielded
+        self.duplicates = 0  # Links dropped because they were already in their section
+        self.repeats = 0  # Links yielded that an earlier section already had
+        self._seen = _HashSet()
+        self._section_seen = _HashSet()
+
+    # ---------------------- Inputs ----------------------
+    def parse_file(self, path: str) -> Iterator[Tuple[str, Link]]:
+        """Sections of a text file, or of stdin if path is '-'."""
+        if path == "-":
+            return self.parse_lines(sys.stdin)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        return self._parse_path(path)
+
+    def parse_text(self, content: str) -> Iterator[Tuple[str, Link]]:
+        return self.parse_lines(io.StringIO(content))
+
+    def parse_lines(self, lines: Iterable[str]) -> Iterator[Tuple[str, Link]]:
+        title = None
+        for raw_line in lines:
+            line = raw_line.strip()
+            if not line:
+                continue
+            if line[0] == "#":
+                header_match = self.header_pattern.match(line)
+                if header_match:
+                    title = self._start_section(header_match.group(1))
+            elif title is not None:
+                match = self.link_pattern.match(line)
+                if match is not None:  # Other text is ignored
+                    link = self._accept(self._from_match(match))
+                    if link is not None:
+                        yield title, link
+
+    def parse_mapping(self, mapping: Mapping[str, Iterable]) -> Iterator[Tuple[str, Link]]:
+        """Sections of a {playlist title: [links]} mapping; entries that are not YouTube links are yielded as
+        unsupported links."""
+        for title, urls in mapping.items():
+            self._start_section(title)
+            for url in urls:
+                link = self._accept(self.canonical(url))
+                if link is not None:
+                    yield title, link
+
+    # ---------------------- Canonical form ----------------------
+    @classmethod
+    def canonical(cls, url) -> Link:
+        """The canonical Link of a URL (with or without scheme)."""
+        match = cls.link_pattern.match(url.strip()) if isinstance(url, str) else None
+        if match is None:
+            return Link(Link.UNSUPPORTED, None, url=str(url).strip())
+        return cls._from_match(match)
+
+    @classmethod
+    def _from_match(cls, match: re.Match) -> Link:
+        url = match.string
+        host, path, query_string = match.group("host").lower(), match.group("path") or "", match.group("query")
+        path = path.rstrip("/")
+        route = path.lower()  # IDs in the path keep their case
+        query = {}
+        if query_string:
+            for pair in query_string.split("&"):
+                name, _, value = pair.partition("=")
+                query.setdefault(name, value)  # The first value wins, as with parse_qs
+
+        identifier = cls._identifier
+        playlist_id, video_id = identifier(query.get("list")), None
+        if host == "youtu.be":
+            video_id = identifier(path.lstrip("/").split("/")[0])
+        elif route == "/watch":
+            video_id = identifier(query.get("v"))
+        elif route == "/playlist":
+            return Link(Link.PLAYLIST if playlist_id else Link.UNSUPPORTED, playlist_id, url=url)
+        elif route.startswith(cls.video_paths):
+            video_id = identifier(path.split("/")[2])
+        else:
+            return Link(Link.UNSUPPORTED, None, url=url)
+
+        if video_id:
+            return Link(Link.VIDEO, video_id, url=url)  # &list= and &index= only tell where the video was played
+        index = query.get("index")
+        if playlist_id and index and index.isdigit() and int(index) > 0:
+            return Link(Link.INDEX, playlist_id, int(index), url)
+        if playlist_id:
+            return Link(Link.PLAYLIST, playlist_id, url=url)
+        return Link(Link.UNSUPPORTED, None, url=url)
+
+    # ---------------------- Helpers ----------------------
+    @classmethod
+    def _identifier(cls, value: Optional[str]) -> Optional[str]:
+        return value if value and cls.id_pattern.match(value) else None
+
+    def _parse_path(self, path: str) -> Iterator[Tuple[str, Link]]:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from self.parse_lines(f)
+
+    def _start_section(self, title: str) -> str:
+        self._section_seen = _HashSet()
+        return title
+
+    def _accept(self, link: Link) -> Optional[Link]:
+        key = link.key
+        if not self._section_seen.add(key):
+            self.duplicates += 1
+            return None
+        if len(self._section_seen) == 1:
+            self.sections += 1  # First link of a section; sections without links do not count
+        if not self._seen.add(key):
+            self.repeats += 1
+        self.links += 1
+        return link
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+from typing import Optional
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MatchCache:
+    """Persistent cache of Spotify match decisions, keyed on the scorer that decided them and a normalized
+    (title, artists) pair.
+
+    A small in-memory LRU sits in front of a single-file SQLite store. Entries expire after `ttl` seconds and the
+    store is kept below `max_entries` rows by evicting the least recently used ones; hits on the in-memory tier
+    update the access time as well, written to the store in batches.
+    """
+
+    default_path = ".movify_match_cache.sqlite"
+    default_ttl = 30 * 24 * 3600  # 30 days
+    evict_every = 1000  # Check the size bound every n writes
+    busy_timeout = 60  # Seconds to wait for a write lock held by another process sharing the file
+
+    def __init__(self, path: str = default_path, ttl: float = default_ttl, max_entries: int = 200_000,
+                 memory_entries: int = 10_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touched: dict[str, float] = {}  # Key -> access time of memory hits not yet written to the store
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=self.busy_timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS matches ("
+            " key TEXT PRIMARY KEY, spotify_id TEXT NOT NULL, title TEXT, artists TEXT, score REAL NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS matches_accessed ON matches (accessed)")
+
+    @staticmethod
+    def normalize_artists(artists) -> list[str]:
+        """Turn a list of names, a "['A', 'B']" repr or an "A, B" string into lowercase artist names."""
+        if isinstance(artists, (list, tuple)):
+            names = [str(a) for a in artists]
+        else:
+            names = str(artists).strip().strip("[]").split(",")
+        names = [re.sub(r"\s+", " ", name.strip().strip("'\"").strip()).lower() for name in names]
+        return [name for name in names if name]
+
+    @staticmethod
+    def key(title, artists) -> str:
+        normalized_title = re.sub(r"\s+", " ", str(title)).strip().lower()
+        return normalized_title + "\x1f" + "\x1e".join(MatchCache.normalize_artists(artists))
+
+    @classmethod
+    def _scored_key(cls, scorer: str, title, artists) -> str:
+        # Scorers can decide differently, so each keeps its own entries
+        return scorer + "\x1d" + cls.key(title, artists)
+
+    def get(self, title, artists, scorer: str = "rules") -> Optional[dict]:
+        """Return the match cached by this scorer as {"id", "title", "artists", "score"} or None."""
+        key = self._scored_key(scorer, title, artists)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry["created"] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    if len(self._touched) >= self.evict_every:
+                        try:
+                            self._flush_touched()
+                        except sqlite3.Error:  # E.g. locked by another process: the hit stands, retry later
+                            pass
+                    self.hits += 1
+                    return entry
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT spotify_id, title, artists, score, created FROM matches WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[4] > self.ttl:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE matches SET accessed = ? WHERE key = ?", (now, key))
+            entry = {"id": row[0], "title": row[1], "artists": row[2], "score": row[3], "created": row[4]}
+            self._remember(key, entry)
+            self.hits += 1
+            return entry
+
+    def put(self, title, artists, spotify_id: str, score: float, match_title: str = None, match_artists=None,
+            scorer: str = "rules"):
+        key = self._scored_key(scorer, title, artists)
+        now = time.time()
+        entry = {"id": spotify_id, "title": match_title, "artists": None if match_artists is None else
+                 str(match_artists), "score": float(score), "created": now}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO matches (key, spotify_id, title, artists, score, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, entry["id"], entry["title"], entry["artists"], entry["score"], now, now)
+            )
+            self._remember(key, entry)
+            self._touched.pop(key, None)
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict_oversize()
+
+    def prune(self) -> int:
+        """Drop expired entries and enforce the size bound. Returns the number of removed entries."""
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            removed = self._conn.execute("DELETE FROM matches WHERE created < ?", (cutoff,)).rowcount
+            removed += self._evict_oversize()
+            self._memory.clear()
+            self._touched.clear()
+        self._conn.execute("VACUUM")
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM matches")
+            self._memory.clear()
+            self._touched.clear()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            try:
+                self._evict_oversize()
+            except sqlite3.Error as e:  # E.g. locked by another process: trimming waits for the next run
+                logger.warning(f"Match cache could not be trimmed on close: {e}")
+            finally:
+                self._conn.close()
+
+    def _remember(self, key: str, entry: dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE matches SET accessed = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+
+    def _evict_oversize(self) -> int:
+        self._flush_touched()  # Evict by the latest access times, including those of memory hits
+        count = self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow <= 0:
+            return 0
+        return self._conn.execute(
+            "DELETE FROM matches WHERE key IN (SELECT key FROM matches ORDER BY accessed ASC LIMIT ?)", (overflow,)
+        ).rowcount
@@ -0,0 +1,174 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import threading
+import time
+
+import spotipy
+from spotipy import SpotifyException
+
+
+class RateLimitError(Exception):
+    """Spotify kept answering 429 Too Many Requests after all retries. The request did not fail on its merits, so
+    its outcome must not be recorded as a miss."""
+
+
+class RequestScheduler:
+    """Single gate for all Spotify API calls of a run, shared by every worker thread (or asyncio task).
+
+    - A token bucket caps the sustained request rate (`rate` per second, bursts of at most `burst`).
+    - A 429 response pauses all requests for its Retry-After, not just the request that received it.
+    - The number of requests in flight adapts AIMD-style: it grows by about one per window of successful requests
+      and is halved on throttling, so the run settles just below the point where Spotify starts throttling.
+    Throttled requests are retried; after `max_retries` throttled attempts RateLimitError is raised.
+    """
+
+    # Statuses spotipy may retry on its own; 429 is left out so it reaches the scheduler with its Retry-After header
+    spotipy_retry_codes = (500, 502, 503, 504)
+
+    def __init__(self, rate: float = 20.0, burst: int = None, max_concurrency: int = 16, min_concurrency: int = 1,
+                 max_retries: int = 8, default_retry_after: float = 1.0, metrics=None):
+        self.rate = rate
+        self.metrics = metrics  # Optional RunMetrics receiving every API call made through the scheduler
+        self.burst = burst or max(1, int(rate))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.default_retry_after = default_retry_after
+
+        self.concurrency = float(max_concurrency)
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.throttle_wait = 0.0  # Total seconds of global pauses requested by Retry-After
+
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs) once the scheduler admits it, retrying it while Spotify throttles."""
+        for attempt in range(self.max_retries + 1):
+            with self._condition:
+                while True:
+                    wait = self._reserve()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+            try:
+                result = func(*args, **kwargs)
+            except SpotifyException as e:
+                if not self._release(e):
+                    raise
+                continue
+            except BaseException:
+                self._release(None)
+                raise
+            self._release(None)
+            return result
+        raise RateLimitError(f"Spotify is still rate limiting after {self.max_retries} retries")
+
+    async def call_async(self, func: Callable[[], Awaitable]):
+        """Async call(): func() returns a new awaitable per attempt."""
+        for attempt in range(self.max_retries + 1):
+            while True:
+                with self._condition:
+                    wait = self._reserve()
+                if wait <= 0:
+                    break
+                await asyncio.sleep(min(wait, 0.05))
+            try:
+                result = await func()
+            except SpotifyException as e:
+                if not self._release(e):
+                    raise
+                continue
+            except BaseException:
+                self._release(None)
+                raise
+            self._release(None)
+            return result
+        raise RateLimitError(f"Spotify is still rate limiting after {self.max_retries} retries")
+
+    def summary(self) -> str:
+        return (f"🚦 Spotify API: {self.requests} requests, {self.throttled} throttled (429), "
+                f"{self.throttle_wait:.1f}s paused, concurrency settled at {int(self.concurrency)}")
+
+    def _reserve(self) -> float:
+        """Admit one request if possible and return 0, else return how long to wait. Caller holds the lock."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self.concurrency):
+            return 0.05  # Woken up earlier by a finishing request
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        self._in_flight += 1
+        self.requests += 1
+        return 0
+
+    def _release(self, error: Optional[SpotifyException]) -> bool:
+        """Finish a request and adapt. Returns True if it was throttled and should be retried."""
+        throttled = error is not None and error.http_status == 429
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.retries += 1
+                now = time.monotonic()
+                pause = self._retry_after(error)
+                if now >= self._paused_until:
+                    # Halve once per throttling episode, not once per request that was in flight
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                    self.throttle_wait += pause
+                self._paused_until = max(self._paused_until, now + pause)
+                self._tokens = 0
+            elif error is None:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self._condition.notify_all()
+        return throttled
+
+    def _retry_after(self, error: SpotifyException) -> float:
+        headers = getattr(error, "headers", None) or {}
+        try:
+            return max(0.0, float(headers.get("Retry-After") or headers.get("retry-after")))
+        except (TypeError, ValueError):
+            return self.default_retry_after
+
+
+class ScheduledSpotify(spotipy.Spotify):
+    """spotipy client whose every API call (search, paging, playlist writes, ...) goes through a RequestScheduler."""
+
+    def __init__(self, scheduler: RequestScheduler, **kwargs):
+        kwargs.setdefault("status_forcelist", RequestScheduler.spotipy_retry_codes)
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def _build_session(self):
+        super()._build_session()
+        # urllib3 would otherwise sleep and retry any response carrying Retry-After in the worker thread itself
+        for prefix in ("http://", "https://"):
+            adapter = self._session.get_adapter(prefix)
+            adapter.max_retries = adapter.max_retries.new(respect_retry_after_header=False)
+
+    def _internal_call(self, method, url, payload, params):
+        def attempt():
+            started = time.perf_counter()
+            status = "error"
+            try:
+                # spotipy mutates params, so every attempt gets its own copy
+                result = super(ScheduledSpotify, self)._internal_call(method, url, payload, dict(params))
+                status = 200
+                return result
+            except SpotifyException as e:
+                status = e.http_status
+                raise
+            finally:
+                if self.scheduler.metrics is not None:
+                    self.scheduler.metrics.record_api_call(url, status, time.perf_counter() - started)
+
+        return self.scheduler.call(attempt)
@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Per-run cache for raw API responses, keyed by a tuple of request parameters.
+
+    Concurrent callers asking for the same key while it is being fetched wait for that one request instead of
+    issuing their own. Responses can optionally be persisted to a single-file SQLite store with a TTL, so they are
+    also reused across runs. Failed requests are never cached.
+    """
+
+    default_ttl = 7 * 24 * 3600  # 7 days
+    busy_timeout = 60  # Seconds to wait for a write lock held by another process sharing the file
+
+    def __init__(self, path: Optional[str] = None, namespace: str = "default", ttl: float = default_ttl,
+                 max_entries: int = 20_000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._memory: OrderedDict = OrderedDict()
+        self._in_flight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self._conn = None
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=self.busy_timeout, check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, created REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Return the cached response for key, calling fetch() at most once per key across all threads."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                owner = True
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = self._load(key)
+            if value is None:
+                value = fetch()
+                self._store(key, value)
+                with self._lock:
+                    self.misses += 1
+            else:
+                with self._lock:
+                    self.hits += 1
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._remember(key, value)
+            del self._in_flight[key]
+        future.set_result(value)
+        return value
+
+    def peek(self, key: Hashable) -> Any:
+        """Return the in-memory response for key without fetching, or None."""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+            return value
+
+    def get(self, key: Hashable) -> Any:
+        """Return the response for key from memory or the persistent tier without fetching, or None."""
+        value = self.peek(key)
+        if value is None:
+            value = self._load(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._remember(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a response that was fetched outside of get_or_fetch (e.g. by an asyncio client)."""
+        self._store(key, value)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, value)
+
+    def prune(self) -> int:
+        """Remove expired responses from the persistent tier. Returns the number of removed entries."""
+        if self._conn is None:
+            return 0
+        with self._db_lock:
+            return self._conn.execute("DELETE FROM responses WHERE namespace = ? AND created < ?",
+                                      (self.namespace, time.time() - self.ttl)).rowcount
+
+    def close(self):
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+            self._conn = None
+
+    def _remember(self, key: Hashable, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _serialize_key(key: Hashable) -> str:
+        return json.dumps(list(key) if isinstance(key, tuple) else key, separators=(",", ":"))
+
+    def _load(self, key: Hashable) -> Any:
+        if self._conn is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._conn.execute("SELECT value, created FROM responses WHERE namespace = ? AND key = ?",
+                                         (self.namespace, self._serialize_key(key))).fetchone()
+        except sqlite3.Error as e:  # E.g. locked by other processes sharing the cache: fetch instead
+            logger.warning(f"Response cache read failed, fetching instead: {e}")
+            return None
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def _store(self, key: Hashable, value: Any):
+        if self._conn is None:
+            return
+        try:
+            with self._db_lock:
+                self._conn.execute("INSERT OR REPLACE INTO responses (namespace, key, value, created)"
+                                   " VALUES (?, ?, ?, ?)",
+                                   (self.namespace, self._serialize_key(key), json.dumps(value), time.time()))
+        except sqlite3.Error as e:  # The response is still used, it is just not persisted
+            logger.warning(f"Response cache write failed: {e}")
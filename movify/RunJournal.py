@@ -0,0 +1,144 @@
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+import time
+
+from .MatchCache import MatchCache
+
+
+class RunJournal:
+    """Append-only JSON-lines journal of a migration run, used to resume after a crash.
+
+    Records fetched links (with their tracks), match decisions, created playlists, the track batches already added
+    to them and the albums saved to the library. Every record is flushed to the OS right away, so it survives the
+    process being killed; playlist, batch and album records are also fsync-ed immediately because replaying them wrongly would duplicate data on Spotify.
+    The frequent ingest/match records are fsync-ed in groups by a background thread to keep appends cheap.
+    """
+
+    default_path = ".movify_journal.jsonl"
+
+    def __init__(self, path: str = default_path, resume: bool = False, fsync_interval: float = 0.5):
+        self.path = path
+        self.fsync_interval = fsync_interval
+
+        self._ingested: dict[Tuple[str, str], list] = {}
+        self._matches: dict[str, Tuple[Optional[str], float]] = {}
+        self._playlists: dict[str, str] = {}
+        self._resumed_added: dict[str, Counter] = {}  # Title -> songs added by the run being resumed, not yet matched
+        self._resumed_albums: set = set()  # Albums saved by the run being resumed
+        self.replayed = 0
+
+        if resume and os.path.exists(path):
+            self._replay()
+        elif not resume and os.path.exists(path) and os.path.getsize(path):
+            # Starting over: keep the previous journal, it may be the state of a run that was meant to be resumed
+            os.replace(path, path + ".bak")
+
+        self._lock = threading.Lock()
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._fsync_loop, daemon=True, name="movify-journal")
+        self._flusher.start()
+        self._append({"type": "run", "started": time.time(), "resume": resume}, sync=True)
+
+    # ---------------------- Replayed state ----------------------
+    def ingested(self, section: str, url: str) -> Optional[List[dict]]:
+        """Tracks recorded for a link of a section, or None if it was not fetched yet."""
+        return self._ingested.get((section, url))
+
+    def match(self, title, artists) -> Optional[Tuple[Optional[str], float]]:
+        """Recorded (spotify_id or None, score) decision for a song, or None if it was not matched yet."""
+        return self._matches.get(MatchCache.key(title, artists))
+
+    @property
+    def playlists(self) -> dict[str, str]:
+        """Playlist title -> ID of playlists created by this run (including before a resume)."""
+        return dict(self._playlists)
+
+    def pending_ids(self, playlist_title: str, song_ids: Iterable[str]) -> List[str]:
+        """Drop the track IDs that the run being resumed already added to the playlist, counting duplicates.
+        Each replayed addition is matched once, so later calls for the same playlist (e.g. further streamed
+        sections of its title) and songs added earlier in this run are never dropped."""
+        pending = []
+        with self._lock:
+            added = self._resumed_added.get(playlist_title)
+            for song_id in song_ids:
+                if added and added[song_id] > 0:
+                    added[song_id] -= 1
+                else:
+                    pending.append(song_id)
+        return pending
+
+    def pending_albums(self, spotify_ids: Iterable[str]) -> List[str]:
+        """Drop the album IDs that the run being resumed already saved to the library."""
+        return [spotify_id for spotify_id in spotify_ids if spotify_id not in self._resumed_albums]
+
+    # ---------------------- Recording ----------------------
+    def record_ingested(self, section: str, url: str, tracks: List[dict]):
+        self._ingested[(section, url)] = tracks
+        self._append({"type": "ingested", "section": section, "url": url, "tracks": tracks})
+
+    def record_match(self, title, artists, spotify_id: Optional[str], score: float):
+        key = MatchCache.key(title, artists)
+        self._matches[key] = (spotify_id, score)
+        self._append({"type": "match", "key": key, "id": spotify_id, "score": float(score)})
+
+    def record_playlist(self, playlist_title: str, playlist_id: str):
+        self._playlists[playlist_title] = playlist_id
+        self._append({"type": "playlist", "title": playlist_title, "id": playlist_id}, sync=True)
+
+    def record_batch(self, playlist_title: str, song_ids: List[str]):
+        self._append({"type": "batch", "title": playlist_title, "ids": song_ids}, sync=True)
+
+    def record_albums(self, spotify_ids: List[str]):
+        self._append({"type": "albums", "ids": spotify_ids}, sync=True)
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def _append(self, record: dict, sync: bool = False):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+            else:
+                self._dirty = True
+
+    def _fsync_loop(self):
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                if self._dirty:
+                    os.fsync(self._file.fileno())
+                    self._dirty = False
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Last line may be cut short by a hard kill
+                kind = record.get("type")
+                if kind == "ingested":
+                    self._ingested[(record["section"], record["url"])] = record["tracks"]
+                elif kind == "match":
+                    self._matches[record["key"]] = (record["id"], record["score"])
+                elif kind == "playlist":
+                    self._playlists[record["title"]] = record["id"]
+                elif kind == "batch":
+                    self._resumed_added.setdefault(record["title"], Counter()).update(record["ids"])
+                elif kind == "albums":
+                    self._resumed_albums.update(record["ids"])
+                else:
+                    continue
+                self.replayed += 1
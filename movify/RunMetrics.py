@@ -0,0 +1,234 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Optional
+import json
+import os
+import re
+import threading
+import time
+
+
+class RunMetrics:
+    """Run-wide performance counters: stage timings, Spotify API calls, throttling and cache hit rates.
+
+    Stage times are busy times summed over all workers, so with concurrent lookups they can exceed the wall time of
+    the run. Everything is thread-safe and cheap enough to stay enabled. The collected numbers can be printed as a
+    summary or exported as JSON or as a Prometheus textfile (for node_exporter's textfile collector).
+    """
+
+    # Upper bounds (seconds) of the API latency histogram buckets
+    latency_buckets = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    _id_pattern = re.compile(r"/[A-Za-z0-9]{22}(?=/|$)")
+
+    def __init__(self):
+        self.started = time.time()
+        self.tracks = 0
+        self.tracks_matched = 0
+        self.unique_tracks = 0  # Tracks left after collapsing duplicates, each looked up once
+        self.candidates_returned = 0  # Search results, counting a track once per search that returned it
+        self.candidates_scored = 0  # Distinct candidates scored
+        self.fallback_searches = 0  # Title-only searches after all variations failed
+        self.scheduler = None  # RequestScheduler whose retry/throttling counters are reported
+
+        self._stages: dict[str, list] = {}  # Stage -> [seconds, count]
+        self._api_calls: dict[tuple, int] = {}  # (endpoint, status) -> count
+        self._latencies: dict[str, list] = {}  # Endpoint -> [bucket counts..., +Inf count, sum of seconds]
+        self._caches: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - started)
+
+    def add_stage_time(self, name: str, seconds: float):
+        with self._lock:
+            totals = self._stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def record_api_call(self, url: str, status, seconds: float):
+        """Count one HTTP request to the Spotify API; url may be absolute or relative to the API prefix."""
+        endpoint = self.endpoint(url)
+        with self._lock:
+            key = (endpoint, str(status))
+            self._api_calls[key] = self._api_calls.get(key, 0) + 1
+            histogram = self._latencies.get(endpoint)
+            if histogram is None:
+                histogram = self._latencies[endpoint] = [0] * (len(self.latency_buckets) + 1) + [0.0]
+            histogram[bisect_left(self.latency_buckets, seconds)] += 1
+            histogram[-1] += seconds
+
+    def record_tracks(self, total: int, matched: int, unique: int = None):
+        with self._lock:
+            self.tracks += total
+            self.tracks_matched += matched
+            self.unique_tracks += total if unique is None else unique
+
+    def record_song_search(self, returned: int, scored: int, fallback: bool):
+        """Count the search results of one song, the distinct candidates among them and its fallback search."""
+        with self._lock:
+            self.candidates_returned += returned
+            self.candidates_scored += scored
+            self.fallback_searches += fallback
+
+    def track_cache(self, name: str, cache):
+        """Report the hit ratio of a cache exposing `hits` and `misses` (and optionally `coalesced`) counters."""
+        if cache is not None:
+            self._caches[name] = cache
+
+    @classmethod
+    def endpoint(cls, url: str) -> str:
+        """API path with IDs replaced, e.g. 'playlists/{id}/tracks'."""
+        path = url.split("?", 1)[0]
+        if "/v1/" in path:
+            path = path.split("/v1/", 1)[1]
+        elif "://" in path:
+            path = path.split("://", 1)[1].partition("/")[2]
+        path = "/" + path.strip("/")
+        path = cls._id_pattern.sub("/{id}", path)
+        path = re.sub(r"^/users/[^/]+", "/users/{id}", path)
+        return path.strip("/") or "/"
+
+    # ---------------------- Reporting ----------------------
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {name: {"seconds": round(seconds, 4), "count": count}
+                      for name, (seconds, count) in sorted(self._stages.items())}
+            api_calls: dict[str, dict] = {}
+            for (endpoint, status), count in sorted(self._api_calls.items()):
+                api_calls.setdefault(endpoint, {})[status] = count
+            latencies = {endpoint: {"buckets": dict(zip([str(b) for b in self.latency_buckets] + ["+Inf"],
+                                                        self._cumulative(histogram))),
+                                    "sum": round(histogram[-1], 4), "count": sum(histogram[:-1])}
+                         for endpoint, histogram in sorted(self._latencies.items())}
+            search_requests = sum(count for (endpoint, _), count in self._api_calls.items() if endpoint == "search")
+
+        caches = {}
+        for name, cache in self._caches.items():
+            hits = cache.hits + getattr(cache, "coalesced", 0)
+            lookups = hits + cache.misses
+            caches[name] = {"hits": hits, "misses": cache.misses,
+                            "hit_ratio": round(hits / lookups, 4) if lookups else None}
+
+        throttling = {}
+        if self.scheduler is not None:
+            throttling = {"throttled": self.scheduler.throttled, "retries": self.scheduler.retries,
+                          "paused_seconds": round(self.scheduler.throttle_wait, 3)}
+
+        return {
+            "run_seconds": round(time.time() - self.started, 3),
+            "tracks": self.tracks,
+            "tracks_matched": self.tracks_matched,
+            "unique_tracks": self.unique_tracks,
+            "search_requests": search_requests,
+            "searches_per_matched_track": round(search_requests / self.tracks_matched, 3) if self.tracks_matched
+            else None,
+            "candidates": {"returned": self.candidates_returned, "scored": self.candidates_scored},
+            "fallback_searches": self.fallback_searches,
+            "stages": stages,
+            "api_calls": api_calls,
+            "api_latency_seconds": latencies,
+            "throttling": throttling,
+            "caches": caches,
+        }
+
+    def summary(self) -> str:
+        data = self.to_dict()
+        lines = [f"📊 Run metrics ({data['run_seconds']:.1f}s, {data['tracks_matched']}/{data['tracks']} tracks "
+                 f"matched, {data['searches_per_matched_track'] or 0:.2f} searches per matched track)"]
+        if data["unique_tracks"] < data["tracks"]:
+            lines.append(f"   Unique songs: {data['unique_tracks']}/{data['tracks']} "
+                         f"({data['unique_tracks'] / data['tracks']:.0%}), "
+                         f"{data['tracks'] - data['unique_tracks']} duplicate lookups skipped")
+        for name, stage in data["stages"].items():
+            lines.append(f"   {name:<16} {stage['seconds']:9.2f}s  ({stage['count']}x)")
+        candidates = data["candidates"]
+        if candidates["scored"]:
+            lines.append(f"   Candidates: {candidates['returned']} search results, {candidates['scored']} distinct "
+                         f"scored ({candidates['returned'] / candidates['scored']:.1f}x duplication), "
+                         f"{data['fallback_searches']} title-only fallback searches")
+        for endpoint, statuses in data["api_calls"].items():
+            latency = data["api_latency_seconds"][endpoint]
+            mean_ms = 1000 * latency["sum"] / latency["count"] if latency["count"] else 0
+            counts = ", ".join(f"{status}: {count}" for status, count in statuses.items())
+            lines.append(f"   API {endpoint:<24} {counts}  (mean {mean_ms:.0f} ms)")
+        if data["throttling"]:
+            throttling = data["throttling"]
+            lines.append(f"   Throttled: {throttling['throttled']} (429), {throttling['retries']} retries, "
+                         f"{throttling['paused_seconds']:.1f}s paused")
+        for name, cache in data["caches"].items():
+            ratio = "-" if cache["hit_ratio"] is None else f"{100 * cache['hit_ratio']:.0f}%"
+            lines.append(f"   {name} cache: {ratio} hits ({cache['hits']}/{cache['hits'] + cache['misses']})")
+        return "\n".join(lines)
+
+    def export(self, path: str):
+        """Write the metrics as a Prometheus textfile if path ends in .prom, else as JSON."""
+        content = self.to_prometheus() if path.endswith(".prom") else json.dumps(self.to_dict(), indent=2)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)  # Atomic, so a collector never reads a half-written file
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, Optional[float]]]):
+            lines.append(f"# HELP movify_{name} {help_text}")
+            lines.append(f"# TYPE movify_{name} {kind}")
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"movify_{name}{labels} {value}")
+
+        metric("run_seconds", "gauge", "Wall time of the run.", [("", data["run_seconds"])])
+        metric("tracks_total", "counter", "Tracks looked up on Spotify.", [("", data["tracks"])])
+        metric("tracks_matched_total", "counter", "Tracks matched on Spotify.", [("", data["tracks_matched"])])
+        metric("unique_tracks_total", "counter", "Distinct songs looked up after collapsing duplicate tracks.",
+               [("", data["unique_tracks"])])
+        metric("searches_per_matched_track", "gauge", "Spotify search requests per matched track.",
+               [("", data["searches_per_matched_track"])])
+        metric("search_candidates_total", "counter", "Search results returned for songs, duplicates included.",
+               [("", data["candidates"]["returned"])])
+        metric("scored_candidates_total", "counter", "Distinct candidates scored.",
+               [("", data["candidates"]["scored"])])
+        metric("fallback_searches_total", "counter", "Title-only searches after all variations failed.",
+               [("", data["fallback_searches"])])
+        metric("stage_seconds_total", "counter", "Busy time per stage, summed over workers.",
+               [(f'{{stage="{name}"}}', stage["seconds"]) for name, stage in data["stages"].items()])
+        metric("api_requests_total", "counter", "Spotify API requests by endpoint and HTTP status.",
+               [(f'{{endpoint="{endpoint}",status="{status}"}}', count)
+                for endpoint, statuses in data["api_calls"].items() for status, count in statuses.items()])
+
+        histogram_samples = []
+        for endpoint, latency in data["api_latency_seconds"].items():
+            for bound, count in latency["buckets"].items():
+                histogram_samples.append((f'_bucket{{endpoint="{endpoint}",le="{bound}"}}', count))
+            histogram_samples.append((f'_sum{{endpoint="{endpoint}"}}', latency["sum"]))
+            histogram_samples.append((f'_count{{endpoint="{endpoint}"}}', latency["count"]))
+        lines.append("# HELP movify_api_request_duration_seconds Spotify API request latency.")
+        lines.append("# TYPE movify_api_request_duration_seconds histogram")
+        lines.extend(f"movify_api_request_duration_seconds{labels} {value}" for labels, value in histogram_samples)
+
+        throttling = data["throttling"]
+        metric("throttled_total", "counter", "Spotify API responses with status 429.",
+               [("", throttling.get("throttled"))])
+        metric("retries_total", "counter", "Spotify API requests retried after throttling.",
+               [("", throttling.get("retries"))])
+        metric("cache_hits_total", "counter", "Cache hits.",
+               [(f'{{cache="{name}"}}', cache["hits"]) for name, cache in data["caches"].items()])
+        metric("cache_misses_total", "counter", "Cache misses.",
+               [(f'{{cache="{name}"}}', cache["misses"]) for name, cache in data["caches"].items()])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _cumulative(histogram: list) -> list:
+        counts, total = [], 0
+        for count in histogram[:-1]:
+            total += count
+            counts.append(total)
+        return counts
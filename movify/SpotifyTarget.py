@@ -1,145 +1,562 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from getpass import getpass
-from typing import Tuple, List, Callable
+from typing import Tuple, List, Callable, Iterable, Iterator, Sequence, Union
 import spotipy
 import re
+import sqlite3
+import threading
 from tqdm import tqdm
 from spotipy import SpotifyOAuth
 
-import numpy as np
 import pandas as pd
+from requests.adapters import HTTPAdapter
 import logging
 
-from .YoutubeMusicSource import YoutubeMusicSource
+from .AlbumReview import AlbumReview
+from .BatchScorer import BatchScorer
+from .Candidate import AlbumCandidate, CandidatePool, TrackCandidate
+from .CatalogIndex import CatalogIndex
+from .FuzzyScorer import FuzzyScorer
+from .MatchCache import MatchCache
+from .RequestScheduler import RateLimitError, RequestScheduler, ScheduledSpotify
+from .ResponseCache import ResponseCache
+from .RunJournal import RunJournal
+from .RunMetrics import RunMetrics
+from .StreamingPipeline import StreamingPipeline
+from .Track import Track
+from .TrackStore import TrackStore
+from .VariationStats import VariationStats
 
 
 class SpotifyTarget:
     min_score = 2  # Smaller than 4
     max_album_post = 50
+    album_accept_score = min_score  # Album matches scoring at least this are saved without review
+    album_reject_score = 0  # Album matches scoring at most this are dropped; scores in between go to review
+    match_workers = 1  # Number of tracks matched concurrently by get_spotify_song_ids
+    confidence_threshold = None  # Stop searching for a song once a candidate scores at least this (None: never)
+
+    # Response fields kept per search result; everything else (markets, images, ...) is dropped before caching
+    search_item_fields = ("id", "name", "artists", "album_type", "release_date", "duration_ms")
+    search_limits = (50, 20, 10)  # A cached wider search also answers narrower searches for the same query
+    search_limit = 20  # Results per search variation
+    wide_search_limit = 50  # Results of the title-only fallback and of queries shared by several variations
+
+    # Candidate scorers by name: the original substring rules, or edit distance and trigram similarity
+    scorers = {"rules": BatchScorer, "fuzzy": FuzzyScorer}
+    scorer = BatchScorer
+    scorer_name = "rules"
 
     song_response_mapper = {"name": "title", "artists": "artists", "id": "id"}
     album_response_mapper = {"name": "title", "artists": "artists", "id": "id", "album_type": "_type",
                              "release_date": "year"}
 
-    def __init__(self, client_id=None, client_secret=None):
+    def __init__(self, client_id=None, client_secret=None, match_workers: int = None, match_cache: MatchCache = None,
+                 search_cache: ResponseCache = None, confidence_threshold: float = None,
+                 variation_stats: VariationStats = None, journal: RunJournal = None, catalog: CatalogIndex = None,
+                 scheduler: RequestScheduler = None, metrics: RunMetrics = None, scorer: str = None,
+                 token_cache_path: str = None):
         if client_id is None or client_secret is None:
             client_id = input("Client id:")
             client_secret = getpass()
-        auth_manager = spotipy.SpotifyClientCredentials(client_id=client_id, client_secret=client_secret)
-        self.sp = spotipy.Spotify(auth_manager=auth_manager)
+        if match_workers is not None:
+            self.match_workers = max(1, int(match_workers))
+        if confidence_threshold is not None:
+            self.confidence_threshold = confidence_threshold
+        if scorer is not None:
+            self.scorer = self.scorers[scorer]
+            self.scorer_name = scorer
+        self.match_cache = match_cache
+        self.token_cache_path = token_cache_path  # Where user tokens are cached (None: spotipy's .cache-<user>)
+        self.journal = journal
+        self.catalog = catalog
+        self.search_cache = search_cache if search_cache is not None else ResponseCache(namespace="spotify_search")
+        self.variation_stats = variation_stats if variation_stats is not None else VariationStats()
+        self.searches_skipped = 0
+        # Playlist title -> ID of the playlist created in this run (or in the run being resumed)
+        self.created_playlists: dict[str, str] = dict(journal.playlists) if journal is not None else {}
+        self._user_clients: dict[tuple, spotipy.Spotify] = {}
+        self._user_playlists: dict[str, str] = None  # Title -> ID of the user's own playlists, read once for sync
+        self._synced_playlists: dict[str, Counter] = {}  # Title -> playlist items not yet matched by a song in sync
+        self._synced_songs: dict[str, set] = {}  # Title -> songs of this run in a synced playlist, kept by remove_stale
+        self._counter_lock = threading.Lock()
+        self.auth_manager = spotipy.SpotifyClientCredentials(client_id=client_id, client_secret=client_secret)
+        # One scheduler for the search client and all user clients, so they share rate limits and Retry-After pauses
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.scheduler = scheduler or RequestScheduler(max_concurrency=self.match_workers)
+        if self.scheduler.metrics is None:
+            self.scheduler.metrics = self.metrics
+        self.metrics.scheduler = self.scheduler
+        # The search client is created on first use, so runs answered from caches or a catalog never build it
+        self._sp: spotipy.Spotify = None
         self.logger = logging.getLogger("DEBUG")
 
-    def add_playlists_to_library(self, playlists: pd.DataFrame, client_id, client_secret, redirect_uri, username):
-        auth_sp = spotipy.Spotify(
-            auth_manager=SpotifyOAuth(
-                client_id, client_secret, redirect_uri, username=username, scope="playlist-modify-private"
-            )
-        )
+    @property
+    def sp(self) -> spotipy.Spotify:
+        if self._sp is None:
+            with self._counter_lock:
+                if self._sp is None:
+                    sp = ScheduledSpotify(self.scheduler, auth_manager=self.auth_manager)
+                    # The default connection pool keeps 10 connections; size it for concurrent workers
+                    if self.match_workers > 1 and getattr(sp, "_session", None) is not None:
+                        retries = sp._session.get_adapter("https://").max_retries
+                        adapter = HTTPAdapter(max_retries=retries, pool_connections=self.match_workers,
+                                              pool_maxsize=self.match_workers)
+                        sp._session.mount("https://", adapter)
+                    self._sp = sp
+        return self._sp
+
+    def add_playlists_to_library(self, playlists: Union[pd.DataFrame, TrackStore], client_id, client_secret, redirect_uri, username,
+                                 sync: bool = False, remove_stale: bool = False):
+        """Create a private playlist per playlist_title and add the matched songs in batches of 100.
+        Can be called repeatedly (e.g. once per streamed section): a playlist created earlier in this run for the same
+        title is extended instead of being created again.
+
+        With sync=True an existing playlist (by stored ID in created_playlists, else by title among the user's own
+        playlists) is updated instead: only the songs it does not contain yet are added and, with remove_stale=True,
+        songs that are no longer part of the migration are removed. When a title is spread over several calls (e.g.
+        streamed sections), pass remove_stale=False and call remove_stale_songs once after the last one instead, so
+        songs of a later call are not removed first.
+        """
+        scope = "playlist-modify-private playlist-read-private" if sync else "playlist-modify-private"
+        auth_sp = self._user_client(client_id, client_secret, redirect_uri, username, scope)
+
+        with self.metrics.stage("playlist_writes"):
+            # Group by target playlist title and create each playlist, adding songs in batches
+            for playlist_title, song_ids in self._playlist_song_ids(playlists):
+                new_playlist_id = self.created_playlists.get(playlist_title)
+                if new_playlist_id is None and sync:
+                    new_playlist_id = self._find_user_playlist(auth_sp, playlist_title)
+                    if new_playlist_id is not None:
+                        self.created_playlists[playlist_title] = new_playlist_id
+                        if self.journal is not None:
+                            self.journal.record_playlist(playlist_title, new_playlist_id)
+
+                if new_playlist_id is None:
+                    response = auth_sp.user_playlist_create(
+                        auth_sp.current_user()["id"], playlist_title, public=False
+                    )
+                    new_playlist_id = self.created_playlists[playlist_title] = response["id"]
+                    if self.journal is not None:
+                        self.journal.record_playlist(playlist_title, new_playlist_id)
+                    if sync:
+                        self._synced_playlists[playlist_title] = Counter()
+                elif sync:
+                    # The playlist itself is the source of truth, so no journal filtering is needed
+                    song_ids = self._sync_playlist(auth_sp, playlist_title, new_playlist_id, song_ids)
+                elif self.journal is not None:
+                    # Skip the songs a resumed run already added to this playlist
+                    song_ids = self.journal.pending_ids(playlist_title, song_ids)
+
+                def add_batch(batch: list[str]):
+                    if batch:
+                        auth_sp.playlist_add_items(new_playlist_id, batch)
+                        if self.journal is not None:
+                            self.journal.record_batch(playlist_title, batch)
+
+                self.execute_in_batches(add_batch, song_ids, limit=100)
+
+            if sync and remove_stale:
+                self._remove_stale(auth_sp)
+
+    def remove_stale_songs(self, client_id, client_secret, redirect_uri, username):
+        """Remove the songs of every playlist synced in this run that none of the run's songs matched."""
+        auth_sp = self._user_client(client_id, client_secret, redirect_uri, username,
+                                    "playlist-modify-private playlist-read-private")
+        with self.metrics.stage("playlist_writes"):
+            self._remove_stale(auth_sp)
+
+    def _find_user_playlist(self, auth_sp: spotipy.Spotify, playlist_title: str):
+        """ID of the user's own playlist with this title (the first one if there are several), or None."""
+        if self._user_playlists is None:
+            user_id = auth_sp.current_user()["id"]
+            self._user_playlists = {}
+            page = auth_sp.current_user_playlists(limit=50)
+            while page:
+                for item in page.get("items") or ():
+                    if item and (item.get("owner") or {}).get("id") == user_id:
+                        self._user_playlists.setdefault(item.get("name"), item["id"])
+                page = auth_sp.next(page) if page.get("next") else None
+        return self._user_playlists.get(playlist_title)
+
+    @staticmethod
+    def _playlist_track_ids(auth_sp: spotipy.Spotify, playlist_id: str) -> List[str]:
+        """Track IDs currently in a playlist, read 100 at a time. Local files and episodes are left out."""
+        track_ids = []
+        page = auth_sp.playlist_items(playlist_id, fields="items(track(id,type)),next", limit=100,
+                                      additional_types=("track",))
+        while page:
+            for item in page.get("items") or ():
+                track = (item or {}).get("track") or {}
+                if track.get("type", "track") == "track" and track.get("id"):
+                    track_ids.append(track["id"])
+            page = auth_sp.next(page) if page.get("next") else None
+        return track_ids
+
+    def _sync_playlist(self, auth_sp: spotipy.Spotify, playlist_title: str, playlist_id: str,
+                       song_ids: List[str]) -> List[str]:
+        """Diff an existing playlist against the matched songs: return the songs that still have to be added, in
+        order and keeping duplicates the playlist does not have yet."""
+        # Occurrences in the playlist not yet claimed by a song of this run (e.g. by an earlier streamed section)
+        available = self._synced_playlists.get(playlist_title)
+        if available is None:
+            available = self._synced_playlists[playlist_title] = Counter(self._playlist_track_ids(auth_sp, playlist_id))
+
+        self._synced_songs.setdefault(playlist_title, set()).update(song_ids)
+        missing = []
+        for song_id in song_ids:
+            if available[song_id] > 0:
+                available[song_id] -= 1
+            else:
+                missing.append(song_id)
+
+        print(f"🔁 '{playlist_title}': {len(missing)} to add, {len(song_ids) - len(missing)} already present")
+        return missing
+
+    def _remove_stale(self, auth_sp: spotipy.Spotify):
+        """Remove the unmatched items of every synced playlist. Songs of this run are never removed, even if the
+        playlist has more copies of them than the run (removal drops all occurrences of a song)."""
+        for playlist_title, available in self._synced_playlists.items():
+            wanted = self._synced_songs.get(playlist_title, set())
+            stale = [song_id for song_id, count in available.items() if count > 0 and song_id not in wanted]
+            if not stale:
+                continue
+            playlist_id = self.created_playlists[playlist_title]
+
+            def remove_batch(batch: list[str]):
+                auth_sp.playlist_remove_all_occurrences_of_items(playlist_id, batch)
+                for song_id in batch:
+                    del available[song_id]
+
+            self.execute_in_batches(remove_batch, stale, limit=100)
+            print(f"🧹 '{playlist_title}': {len(stale)} stale songs removed")
+
+    def _user_client(self, client_id, client_secret, redirect_uri, username, scope: str) -> spotipy.Spotify:
+        # One authorized client per user and scope for the whole run
+        key = (client_id, username, scope)
+        with self._counter_lock:
+            if key not in self._user_clients:
+                self._user_clients[key] = ScheduledSpotify(
+                    self.scheduler, auth_manager=self.user_auth(client_id, client_secret, redirect_uri, username, scope)
+                )
+            return self._user_clients[key]
+
+    def user_auth(self, client_id, client_secret, redirect_uri, username, scope: str) -> SpotifyOAuth:
+        """OAuth manager for a user, with its token cached at token_cache_path if set."""
+        return SpotifyOAuth(client_id, client_secret, redirect_uri, username=username, scope=scope,
+                            cache_path=self.token_cache_path)
 
-        # Normalize input
-        playlists = playlists.copy()
-        playlists = playlists.dropna(subset=["spotify_id", "playlist_title"])
-        playlists = playlists.reset_index(drop=True)
+    @staticmethod
+    def _playlist_song_ids(playlists: Union[pd.DataFrame, TrackStore]):
+        """Yield (playlist_title, valid Spotify track IDs) per target playlist, skipping playlists without matches."""
+        if isinstance(playlists, TrackStore):
+            # Read the ID column of each playlist's views directly, without building rows
+            grouped: dict[str, list] = {}
+            for playlist_title, view in playlists.playlists():
+                if playlist_title is not None:
+                    grouped.setdefault(playlist_title, []).extend(sid for sid in view.spotify_ids() if sid)
+            groups = sorted(grouped.items())
+        else:
+            playlists = playlists.dropna(subset=["spotify_id", "playlist_title"])
+            groups = ((title, [sid for sid in group["spotify_id"] if pd.notna(sid)])
+                      for title, group in playlists.groupby("playlist_title"))
 
-        # Group by target playlist title and create each playlist, adding songs in batches
-        for playlist_title, group in playlists.groupby("playlist_title"):
-            raw_ids = [sid for sid in list(group["spotify_id"]) if pd.notna(sid)]
+        for playlist_title, raw_ids in groups:
             # Only accept IDs that look like valid Spotify track IDs (22-char base62)
             song_ids = [sid for sid in raw_ids if isinstance(sid, str) and re.fullmatch(r"[A-Za-z0-9]{22}", sid)]
             if len(song_ids) == 0:
                 print(f"Skipping playlist '{playlist_title}' — 0 valid Spotify matches")
                 continue
+            yield playlist_title, song_ids
+
+    def get_spotify_song_ids(self, df: Union[pd.DataFrame, TrackStore, List[Track]],
+                             workers: int = None) -> List[str]:
+        """Match every row of df (or every Track of a store or list) on Spotify and return the track IDs in input
+        order (pd.NA if not found).
+        With workers > 1 the rows are matched concurrently in a thread pool.
+        """
+        target_songs = self._target_songs(df)
+        if not target_songs:
+            return []
 
-            response = auth_sp.user_playlist_create(
-                auth_sp.current_user()["id"], playlist_title, public=False
-            )
-            new_playlist_id = response["id"]
-
-            def add_batch(batch: list[str]):
-                if batch:
-                    auth_sp.playlist_add_items(new_playlist_id, batch)
-
-            self.execute_in_batches(add_batch, song_ids, limit=100)
+        workers = self.match_workers if workers is None else max(1, int(workers))
+        skipped_before = self.searches_skipped
+        song_ids_add = [pd.NA] * len(target_songs)
+        not_found_indices = []
+        throttled_indices = []
+        lock = threading.Lock()
+        groups = self._duplicate_groups(target_songs)
 
-    def get_spotify_song_ids(self, df: pd.DataFrame) -> List[str]:
-        song_ids_add = []
-        songs_not_found = []
+        print("Looking up songs on spotify...")
+        with self.metrics.stage("lookup"), tqdm(total=len(groups)) as progress:
+            def lookup(positions: List[int]):
+                try:
+                    song, score = self.search_for_song(target_songs[positions[0]])
+                except RateLimitError:
+                    with lock:
+                        throttled_indices.extend(positions)
+                        progress.update(1)
+                    return
+                with lock:
+                    for position in positions:
+                        if score > 0:
+                            song_ids_add[position] = song["id"]
+                        else:
+                            not_found_indices.append(position)
+                    progress.update(1)
+
+            if workers == 1:
+                for positions in groups:
+                    lookup(positions)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(lookup, positions) for positions in groups]
+                    for future in as_completed(futures):
+                        future.result()
 
-        if df.empty:
-            return []
+        self._report_lookup(target_songs, not_found_indices, skipped_before, throttled_indices, len(groups))
+        return song_ids_add
 
-        found, ambiguous, not_found = 0, 0, 0
+    @staticmethod
+    def song_key(song) -> tuple:
+        """Normalized (title and artists, duration in seconds) of a song: songs with the same key are looked up
+        once."""
+        return (MatchCache.key(song.get("title"), song.get("artists")),
+                TrackStore.parse_duration(song.get("duration")) if song.get("duration") is not None else None)
+
+    def _duplicate_groups(self, target_songs) -> List[List[int]]:
+        """Positions of the target songs grouped by song key, in order of first appearance, and a report of how many
+        lookups the duplicates save."""
+        keys = target_songs.song_keys() if isinstance(target_songs, TrackStore) \
+            else [self.song_key(song) for song in target_songs]
+        groups: dict[tuple, List[int]] = {}
+        for position, key in enumerate(keys):
+            groups.setdefault(key, []).append(position)
+        if len(groups) < len(keys):
+            print(f"🔁 {len(groups)} unique songs in {len(keys)} tracks ({len(groups) / len(keys):.0%}), "
+                  f"{len(keys) - len(groups)} duplicate lookups skipped")
+        return list(groups.values())
 
-        print("Looking up songs on spotify...")
-        for idx, target_song in tqdm(df.iterrows(), total=df.shape[0]):
-            song, score = self.search_for_song(target_song)
-            if score > 0:
-                song_ids_add.append(song["id"])
-                found += 1
-            elif score <= 0:
-                not_found += 1
-                songs_not_found.append(target_song)
-                song_ids_add.append(pd.NA)
-
-        for song in songs_not_found:
+    @staticmethod
+    def _target_songs(songs) -> Sequence:
+        """Songs to match as records: the rows of a DataFrame, a TrackStore (whose Tracks are built on access) or
+        Track objects as they are."""
+        if isinstance(songs, pd.DataFrame):
+            return songs.to_dict("records")
+        return songs if isinstance(songs, TrackStore) else list(songs)
+
+    def _report_lookup(self, target_songs: list[dict], not_found_indices: list[int], skipped_before: int,
+                       throttled_indices: list[int] = (), unique: int = None):
+        self.metrics.record_tracks(len(target_songs),
+                                   len(target_songs) - len(not_found_indices) - len(throttled_indices), unique)
+        # Report in input order regardless of completion order
+        for position in sorted(not_found_indices):
+            song = target_songs[position]
             print(f"Song {song['title']}, {song['artists']} in playlist {song['playlist_title']}"
                   f" was not found.")
+        if throttled_indices:
+            print(f"⚠️  {len(throttled_indices)} songs could not be looked up because Spotify kept rate limiting; "
+                  f"they were not recorded as missing, run again to retry them.")
 
-        return song_ids_add
+        if self.confidence_threshold is not None:
+            print(f"Early exit saved {self.searches_skipped - skipped_before} Spotify searches "
+                  f"(confidence threshold {self.confidence_threshold})")
 
     def search_for_song(self, song: pd.Series):
-        # Try multiple search variations for better matching
-        search_variations = self._generate_search_variations(song)
+        # Serve previously matched songs from the match cache without touching the search API
+        cached = self._cached_match(song) or self._local_match(song)
+        if cached is not None:
+            return cached
 
+        best_candidate, best_score = self._drive_search(self._song_search_steps(song))
+        self._remember_match(song, best_candidate, best_score)
+        return best_candidate, best_score
+
+    def _local_match(self, song):
+        """Match from the offline catalog if it scores at least the catalog threshold, else None."""
+        if self.catalog is None:
+            return None
+        best_candidate, best_score = self.catalog.match(song)
+        if best_candidate is None or best_score < self.catalog.threshold:
+            return None
+        self._remember_match(song, best_candidate, best_score)
+        return best_candidate, best_score
+
+    def _cached_match(self, song):
+        if self.journal is not None:
+            # Decisions of the run being resumed, including songs that were not found
+            decision = self.journal.match(song.get("title"), song.get("artists"))
+            if decision is not None:
+                spotify_id, score = decision
+                return (TrackCandidate(spotify_id, None) if spotify_id else None), score
+
+        if self.match_cache is None or not isinstance(song.get("title"), str):
+            return None
+        try:
+            cached = self.match_cache.get(song["title"], song.get("artists"), self.scorer_name)
+        except sqlite3.Error as e:  # E.g. locked by other processes sharing the cache: search instead
+            self.logger.warning(f"Match cache read failed, searching instead: {e}")
+            return None
+        if cached is None:
+            return None
+        return TrackCandidate(cached["id"], cached["title"], artists=cached["artists"]), cached["score"]
+
+    def _remember_match(self, song, best_candidate, best_score):
+        if self.journal is not None:
+            self.journal.record_match(song.get("title"), song.get("artists"),
+                                      best_candidate["id"] if best_score > 0 else None, best_score)
+        if self.match_cache is not None and isinstance(song.get("title"), str) and best_score > 0:
+            try:
+                self.match_cache.put(song["title"], song.get("artists"), best_candidate["id"], best_score,
+                                     best_candidate.get("title"), best_candidate.get("artists"), self.scorer_name)
+            except sqlite3.Error as e:  # The match stands, it is just not cached
+                self.logger.warning(f"Match cache write failed: {e}")
+
+    def _drive_search(self, steps):
+        """Run a search step generator, answering each (query, type, limit) request with self.search."""
+        try:
+            request = next(steps)
+            while True:
+                try:
+                    with self.metrics.stage("search"):
+                        response = self.search(*request)
+                except Exception as e:
+                    response = e
+                request = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    def _song_search_steps(self, song: pd.Series):
+        """Matching logic of search_for_song as a generator, independent of how searches are executed.
+
+        Yields (query, type, limit) search requests and receives each response (or the exception raised while
+        searching). Returns (best_candidate, best_score). Shared by the synchronous and the asyncio backend, so
+        both produce the same matches.
+        """
+        # Try multiple search variations for better matching; with a confidence threshold the historically most
+        # successful variations go first and searching stops once a candidate is good enough
+        with self.metrics.stage("variations"):
+            search_plan = self._generate_search_plan(song)
+            if self.confidence_threshold is not None:
+                search_plan = self.variation_stats.order(search_plan)
+
+        # All results go into one pool per song and only candidates not seen in an earlier search are scored: a
+        # repeated candidate scores the same as before and cannot beat the best score
+        pool = CandidatePool()
         best_candidate = None
         best_score = -1
+        best_kind = None
+        attempted_kinds = []
+
+        # Variations with the same words in another order ("title artist" / "artist title") find nearly the same
+        # tracks: each set of words is searched once, with a wider limit if several variations share it
+        searches: dict[frozenset, list] = {}  # Words -> [query, kinds]
+        for kind, search_string in search_plan:
+            searches.setdefault(self._query_words(search_string), [search_string, []])[1].append(kind)
+        wide_searched = set()
+
+        for position, (words, (search_string, kinds)) in enumerate(searches.items()):
+            if self.confidence_threshold is not None and best_score >= self.confidence_threshold:
+                with self._counter_lock:
+                    self.searches_skipped += len(searches) - position
+                break
 
-        for search_string in search_variations:
+            attempted_kinds.extend(kinds)
+            wide = len(kinds) > 1
+            response = yield search_string, "track", self.wide_search_limit if wide else self.search_limit
             try:
-                response = self.sp.search(search_string, type="track", limit=20)
-                candidates = pd.DataFrame(response["tracks"]["items"])
-
-                if not candidates.empty:
-                    if "artists" in candidates.columns:
-                        candidates["artists"] = YoutubeMusicSource.parse_artists(candidates["artists"])
-
-                    available_columns = [col for col in self.song_response_mapper.keys() if col in candidates.columns]
-                    attr_filtered_candidates = candidates[available_columns]
-
-                    rename_dict = {col: self.song_response_mapper[col] for col in available_columns}
-                    attr_filtered_candidates = attr_filtered_candidates.rename(columns=rename_dict)
-
-                    candidate, score = self.select_best_candidate(song, attr_filtered_candidates)
-
-                    if score > best_score:
-                        best_candidate = candidate
-                        best_score = score
-
+                if isinstance(response, Exception):
+                    raise response
+                with self.metrics.stage("scoring"):
+                    candidates = pool.add(TrackCandidate.from_items(response["tracks"]["items"]), kinds[0])
+                    candidate, score = self.select_best_record(song, candidates, floor=best_score)
+                if wide:
+                    wide_searched.add(words)
+
+                if score > best_score:
+                    best_candidate = candidate
+                    best_score = score
+                    best_kind = kinds[0]
+
+            except RateLimitError:
+                raise  # Throttled, not a miss: the song must not be recorded as not found
             except Exception:
                 continue
 
-        # Fallback: title-only broader search if we still have nothing good
+        self.variation_stats.record(attempted_kinds, best_kind if best_score > 0 else None)
+
+        # Fallback: title-only broader search if we still have nothing good, unless these words were searched as wide
+        fallback_query = None
         if best_score <= 0 and isinstance(song.get("title"), str):
+            fallback_query = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", song["title"]).strip())
+        fallback = fallback_query is not None and self._query_words(fallback_query) not in wide_searched
+        if fallback:
+            response = yield fallback_query, "track", self.wide_search_limit
             try:
-                cleaned_title = re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", song["title"]).strip())
-                response = self.sp.search(cleaned_title, type="track", limit=50)
-                candidates = pd.DataFrame(response["tracks"]["items"])
-                if not candidates.empty:
-                    if "artists" in candidates.columns:
-                        candidates["artists"] = YoutubeMusicSource.parse_artists(candidates["artists"])
-                    available_columns = [col for col in self.song_response_mapper.keys() if col in candidates.columns]
-                    attr_filtered_candidates = candidates[available_columns]
-                    rename_dict = {col: self.song_response_mapper[col] for col in available_columns}
-                    attr_filtered_candidates = attr_filtered_candidates.rename(columns=rename_dict)
-                    candidate, score = self.select_best_candidate(song, attr_filtered_candidates)
-                    if score > best_score:
-                        best_candidate, best_score = candidate, score
+                if isinstance(response, Exception):
+                    raise response
+                with self.metrics.stage("scoring"):
+                    candidates = pool.add(TrackCandidate.from_items(response["tracks"]["items"]), "fallback")
+                    candidate, score = self.select_best_record(song, candidates, floor=best_score)
+                if score > best_score:
+                    best_candidate, best_score = candidate, score
+            except RateLimitError:
+                raise
             except Exception:
                 pass
 
+        self.metrics.record_song_search(pool.returned, len(pool), fallback)
         return best_candidate, best_score
-    
+
+    @staticmethod
+    def _query_words(query: str) -> frozenset:
+        return frozenset(re.findall(r"\w+", query.lower()))
+
+    def search(self, query: str, type: str = "track", limit: int = 20) -> dict:
+        """Spotify search through the per-run response cache, so identical queries hit the network once per run."""
+        key, cached = self._cached_search(query, type, limit)
+        if cached is not None:
+            return cached
+
+        def fetch():
+            return self._compact_search_response(self.sp.search(query, type=type, limit=limit), type + "s")
+
+        return self.search_cache.get_or_fetch(key, fetch)
+
+    def _cached_search(self, query: str, type: str, limit: int):
+        """Search cache key for a request, and the response if a wider search for the same query is in memory."""
+        normalized_query = " ".join(query.split()).lower()
+        key_type = type + "s"
+
+        # A wider response for the same query already holds the results of this one
+        for wider_limit in self.search_limits:
+            if wider_limit <= limit:
+                break
+            wider = self.search_cache.peek((normalized_query, type, wider_limit))
+            if wider is not None:
+                return None, {key_type: {"items": wider[key_type]["items"][:limit]}}
+
+        return (normalized_query, type, limit), None
+
+    @classmethod
+    def _compact_search_response(cls, response: dict, key_type: str) -> dict:
+        items = []
+        for item in response.get(key_type, {}).get("items", []):
+            if item is None:
+                continue
+            compact = {field: item[field] for field in cls.search_item_fields if field in item}
+            if "artists" in compact:
+                compact["artists"] = [{"name": artist.get("name"), "id": artist.get("id")} for artist in compact["artists"]]
+            items.append(compact)
+        return {key_type: {"items": items}}
+
     def _generate_search_variations(self, song: pd.Series):
         """Generate multiple search variations for better matching"""
+        return [query for _, query in self._generate_search_plan(song)]
+
+    def _generate_search_plan(self, song: pd.Series) -> List[Tuple[str, str]]:
+        """Search variations as (kind, query) pairs; the kind names the rule that produced the query."""
         title = song["title"]
         artists_str = str(song["artists"]).replace("[", "").replace("]", "").replace("\'", "")
 
@@ -216,10 +633,11 @@ class SpotifyTarget:
             artist_variations.append("Clams Casino")
 
         variations = []
-        for artist in artist_variations:
+        for position, artist in enumerate(artist_variations):
+            kind = "artist" if position == 0 else "alias"
             variations.extend([
-                f"{title} {artist}",
-                f"{artist} {title}",
+                (f"title_{kind}", f"{title} {artist}"),
+                (f"{kind}_title", f"{artist} {title}"),
             ])
 
         clean_title = title
@@ -227,27 +645,27 @@ class SpotifyTarget:
             clean_title = clean_title.split(" - ", 1)[1]
 
         variations.extend([
-            clean_title,
-            f"{clean_title} {first_artist}",
+            ("clean_title", clean_title),
+            ("clean_title_artist", f"{clean_title} {first_artist}"),
         ])
 
         if likely_title_from_title:
             variations.extend([
-                likely_title_from_title,
-                f"{likely_title_from_title} {first_artist}",
+                ("hyphen_title", likely_title_from_title),
+                ("hyphen_title_artist", f"{likely_title_from_title} {first_artist}"),
             ])
         if likely_artist_from_title and likely_title_from_title:
             variations.extend([
-                f"{likely_title_from_title} {likely_artist_from_title}",
-                f"{likely_artist_from_title} {likely_title_from_title}",
+                ("hyphen_title_hyphen_artist", f"{likely_title_from_title} {likely_artist_from_title}"),
+                ("hyphen_artist_hyphen_title", f"{likely_artist_from_title} {likely_title_from_title}"),
             ])
 
         for qt in quoted_titles:
             qt_clean = qt.strip()
             if qt_clean:
                 variations.extend([
-                    qt_clean,
-                    f"{qt_clean} {first_artist}",
+                    ("quoted_title", qt_clean),
+                    ("quoted_title_artist", f"{qt_clean} {first_artist}"),
                 ])
 
         clean_title_no_suffix = clean_title
@@ -258,33 +676,53 @@ class SpotifyTarget:
 
         if clean_title_no_suffix != clean_title:
             variations.extend([
-                clean_title_no_suffix,
-                f"{clean_title_no_suffix} {first_artist}",
+                ("no_suffix_title", clean_title_no_suffix),
+                ("no_suffix_title_artist", f"{clean_title_no_suffix} {first_artist}"),
             ])
 
         if any(char.isdigit() for char in first_artist) and len(first_artist) < 10:
-            variations.append(clean_title)
+            variations.append(("clean_title", clean_title))
 
         popular_songs = ["good morning", "loyalty", "congratulations", "too many nights", "i'm god"]
         if any(pop_song in clean_title.lower() for pop_song in popular_songs):
-            variations.append(clean_title)
-
-        variations = list(dict.fromkeys([v.strip() for v in variations if v.strip()]))
-
-        return variations
+            variations.append(("clean_title", clean_title))
 
-    def select_best_candidate(self, target_item: pd.Series, candidates: pd.DataFrame):
-        scores = [self.similarity_score_df(target_item, row) for idx, row in candidates.iterrows()]
+        # Drop duplicate queries, keeping the first kind that produced them
+        plan = {}
+        for kind, query in variations:
+            query = query.strip()
+            if query and query not in plan:
+                plan[query] = kind
 
-        if len(scores) > 0:
-            best_hit_index = np.argmax(scores)
-            best_hit_score = scores[best_hit_index]
-            best_hit = candidates.iloc[best_hit_index, :]
-        else:
-            best_hit = pd.Series()
-            best_hit_score = 0
+        return [(kind, query) for query, kind in plan.items()]
 
-        return best_hit, best_hit_score
+    def select_best_candidate(self, target_item: pd.Series, candidates: pd.DataFrame, floor: float = None):
+        """Best scoring candidate (first one on ties). With a floor, only candidates scoring above it are returned."""
+        if candidates.empty:
+            return pd.Series(), 0 if floor is None else floor
+
+        best_hit_index, best_hit_score = self.scorer(target_item).best(self.candidate_features(candidates), floor)
+        if best_hit_index is None:
+            return pd.Series(), best_hit_score
+        return candidates.iloc[best_hit_index, :], best_hit_score
+
+    def select_best_record(self, target_item, candidates: List[TrackCandidate], floor: float = None):
+        """Like select_best_candidate, for a list of candidate records. Returns (None, floor or 0) if nothing qualifies."""
+        if not candidates:
+            return None, 0 if floor is None else floor
+
+        features = self.scorer.features([c.title for c in candidates], [c.artists for c in candidates])
+        best_hit_index, best_hit_score = self.scorer(target_item).best(features, floor)
+        if best_hit_index is None:
+            return None, best_hit_score
+        return candidates[best_hit_index], best_hit_score
+
+    def candidate_features(self, candidates: pd.DataFrame):
+        return self.scorer.features(
+            candidates["title"].tolist() if "title" in candidates.columns else None,
+            candidates["artists"].tolist() if "artists" in candidates.columns else None,
+            size=len(candidates),
+        )
 
     @staticmethod
     def found_item_message(item, result_code):
@@ -298,115 +736,132 @@ class SpotifyTarget:
     ######### Album workflow ###########
 
     def add_albums_to_library(self, spotify_ids: List[str], client_id, client_secret, redirect_uri):
-        auth_sp = spotipy.Spotify(auth_manager=SpotifyOAuth(client_id, client_secret, redirect_uri,
-                                                            scope="user-library-modify"))
-        self.execute_in_batches(auth_sp.current_user_saved_albums_add,  spotify_ids, 50)
-
-    def get_spotify_album_ids(self, albums: pd.DataFrame) -> list[str]:
-        review_album_indices: list[int] = []
-        best_matches: list[pd.Series] = []
-
-        found, ambiguous, not_found = 0, 0, 0
+        auth_sp = self._user_client(client_id, client_secret, redirect_uri, None, "user-library-modify")
+        if self.journal is not None:
+            spotify_ids = self.journal.pending_albums(spotify_ids)
+        self.execute_in_batches(lambda batch: self._save_albums(auth_sp, batch), list(spotify_ids),
+                                self.max_album_post)
+
+    def _save_albums(self, auth_sp, batch: List[str]):
+        auth_sp.current_user_saved_albums_add(batch)
+        if self.journal is not None:
+            self.journal.record_albums(batch)
+
+    def migrate_albums(self, albums: pd.DataFrame, client_id, client_secret, redirect_uri, workers: int = None,
+                       review_path: str = None, accept_score: float = None, reject_score: float = None) -> int:
+        """Look up albums concurrently and save the matches to the user's library without any prompt.
+        Accepted IDs are saved in batches of max_album_post while later albums are still being looked up. Albums
+        between the reject and accept scores go to the review file at review_path; decisions made there are
+        applied by the next call with the same file. Returns the number of albums saved."""
+        review = AlbumReview(review_path) if review_path else None
+        auth_sp = self._user_client(client_id, client_secret, redirect_uri, None, "user-library-modify")
+        saved: set = set()
+
+        def new_ids(batch: List[str]) -> List[str]:
+            # Several library albums can match the same Spotify album; save it once
+            batch = [spotify_id for spotify_id in dict.fromkeys(batch) if spotify_id not in saved]
+            saved.update(batch)
+            # Albums saved by the run being resumed are not saved again
+            return self.journal.pending_albums(batch) if self.journal is not None else batch
+
+        def save_batch(batch: List[str]):
+            if batch:
+                self._save_albums(auth_sp, batch)
+
+        pipeline = StreamingPipeline(match=new_ids, write=save_batch)
+        try:
+            accepted = self.resolve_albums(albums, workers, review, accept_score, reject_score)
+            pipeline.run(self.batches(accepted, self.max_album_post))
+        finally:
+            if review is not None:
+                review.save()
+        print(f"💾 Saved {pipeline.tracks_written} albums to the library")
+        if review is not None and review.pending:
+            print(f"📝 {review.pending} albums need a decision in {review.path}; run again to apply it")
+        return pipeline.tracks_written
+
+    def get_spotify_album_ids(self, albums: pd.DataFrame, workers: int = None, review: AlbumReview = None,
+                              accept_score: float = None, reject_score: float = None) -> List[str]:
+        """Spotify IDs of the albums whose match is accepted, in input order. See resolve_albums."""
+        return list(self.resolve_albums(albums, workers, review, accept_score, reject_score))
+
+    def resolve_albums(self, albums: pd.DataFrame, workers: int = None, review: AlbumReview = None,
+                       accept_score: float = None, reject_score: float = None) -> Iterator[str]:
+        """Look up albums concurrently and yield the Spotify IDs of accepted matches in input order, while later
+        albums are still being looked up.
+
+        A match scoring at least accept_score (default album_accept_score) is accepted, one scoring at most
+        reject_score (default album_reject_score) is dropped. Albums in between are added to the review, if any, and
+        skipped; albums already accepted or rejected in the review are decided without searching.
+        """
+        target_albums = self._target_songs(albums)
+        accept_score = self.album_accept_score if accept_score is None else accept_score
+        reject_score = self.album_reject_score if reject_score is None else reject_score
+        workers = self.match_workers if workers is None else max(1, int(workers))
+        outcomes = Counter()
+
+        def resolve(album):
+            return self._resolve_album(album, review, accept_score, reject_score)
 
         print("Looking up albums on spotify...")
-        for idx, target_album in tqdm(albums.iterrows(), total=albums.shape[0]):
-            best_candidate, score = self.search_for_album(target_album)
-            if score >= self.min_score:
-                found += 1
-            elif score > 0:
-                review_album_indices.append(idx)
-                ambiguous += 1
-            else:
-                not_found += 1
-            best_matches.append(best_candidate)
-
-        best_matches_ids = [song["id"] for song in best_matches]
-        albums.insert(0, "id", best_matches_ids)
-
-        print(f"Results: \t \034[1;32;40m {found} \034[1;37;40m found, \034[1;33;40m {ambiguous} "
-              f"\034[1;37;40m ambiguous, \034[1;31;40m {not_found} \034[1;37;40m not found \n")
-
-        drop_albums_idx = self.eliminate_dialogue(albums, review_album_indices, best_matches)
-        confirmed_albums = albums.drop(drop_albums_idx, axis=0)
-        confirmed_albums = confirmed_albums.dropna()
-
-        return confirmed_albums["id"]
-
-    def eliminate_dialogue(self, albums: pd.DataFrame, review_album_indices: list[int], best_matches: list[pd.Series]):
-        print("The following albums could not be matched properly. Please deselect albums you do not want to add by "
-              "entering their corresponding number (multiple possible, separated by commas.")
-        review_album_list = np.asarray(review_album_indices)
-        drop: set = set()
-
-        def print_candidates(indices):
-            for idx, row in albums.iloc[indices, :].iterrows():
-
-                if idx not in drop:
-                    out = str(idx) + "\t" + str(row["artists"]) + ": " + row["title"] \
-                          + "\t to \t" + str(best_matches[idx]["artists"]) + ": " + best_matches[idx]["title"]
-
-                    out = "\033[1;33;40m" + out + "\033[1;37;40m"
-                    print(out)
-
-        while True:
-            print_candidates(review_album_list)
-            print("If nothing should be edited, please type 'nothing'.")
-            i = input()
-            cleaned_i = i.replace(" ", "").split(",")
-
-            if not i.lower() == 'nothing':
-
-                try:
-                    cleaned_i = [int(x) for x in cleaned_i]
-                except Exception:
-                    print("Please only type in numbers separated with commas")
-                    continue
-
-            for e in cleaned_i:
-                drop.add(e)
-
-            while True:
-                i2 = input("Continue editing? y/n \n")
-                if i2 == "n":
-                    print(f"Adding closest matches for the remaining {len(review_album_list)} candidates...")
-                    return review_album_list
-                elif i2 == "y":
-                    break
-
-    def search_for_album(self, album_info) -> Tuple[pd.Series, int]:
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            with self.metrics.stage("album_lookup"), tqdm(total=len(target_albums)) as progress:
+                results = executor.map(resolve, target_albums) if executor else map(resolve, target_albums)
+                for spotify_id, outcome in results:
+                    outcomes[outcome] += 1
+                    progress.update(1)
+                    if spotify_id is not None:
+                        yield spotify_id
+        finally:
+            if executor is not None:
+                # Stop looking up further albums if the consumer gave up (e.g. saving failed)
+                executor.shutdown(cancel_futures=True)
+
+        print(f"Albums: {outcomes['found']} found, {outcomes['ambiguous']} ambiguous, "
+              f"{outcomes['not found']} not found, {outcomes['accepted']} accepted and "
+              f"{outcomes['rejected']} rejected in review")
+        if outcomes["throttled"]:
+            print(f"⚠️  {outcomes['throttled']} albums could not be looked up because Spotify kept rate limiting; "
+                  f"run again to retry them.")
+
+    def _resolve_album(self, album, review: AlbumReview, accept_score: float, reject_score: float):
+        """(Spotify ID or None, outcome) of one album."""
+        decided = review.decision(album) if review is not None else None
+        if decided is not None:
+            if decided["decision"] == AlbumReview.ACCEPT and decided.get("spotify_id"):
+                return decided["spotify_id"], "accepted"
+            return None, "rejected"
+
+        try:
+            candidate, score = self.search_for_album(album)
+        except RateLimitError:
+            return None, "throttled"
+        if candidate is None or score <= reject_score:
+            return None, "not found"
+        if score >= accept_score:
+            return candidate["id"], "found"
+        if review is not None:
+            review.add(album, candidate, score)
+        return None, "ambiguous"
+
+    def search_for_album(self, album_info) -> Tuple[AlbumCandidate, int]:
+        """Best album candidate and its score; (None, -1) if the search found nothing."""
         query = self.generate_search_string(album_info)
-        response = self.sp.search(query, type="album", limit=10)
-        candidates = response["albums"]["items"]
-        candidates = pd.DataFrame(candidates)
+        response = self.search(query, type="album", limit=10)
+        candidates = AlbumCandidate.from_items(response["albums"]["items"])
 
-        if candidates.empty:
-            empty = album_info
-            album_info["id"] = pd.NA
-            return empty, -1
+        if not candidates:
+            return None, -1
 
-        attr_filtered_candidates = candidates[self.album_response_mapper]
-        attr_filtered_candidates = attr_filtered_candidates.rename(columns=self.album_response_mapper)
-        attr_filtered_candidates["year"] = self.parse_year(attr_filtered_candidates["year"])
-        attr_filtered_candidates["artists"] = YoutubeMusicSource.parse_artists(attr_filtered_candidates["artists"])
-        best_candidate, score = self.select_best_candidate_album(album_info, attr_filtered_candidates)
-        return best_candidate, score
+        return self.select_best_record(album_info, candidates)
 
     def select_best_candidate_album(self, target_album: pd.Series, candidates: pd.DataFrame) -> Tuple[pd.Series, int]:
-        scores = []
-        candidate_album_infos = []
-        for idx, hit in candidates.iterrows():
-            candidate_album_infos.append(hit)
-            scores.append(self.similarity_score_df(target_album, hit))
-
-        if len(scores) > 0:
-            best_hit_index = np.argmax(scores)
-            best_hit = candidate_album_infos[best_hit_index]
-            best_hit_score = scores[best_hit_index]
-        else:
-            best_hit = pd.Series(index=target_album.index)
-            best_hit_score = 0
+        if candidates.empty:
+            return pd.Series(index=target_album.index), 0
 
-        return best_hit, best_hit_score
+        best_hit_index, best_hit_score = self.scorer(target_album).best(self.candidate_features(candidates))
+        return candidates.iloc[best_hit_index, :], best_hit_score
 
     @staticmethod
     def generate_search_string(obj: pd.Series):
@@ -616,4 +1071,16 @@ class SpotifyTarget:
             end = min(start + limit, len(_list))
             batch = _list[start:end]
             if batch:
-                func(batch)
\ No newline at end of file
+                func(batch)
+
+    @staticmethod
+    def batches(items: Iterable, size: int) -> Iterator[list]:
+        """Lists of up to size items, produced while items is still being consumed."""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
@@ -0,0 +1,91 @@
+from queue import Full, Queue
+from typing import Callable, Iterable, Optional, Sized
+import threading
+
+
+class StreamingPipeline:
+    """Runs ingest -> match -> write as concurrent stages connected by bounded queues.
+
+    Items flow one playlist section at a time: a section is written to Spotify as soon as it is matched, while later
+    sections are still being ingested. The bounded queues provide backpressure, so a fast stage never runs more than
+    `queue_size` sections ahead of a slow one and only a few sections are held in memory at once.
+    """
+
+    _done = object()
+
+    def __init__(self, match: Callable[[Sized], Sized], write: Callable[[Sized], None],
+                 queue_size: int = 2):
+        self.match = match
+        self.write = write
+        self.queue_size = queue_size
+        self.sections_written = 0
+        self.tracks_written = 0
+
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def run(self, sections: Iterable[Sized]):
+        """Ingest sections from the iterable in the calling thread and match/write them in background stages.
+        Re-raises the first error of any stage after all stages have stopped."""
+        to_match: Queue = Queue(maxsize=self.queue_size)
+        to_write: Queue = Queue(maxsize=self.queue_size)
+
+        match_thread = threading.Thread(target=self._stage, args=(to_match, to_write, self.match), daemon=True,
+                                        name="movify-match")
+        write_thread = threading.Thread(target=self._stage, args=(to_write, None, self._write), daemon=True,
+                                        name="movify-write")
+        match_thread.start()
+        write_thread.start()
+
+        try:
+            for section in sections:
+                if not self._put(to_match, section):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(to_match, self._done, force=True)
+            match_thread.join()
+            write_thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _write(self, section: Sized):
+        self.write(section)
+        self.sections_written += 1
+        self.tracks_written += len(section)
+
+    def _stage(self, inbox: Queue, outbox: Optional[Queue], work: Callable):
+        try:
+            while True:
+                item = inbox.get()
+                if item is self._done:
+                    break
+                if self._stop.is_set():
+                    continue  # Drain until the end marker so upstream stages never block
+                result = work(item)
+                if outbox is not None and not self._put(outbox, result):
+                    continue
+        except BaseException as e:
+            self._fail(e)
+            # Keep draining so the upstream stage can finish
+            while inbox.get() is not self._done:
+                pass
+        finally:
+            if outbox is not None:
+                self._put(outbox, self._done, force=True)
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _put(self, queue: Queue, item, force: bool = False) -> bool:
+        while force or not self._stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
@@ -0,0 +1,63 @@
+from typing import Iterable, List, Optional
+
+
+class Track:
+    """A source track (one playlist entry) without any pandas dependency.
+
+    Supports item access (track["title"], track.get("artists"), "duration" in track) like the dict rows the matching
+    code works on, so a Track can be matched directly. `artists` keeps the "['A', 'B']" form used for scoring.
+    """
+
+    __slots__ = ("playlist_title", "playlist_id", "title", "artists", "duration")
+    fields = __slots__
+
+    def __init__(self, title: Optional[str], artists: Optional[str] = None, duration: Optional[str] = None,
+                 playlist_title: Optional[str] = None, playlist_id: Optional[str] = None):
+        self.title = title
+        self.artists = artists
+        self.duration = duration
+        self.playlist_title = playlist_title
+        self.playlist_id = playlist_id
+
+    @staticmethod
+    def artists_string(artists_json) -> str:
+        # Same string as str(YoutubeMusicSource.parse_artist(...))
+        return str([artist["name"] for artist in artists_json or ()])
+
+    @classmethod
+    def from_ytmusic(cls, item: dict, playlist_title: str = None, playlist_id: str = None) -> "Track":
+        """Track from an entry of a ytmusicapi playlist or watch playlist."""
+        artists_json = item.get("artists")
+        return cls(item.get("title"), cls.artists_string(artists_json) if artists_json is not None else None,
+                   item.get("duration"), playlist_title, playlist_id)
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "Track":
+        return cls(**{field: record.get(field) for field in cls.fields})
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> List["Track"]:
+        return [cls.from_dict(record) for record in records]
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.fields else default
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def keys(self):
+        return list(self.fields)
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.fields}
+
+    def __eq__(self, other):
+        return isinstance(other, Track) and all(getattr(self, f) == getattr(other, f) for f in self.fields)
+
+    def __repr__(self):
+        return f"Track({self.title!r}, {self.artists!r}, playlist={self.playlist_title!r})"
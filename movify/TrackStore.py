@@ -0,0 +1,305 @@
+from array import array
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import ast
+import sys
+
+from .Track import Track
+
+
+class _Columns:
+    """The columns shared by a store and all of its views."""
+
+    def __init__(self):
+        self.strings: List[str] = []  # Interned titles, artist names, playlist titles/IDs and Spotify IDs
+        self.string_index: dict = {}
+        self.titles = array("i")
+        self.artist_offsets = array("i", [0])  # Artists of track i: artist_names[artist_offsets[i]:artist_offsets[i+1]]
+        self.artist_names = array("i")
+        self.artist_forms = array("b")
+        self.durations = array("i")  # Seconds, -1 if unknown
+        self.playlist_titles = array("i")
+        self.playlist_ids = array("i")
+        self.spotify_ids = array("i")
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self.string_index.get(value)
+        if index is None:
+            index = self.string_index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def string(self, index: int) -> Optional[str]:
+        return self.strings[index] if index >= 0 else None
+
+
+class TrackStore:
+    """Memory-compact, columnar list of source tracks.
+
+    Every track costs a handful of integers: its title, artist names and playlist are indices into a string table in
+    which each distinct string is stored once, durations are integer seconds and artists are kept as structured name
+    lists. Slicing (store[a:b], playlists()) returns views over the same columns, so nothing is copied; views can set
+    Spotify IDs, but only the store that owns the columns can grow.
+
+    Items are Track objects built on access, with `artists` in the same text form the track was created with (the
+    "['A', 'B']" list form of playlists, or plain names from video pages), so matching, caches and journals see
+    exactly the strings they saw before.
+    """
+
+    # How the artists of a track were written, so the original text can be restored
+    NO_ARTISTS, ARTIST_LIST, ARTIST_TEXT = 0, 1, 2
+
+    def __init__(self, _columns: _Columns = None, _start: int = 0, _stop: int = None):
+        self._owner = _columns is None
+        self._columns = _columns if _columns is not None else _Columns()
+        self._start = _start
+        self._stop = _stop
+
+    # ---------------------- Building ----------------------
+    def append(self, title: Optional[str], artists: Union[str, Sequence[str], None] = None, duration=None,
+               playlist_title: Optional[str] = None, playlist_id: Optional[str] = None, spotify_id: str = None):
+        """Add a track. artists is a list of names or the artists text ("['A', 'B']" or "A, B"); duration is in
+        seconds or an "m:ss" / "h:mm:ss" string."""
+        if not self._owner:
+            raise TypeError("Tracks can only be added to the store owning the columns, not to a view")
+        columns = self._columns
+        form, names = self._artist_names(artists)
+        columns.titles.append(columns.intern(title))
+        columns.artist_names.extend(columns.intern(name) for name in names)
+        columns.artist_offsets.append(len(columns.artist_names))
+        columns.artist_forms.append(form)
+        columns.durations.append(self.parse_duration(duration))
+        columns.playlist_titles.append(columns.intern(playlist_title))
+        columns.playlist_ids.append(columns.intern(playlist_id))
+        columns.spotify_ids.append(columns.intern(spotify_id))
+
+    def append_track(self, track: Track):
+        self.append(track.title, track.artists, track.duration, track.playlist_title, track.playlist_id)
+
+    def extend(self, other: "TrackStore"):
+        """Append all tracks of another store (or view), re-interning its strings into this store."""
+        if not self._owner:
+            raise TypeError("Tracks can only be added to the store owning the columns, not to a view")
+        columns, source = self._columns, other._columns
+        mapping = {}
+
+        def remap(index: int) -> int:
+            if index < 0:
+                return index
+            mapped = mapping.get(index)
+            if mapped is None:
+                mapped = mapping[index] = columns.intern(source.strings[index])
+            return mapped
+
+        for row in range(other._start, other._end()):
+            columns.titles.append(remap(source.titles[row]))
+            columns.artist_names.extend(remap(name) for name in source.artist_names[
+                source.artist_offsets[row]:source.artist_offsets[row + 1]])
+            columns.artist_offsets.append(len(columns.artist_names))
+            columns.artist_forms.append(source.artist_forms[row])
+            columns.durations.append(source.durations[row])
+            columns.playlist_titles.append(remap(source.playlist_titles[row]))
+            columns.playlist_ids.append(remap(source.playlist_ids[row]))
+            columns.spotify_ids.append(remap(source.spotify_ids[row]))
+
+    @classmethod
+    def from_ytmusic(cls, items: Iterable[dict], playlist_title: str = None, playlist_id: str = None) -> "TrackStore":
+        """Store from the track entries of a ytmusicapi playlist."""
+        store = cls()
+        for item in items:
+            artists = item.get("artists")
+            store.append(item.get("title"), [artist["name"] for artist in artists] if artists is not None else None,
+                         item.get("duration"), playlist_title, playlist_id)
+        return store
+
+    @classmethod
+    def from_tracks(cls, tracks: Iterable[Track]) -> "TrackStore":
+        store = cls()
+        for track in tracks:
+            store.append_track(track)
+        return store
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "TrackStore":
+        """Store from track dicts (as written by records() or DataFrame.to_dict("records"))."""
+        store = cls()
+        for record in records:
+            store.append(record.get("title"), record.get("artists"), record.get("duration"),
+                         record.get("playlist_title"), record.get("playlist_id"), cls._string(record.get("spotify_id")))
+        return store
+
+    # ---------------------- Access ----------------------
+    def __len__(self) -> int:
+        return self._end() - self._start
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("TrackStore slices must be contiguous")
+            return TrackStore(self._columns, self._start + start, self._start + max(start, stop))
+        return self.track(key)
+
+    def __iter__(self) -> Iterator[Track]:
+        for position in range(len(self)):
+            yield self.track(position)
+
+    def track(self, position: int) -> Track:
+        row = self._row(position)
+        columns = self._columns
+        return Track(columns.string(columns.titles[row]), self._artists_text(row), self._duration_text(row),
+                     columns.string(columns.playlist_titles[row]), columns.string(columns.playlist_ids[row]))
+
+    def title(self, position: int) -> Optional[str]:
+        return self._columns.string(self._columns.titles[self._row(position)])
+
+    def artists(self, position: int) -> List[str]:
+        """The artist names of a track as a list."""
+        row = self._row(position)
+        columns = self._columns
+        return [columns.strings[name] for name in
+                columns.artist_names[columns.artist_offsets[row]:columns.artist_offsets[row + 1]]]
+
+    def duration_seconds(self, position: int) -> Optional[int]:
+        seconds = self._columns.durations[self._row(position)]
+        return seconds if seconds >= 0 else None
+
+    def playlist_title(self, position: int) -> Optional[str]:
+        return self._columns.string(self._columns.playlist_titles[self._row(position)])
+
+    def spotify_id(self, position: int) -> Optional[str]:
+        return self._columns.string(self._columns.spotify_ids[self._row(position)])
+
+    def spotify_ids(self) -> List[Optional[str]]:
+        return [self.spotify_id(position) for position in range(len(self))]
+
+    def set_spotify_ids(self, spotify_ids: Sequence):
+        """Store the Spotify match of every track, in order; anything but a string (None, pd.NA) means no match."""
+        if len(spotify_ids) != len(self):
+            raise ValueError(f"Expected {len(self)} Spotify IDs, got {len(spotify_ids)}")
+        columns = self._columns
+        for row, spotify_id in zip(range(self._start, self._end()), spotify_ids):
+            columns.spotify_ids[row] = columns.intern(self._string(spotify_id))
+
+    def set_playlist_title(self, playlist_title: str):
+        """Assign all tracks of this store (or view) to one playlist."""
+        columns = self._columns
+        index = columns.intern(playlist_title)
+        for row in range(self._start, self._end()):
+            columns.playlist_titles[row] = index
+
+    def playlists(self) -> List[Tuple[str, "TrackStore"]]:
+        """(playlist title, view) for every run of consecutive tracks of the same playlist, in order."""
+        runs = []
+        titles = self._columns.playlist_titles
+        start = self._start
+        for row in range(self._start + 1, self._end() + 1):
+            if row == self._end() or titles[row] != titles[start]:
+                runs.append((self._columns.string(titles[start]),
+                             TrackStore(self._columns, start, row)))
+                start = row
+        return runs
+
+    def playlist_titles(self) -> List[str]:
+        """Distinct playlist titles in order of appearance."""
+        return list(dict.fromkeys(title for title, _ in self.playlists() if title is not None))
+
+    def song_keys(self) -> List[tuple]:
+        """Normalized (title and artists, duration in seconds) key of every track, as SpotifyTarget.song_key.
+        Each distinct combination of stored strings is normalized once."""
+        from .MatchCache import MatchCache
+        columns = self._columns
+        normalized = {}
+        keys = []
+        for row in range(self._start, self._end()):
+            names = tuple(columns.artist_names[columns.artist_offsets[row]:columns.artist_offsets[row + 1]])
+            raw = (columns.titles[row], names, columns.artist_forms[row] == self.NO_ARTISTS)
+            key = normalized.get(raw)
+            if key is None:
+                key = normalized[raw] = MatchCache.key(columns.string(raw[0]), self._artists_text(row))
+            keys.append((key, columns.durations[row] if columns.durations[row] >= 0 else None))
+        return keys
+
+    def records(self) -> List[dict]:
+        return [track.to_dict() for track in self]
+
+    def to_df(self):
+        """The tracks as a pandas DataFrame (with a spotify_id column once IDs are set)."""
+        import pandas as pd
+        df = pd.DataFrame(self.records(), columns=list(Track.fields))
+        if any(self._columns.spotify_ids[row] >= 0 for row in range(self._start, self._end())):
+            df.insert(0, "spotify_id", self.spotify_ids())
+        return df
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the string table (shared with views)."""
+        columns = self._columns
+        arrays = (columns.titles, columns.artist_offsets, columns.artist_names, columns.artist_forms,
+                  columns.durations, columns.playlist_titles, columns.playlist_ids, columns.spotify_ids)
+        return (sum(sys.getsizeof(column) for column in arrays) + sys.getsizeof(columns.strings)
+                + sys.getsizeof(columns.string_index) + sum(sys.getsizeof(string) for string in columns.strings))
+
+    def __repr__(self):
+        return f"TrackStore({len(self)} tracks)"
+
+    # ---------------------- Helpers ----------------------
+    def _end(self) -> int:
+        return len(self._columns.titles) if self._stop is None else self._stop
+
+    def _row(self, position: int) -> int:
+        length = len(self)
+        if position < 0:
+            position += length
+        if not 0 <= position < length:
+            raise IndexError("TrackStore index out of range")
+        return self._start + position
+
+    def _artists_text(self, row: int) -> Optional[str]:
+        form = self._columns.artist_forms[row]
+        if form == self.NO_ARTISTS:
+            return None
+        names = self.artists(row - self._start)
+        return str(names) if form == self.ARTIST_LIST else ", ".join(names)
+
+    def _duration_text(self, row: int) -> Optional[str]:
+        seconds = self._columns.durations[row]
+        if seconds < 0:
+            return None
+        hours, rest = divmod(seconds, 3600)
+        return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+    @classmethod
+    def _artist_names(cls, artists) -> Tuple[int, List[str]]:
+        if artists is None or (isinstance(artists, float) and artists != artists):
+            return cls.NO_ARTISTS, []
+        if isinstance(artists, str):
+            if artists.startswith("[") and artists.endswith("]"):
+                try:
+                    names = ast.literal_eval(artists)
+                    if isinstance(names, list) and all(isinstance(name, str) for name in names) \
+                            and str(names) == artists:
+                        return cls.ARTIST_LIST, names
+                except (ValueError, SyntaxError):
+                    pass
+            return cls.ARTIST_TEXT, artists.split(", ")
+        return cls.ARTIST_LIST, [str(name) for name in artists]
+
+    @staticmethod
+    def parse_duration(duration) -> int:
+        """Seconds from seconds or an "m:ss" / "h:mm:ss" string; -1 if unknown."""
+        if duration is None or isinstance(duration, bool):
+            return -1
+        if isinstance(duration, (int, float)):
+            return int(duration) if duration == duration and duration >= 0 else -1
+        seconds = 0
+        try:
+            for part in str(duration).split(":"):
+                seconds = seconds * 60 + int(part)
+        except ValueError:
+            return -1
+        return seconds
+
+    @staticmethod
+    def _string(value) -> Optional[str]:
+        return value if isinstance(value, str) else None
@@ -0,0 +1,55 @@
+from typing import Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+
+
+class VariationStats:
+    """Observed hit rate per search variation kind, persisted as JSON between runs.
+
+    A variation kind "hits" when one of its queries surfaced the candidate that was finally chosen for a track.
+    Kinds that hit often are searched first, so the early exit in SpotifyTarget triggers as soon as possible.
+    """
+
+    default_path = ".movify_variation_stats.json"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._attempts: dict[str, int] = {}
+        self._hits: dict[str, int] = {}
+
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self._attempts = {kind: int(v) for kind, v in data.get("attempts", {}).items()}
+                self._hits = {kind: int(v) for kind, v in data.get("hits", {}).items()}
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable variation statistics in {path}: {e}")
+
+    def hit_rate(self, kind: str) -> float:
+        # Laplace smoothing, so unseen kinds start at 0.5 instead of being starved or favoured
+        return (self._hits.get(kind, 0) + 1) / (self._attempts.get(kind, 0) + 2)
+
+    def order(self, plan: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Sort (kind, query) pairs by descending hit rate, keeping the generated order for equal rates."""
+        with self._lock:
+            return sorted(plan, key=lambda item: -self.hit_rate(item[0]))
+
+    def record(self, attempted_kinds: Iterable[str], winning_kind: Optional[str]):
+        with self._lock:
+            for kind in attempted_kinds:
+                self._attempts[kind] = self._attempts.get(kind, 0) + 1
+            if winning_kind is not None:
+                self._hits[winning_kind] = self._hits.get(winning_kind, 0) + 1
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            data = {"attempts": self._attempts, "hits": self._hits}
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"  # Concurrent runs sharing the file must not share the temp file
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,23 +1,52 @@
-from typing import Union, List, Optional
+from typing import Callable, Union, List, Optional
 from functools import reduce
 import sys
+import threading
 from urllib.parse import urlparse, parse_qs
 import re
 
 import pandas as pd
 from ytmusicapi import YTMusic
 
+from .ResponseCache import ResponseCache
+from .Track import Track
+from .TrackStore import TrackStore
+
 
 class YoutubeMusicSource:
+    track_columns = ["playlist_title", "playlist_id", "title", "artists", "duration"]
+
+    def __init__(self, fetch_cache: ResponseCache = None):
+        # The client is created on first use, so runs served entirely from caches or a journal never connect
+        self._ytmusic = None
+        self._client_lock = threading.Lock()
+        # Every playlist and video is fetched once per run; concurrent requests for it share the same fetch
+        self.fetch_cache = fetch_cache if fetch_cache is not None else ResponseCache(namespace="ytmusic")
+
+    @property
+    def ytmusic(self) -> YTMusic:
+        if self._ytmusic is None:
+            with self._client_lock:
+                if self._ytmusic is None:
+                    try:
+                        # Initialize without authentication for public playlists
+                        self._ytmusic = YTMusic()
+                    except Exception as e:
+                        print("Cannot establish connection. Error: \n")
+                        print(e)
+                        sys.exit(1)
+        return self._ytmusic
 
-    def __init__(self):
-        try:
-            # Initialize without authentication for public playlists
-            self.ytmusic = YTMusic()
-        except Exception as e:
-            print("Cannot establish connection. Error: \n")
-            print(e)
-            sys.exit(1)
+    def get_playlist(self, playlist_id: str) -> dict:
+        return self.fetch_cache.get_or_fetch(("get_playlist", playlist_id),
+                                             lambda: self.ytmusic.get_playlist(playlist_id))
+
+    def get_watch_playlist(self, video_id: str) -> dict:
+        return self.fetch_cache.get_or_fetch(("get_watch_playlist", video_id),
+                                             lambda: self.ytmusic.get_watch_playlist(video_id))
+
+    def get_song(self, video_id: str) -> dict:
+        return self.fetch_cache.get_or_fetch(("get_song", video_id), lambda: self.ytmusic.get_song(video_id))
 
     def get_albums_library_df(self) -> pd.DataFrame:
         albums_response = self.ytmusic.get_library_albums(limit=10000)
@@ -36,7 +65,7 @@ class YoutubeMusicSource:
 
         dfs = []
         for playlist_obj in playlists_response:
-            df = pd.DataFrame(self.ytmusic.get_playlist(playlist_obj["playlistId"])["tracks"])
+            df = pd.DataFrame(self.get_playlist(playlist_obj["playlistId"])["tracks"])
             df.insert(0, "playlist_id", playlist_obj["playlistId"])
             df.insert(0, "playlist_title", playlist_obj["title"])
             dfs.append(df)
@@ -56,41 +85,52 @@ class YoutubeMusicSource:
     
     def get_playlist_from_url(self, url: str) -> pd.DataFrame:
         """Get playlist data from a YouTube Music URL"""
+        tracks = self.get_playlist_tracks(url)
+        if not tracks:
+            return pd.DataFrame()
+        df = self.tracks_to_df(tracks)
+        if all(track.artists is None for track in tracks):
+            df = df.drop(columns="artists")
+        return df
+
+    def get_playlist_tracks(self, url: str) -> List[Track]:
+        """Tracks of the playlist behind a YouTube Music URL"""
+        return list(self.get_playlist_store(url))
+
+    def get_playlist_store(self, url: str, playlist_title: str = None) -> TrackStore:
+        """Tracks of the playlist behind a YouTube Music URL as a compact TrackStore. playlist_title replaces the
+        title of the YouTube playlist."""
         # Extract playlist ID from URL
         if "list=" in url:
             playlist_id = url.split("list=")[1].split("&")[0]
         else:
             raise ValueError("Invalid playlist URL. Must contain 'list=' parameter")
-        
+
         # Get playlist data
-        playlist_data = self.ytmusic.get_playlist(playlist_id)
-        
-        # Convert to DataFrame
-        tracks = playlist_data.get("tracks", [])
-        if not tracks:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(tracks)
-        
-        # Add playlist info
-        df.insert(0, "playlist_title", playlist_data.get("title", "Unknown Playlist"))
-        df.insert(0, "playlist_id", playlist_id)
-        
-        # Parse artists
-        if "artists" in df.columns:
-            df["artists"] = self.parse_artists(df["artists"])
-        
-        # Select relevant columns
-        columns_to_keep = ["playlist_title", "playlist_id", "title", "artists", "duration"]
-        available_columns = [col for col in columns_to_keep if col in df.columns]
-        
-        return df[available_columns]
+        playlist_data = self.get_playlist(playlist_id)
+        return TrackStore.from_ytmusic(playlist_data.get("tracks", []),
+                                       playlist_title or playlist_data.get("title", "Unknown Playlist"), playlist_id)
+
+    @classmethod
+    def tracks_to_df(cls, tracks: List[Track], columns: List[str] = None) -> pd.DataFrame:
+        columns = columns or cls.track_columns
+        return pd.DataFrame([[getattr(track, column) for column in columns] for track in tracks], columns=columns)
 
     # ---------------------- NEW: Single-track helpers ----------------------
-    def get_track_from_url(self, url: str, playlist_title: str = "Unknown Playlist") -> pd.DataFrame:
+    def get_track_from_url(self, url: str, playlist_title: str = "Unknown Playlist",
+                           report: Callable[[str], None] = print) -> pd.DataFrame:
         """Return a single-track DataFrame with columns: playlist_title, title, artists, duration.
         Works with youtube.com/watch, music.youtube.com/watch, youtu.be links, and playlist index links.
+        Problems are passed to report (print by default) line by line.
         """
+        track = self.get_track(url, playlist_title, report)
+        if track is None:
+            return pd.DataFrame()
+        return self.tracks_to_df([track], ["playlist_title", "title", "artists", "duration"])
+
+    def get_track(self, url: str, playlist_title: str = "Unknown Playlist",
+                  report: Callable[[str], None] = print) -> Optional[Track]:
+        """The track behind a video or playlist index link, or None (after reporting why) if it cannot be found."""
         try:
             # Handle playlist index links (e.g., ...&index=6)
             if "list=" in url and "index=" in url:
@@ -100,40 +140,32 @@ class YoutubeMusicSource:
                 if index_match:
                     index = int(index_match.group(1)) - 1  # Convert to 0-based index
                     try:
-                        playlist_data = self.ytmusic.get_playlist(playlist_id)
+                        playlist_data = self.get_playlist(playlist_id)
                         tracks = playlist_data.get("tracks", [])
                         if tracks and 0 <= index < len(tracks):
                             track = tracks[index]
                             title = track.get("title", "Unknown Title")
                             artists_json = track.get("artists", [])
-                            artists = self.parse_artists([artists_json]) if artists_json else "Unknown Artist"
-                            duration = track.get("duration")
-                            
-                            df = pd.DataFrame([{
-                                "playlist_title": playlist_title,
-                                "title": title,
-                                "artists": artists[0] if isinstance(artists, list) else artists,
-                                "duration": duration
-                            }])
-                            return df
+                            artists = Track.artists_string(artists_json) if artists_json else "Unknown Artist"
+                            return Track(title, artists, track.get("duration"), playlist_title)
                     except Exception as e:
-                        print(f"   - Failed to get playlist index {index} from {playlist_id}: {e}")
+                        report(f"   - Failed to get playlist index {index} from {playlist_id}: {e}")
                         # Fall back to treating this as a regular video URL
-                        print(f"   - Falling back to video extraction...")
+                        report(f"   - Falling back to video extraction...")
                         pass
 
             # Handle regular video URLs (including failed playlist index URLs)
             video_id = self._extract_video_id_from_url(url)
             if not video_id:
-                print(f"   - Could not extract video ID from URL: {url}")
-                return pd.DataFrame()
+                report(f"   - Could not extract video ID from URL: {url}")
+                return None
 
             # Try multiple methods to get track info
             track_info = None
             
             # Method 1: Try get_watch_playlist (most reliable)
             try:
-                watch_pl = self.ytmusic.get_watch_playlist(video_id)
+                watch_pl = self.get_watch_playlist(video_id)
                 tracks = watch_pl.get("tracks", [])
                 if tracks:
                     track = tracks[0]
@@ -149,7 +181,7 @@ class YoutubeMusicSource:
             # Method 2: Try get_song if first method failed
             if not track_info:
                 try:
-                    song = self.ytmusic.get_song(video_id)
+                    song = self.get_song(video_id)
                     video_details = song.get("videoDetails", {}) if isinstance(song, dict) else {}
                     title = video_details.get("title")
                     artists = video_details.get("author")  # Channel name as best-effort
@@ -167,24 +199,17 @@ class YoutubeMusicSource:
                                 pass
                         track_info = {"title": title, "artists": artists, "duration": duration}
                 except Exception as e:
-                    print(f"   - Failed to get song info for {video_id}: {e}")
+                    report(f"   - Failed to get song info for {video_id}: {e}")
 
-            # Return DataFrame if we got track info
             if track_info:
-                df = pd.DataFrame([{
-                    "playlist_title": playlist_title,
-                    "title": track_info["title"],
-                    "artists": track_info["artists"],
-                    "duration": track_info["duration"]
-                }])
-                return df
-            
-            print(f"   - Could not extract track info from {url}")
-            return pd.DataFrame()
-            
+                return Track(track_info["title"], track_info["artists"], track_info["duration"], playlist_title)
+
+            report(f"   - Could not extract track info from {url}")
+            return None
+
         except Exception as e:
-            print(f"   - Error processing {url}: {e}")
-            return pd.DataFrame()
+            report(f"   - Error processing {url}: {e}")
+            return None
 
     @staticmethod
     def _extract_video_id_from_url(url: str) -> Optional[str]:
@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from benchmarks import fixtures
+from benchmarks.fake_spotify import FakeSpotifyServer
+from movify.RequestScheduler import RequestScheduler, ScheduledSpotify
+
+
+class StubAuth:
+    """Stands in for the spotipy auth managers: the fake server accepts any token."""
+
+    def get_access_token(self, as_dict=False, **kwargs):
+        return "test-token"
+
+
+def fake_client(prefix: str, scheduler: RequestScheduler = None) -> ScheduledSpotify:
+    """spotipy client of the fake server; it has no rate limit, so neither has the scheduler."""
+    client = ScheduledSpotify(scheduler or RequestScheduler(rate=10_000), auth_manager=StubAuth())
+    client.prefix = prefix
+    return client
+
+
+@pytest.fixture(scope="session")
+def catalog():
+    return fixtures.make_catalog(500, seed=3)
+
+
+def api_prefix(server: FakeSpotifyServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+@pytest.fixture
+def fake_server(catalog, request):
+    """A running fake Spotify API over the catalog. Parametrize it indirectly with a throttle profile
+    (e.g. "steady:3") to have it answer 429s."""
+    server = FakeSpotifyServer(catalog, throttle=getattr(request, "param", None))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fake_spotify(fake_server):
+    """API prefix of the fake Spotify API."""
+    return api_prefix(fake_server)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from benchmarks import fixtures
+from movify.AsyncSpotifyTarget import AsyncSpotifyTarget
+from movify.MatchCache import MatchCache
+from movify.RequestScheduler import RequestScheduler
+from movify.RunJournal import RunJournal
+from movify.SpotifyTarget import SpotifyTarget
+from movify.TrackStore import TrackStore
+
+from conftest import StubAuth, api_prefix, fake_client
+
+
+def source_tracks(catalog) -> TrackStore:
+    playlists, _ = fixtures.make_playlists(catalog, 120, playlist_size=40, seed=5, duplicates=0.2)
+    store = TrackStore()
+    for playlist in playlists.values():
+        store.extend(TrackStore.from_ytmusic(playlist["tracks"], playlist["title"], playlist["id"]))
+    return store
+
+
+def matched_ids(song_ids) -> list:
+    return [song_id if isinstance(song_id, str) else None for song_id in song_ids]
+
+
+def test_async_lookup_matches_threaded_lookup(fake_spotify, catalog):
+    store = source_tracks(catalog)
+
+    threaded = SpotifyTarget("test", "test", match_workers=4, scheduler=RequestScheduler(rate=10_000))
+    threaded._sp = fake_client(fake_spotify, threaded.scheduler)
+    expected = matched_ids(threaded.get_spotify_song_ids(store))
+
+    target = AsyncSpotifyTarget("test", "test", max_concurrency=16, prefix=fake_spotify, auth_manager=StubAuth(),
+                                scheduler=RequestScheduler(rate=10_000, max_concurrency=16))
+
+    async def lookup():
+        try:
+            return await target.get_spotify_song_ids_async(store)
+        finally:
+            await target.close()
+
+    assert matched_ids(asyncio.run(lookup())) == expected
+    assert sum(song_id is not None for song_id in expected) > len(store) // 2
+
+
+def test_cache_and_journal_io_stays_off_the_event_loop(fake_spotify, catalog, tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    target = AsyncSpotifyTarget("test", "test", prefix=fake_spotify, auth_manager=StubAuth(), journal=journal,
+                                match_cache=MatchCache(str(tmp_path / "matches.sqlite")),
+                                scheduler=RequestScheduler(rate=10_000))
+    io_threads = set()
+
+    def in_thread(func):
+        def recorded(*args, **kwargs):
+            io_threads.add(threading.get_ident())
+            return func(*args, **kwargs)
+        return recorded
+
+    for name in ("_cached_match", "_remember_match"):
+        setattr(target, name, in_thread(getattr(target, name)))
+    for name in ("record_playlist", "pending_ids", "record_batch"):
+        setattr(journal, name, in_thread(getattr(journal, name)))
+
+    store = TrackStore()
+    for track in catalog[:10]:
+        store.append(track["title"], track["artists"], 200, "Mix")
+
+    async def migrate():
+        try:
+            store.set_spotify_ids(await target.get_spotify_song_ids_async(store))
+            await target.add_playlists_to_library_async(store, None, None, None, None, auth_manager=StubAuth())
+            return threading.get_ident()
+        finally:
+            await target.close()
+
+    loop_thread = asyncio.run(migrate())
+    journal.close()
+    target.match_cache.close()
+
+    assert io_threads and loop_thread not in io_threads
+
+
+def test_async_album_saves_are_journaled(fake_server, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    album_ids = [f"album{number:017d}" for number in range(70)]
+
+    def save(spotify_ids, resume: bool):
+        journal = RunJournal(path, resume=resume)
+        target = AsyncSpotifyTarget("test", "test", prefix=api_prefix(fake_server), auth_manager=StubAuth(),
+                                    journal=journal, scheduler=RequestScheduler(rate=10_000))
+
+        async def run():
+            try:
+                await target.add_albums_to_library_async(spotify_ids, None, None, None, auth_manager=StubAuth())
+            finally:
+                await target.close()
+
+        asyncio.run(run())
+        journal.close()
+
+    save(album_ids[:60], resume=False)
+    save(album_ids, resume=True)  # Only the albums the first run did not save
+
+    assert sorted(fake_server.saved_albums) == album_ids
@@ -0,0 +1,66 @@
+import random
+
+import pandas as pd
+import pytest
+
+from benchmarks import fixtures
+from benchmarks.fake_spotify import FakeCatalogSearch
+from movify.BatchScorer import BatchScorer
+from movify.SpotifyTarget import SpotifyTarget
+
+
+def search_cases(catalog, size: int = 150, seed: int = 11):
+    """(song, candidate frame) pairs: messy uploads and what the fake search returns for them."""
+    search = FakeCatalogSearch(catalog)
+    rng = random.Random(seed)
+    cases = []
+    for track in rng.sample(catalog, size):
+        title, artists = fixtures.messy_upload(track, rng)
+        song = pd.Series({"title": title, "artists": str(artists)})
+        items = search.search(f"{title} {' '.join(artists)}", 20)["tracks"]["items"]
+        if not items:
+            items = search.search(title, 20)["tracks"]["items"]
+        candidates = pd.DataFrame([{"title": item["name"], "artists": str([a["name"] for a in item["artists"]]),
+                                    "id": item["id"]} for item in items])
+        if not candidates.empty:
+            cases.append((song, candidates))
+    return cases
+
+
+def reference_scores(song, candidates) -> list:
+    return [SpotifyTarget.similarity_score_df(song, row) for _, row in candidates.iterrows()]
+
+
+def test_scores_equal_similarity_score_df(catalog):
+    for song, candidates in search_cases(catalog):
+        features = BatchScorer.features(candidates["title"].tolist(), candidates["artists"].tolist())
+        assert BatchScorer(song).score(features).tolist() == reference_scores(song, candidates), song["title"]
+
+
+def test_best_candidate_is_the_first_highest_similarity_score_df(catalog):
+    target = SpotifyTarget("test", "test")
+    for song, candidates in search_cases(catalog):
+        scores = reference_scores(song, candidates)
+        best, best_score = target.select_best_candidate(song, candidates)
+        assert best_score == max(scores)
+        assert best["id"] == candidates["id"].iloc[scores.index(max(scores))]
+
+        # With a floor only a candidate scoring above it is returned
+        best, score = target.select_best_candidate(song, candidates, floor=max(scores))
+        assert best.empty and score == max(scores)
+
+
+@pytest.mark.parametrize("song", [
+    pd.Series({"title": "Song Title (Official Video)", "artists": "['Some Artist']"}),
+    pd.Series({"title": "Some Artist - Song Title [Lyrics] ft. Other", "artists": "['Lyrics Channel']"}),
+    pd.Series({"title": "Song Title (Remix)", "artists": "['user12345']"}),
+    pd.Series({"title": "Song Title"}),
+    pd.Series({"title": float("nan"), "artists": "['Some Artist']"}),
+])
+def test_edge_cases_match_similarity_score_df(song):
+    candidates = pd.DataFrame({
+        "title": ["Song Title", "Song Title - Remix", "Other Song", "song title (live)", "Song Title Mashup", ""],
+        "artists": ["['Some Artist']", "['Some Artist', 'DJ']", "['Some Artist']", "['Other']", "['X']", "['Y']"],
+    })
+    features = BatchScorer.features(candidates["title"].tolist(), candidates["artists"].tolist())
+    assert BatchScorer(song).score(features).tolist() == reference_scores(song, candidates)
@@ -0,0 +1,79 @@
+import pytest
+
+from movify.LinkParser import Link, LinkParser
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&si=abc",
+    "youtube.com/watch?feature=share&v=dQw4w9WgXcQ&t=42",
+    "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube.com/embed/dQw4w9WgXcQ",
+    "HTTPS://WWW.YOUTUBE.COM/WATCH?v=dQw4w9WgXcQ",
+    "https://www.youtube.com/Shorts/dQw4w9WgXcQ/",
+    # A video played from a playlist is the video, as the baseline migrated it
+    "https://music.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc123&index=4",
+])
+def test_video_links(url):
+    link = LinkParser.canonical(url)
+    assert link.key == (Link.VIDEO, "dQw4w9WgXcQ", None)
+    assert link.fetch_url == "https://music.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+@pytest.mark.parametrize("url", [
+    "https://music.youtube.com/playlist?list=PLabc123",
+    "https://www.youtube.com/playlist?list=PLabc123&si=xyz",
+    "www.youtube.com/PLAYLIST?list=PLabc123",
+    "https://www.youtube.com/watch?list=PLabc123",
+])
+def test_playlist_links(url):
+    link = LinkParser.canonical(url)
+    assert link.is_playlist
+    assert link.key == (Link.PLAYLIST, "PLabc123", None)
+    assert link.fetch_url == "https://music.youtube.com/playlist?list=PLabc123"
+
+
+def test_playlist_position_without_video():
+    link = LinkParser.canonical("https://www.youtube.com/watch?list=PLabc123&index=7")
+    assert link.key == (Link.INDEX, "PLabc123", 7)
+    assert link.fetch_url == "https://music.youtube.com/watch?list=PLabc123&index=7"
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/feed/library",
+    "https://www.youtube.com/watch?v=not%20an%20id",
+    "https://example.com/watch?v=dQw4w9WgXcQ",
+    "just some text",
+    None,
+])
+def test_unsupported_links(url):
+    link = LinkParser.canonical(url)
+    assert link.kind == Link.UNSUPPORTED
+    assert link.fetch_url is None
+
+
+def test_sections_drop_repeats_within_a_section_only():
+    parser = LinkParser()
+    text = """
+links before a header are ignored: https://youtu.be/aaaaaaaaaaa
+# First
+https://youtu.be/aaaaaaaaaaa
+https://www.youtube.com/watch?v=aaaaaaaaaaa&si=1
+not a link
+#
+
+# Second
+https://music.youtube.com/watch?v=aaaaaaaaaaa
+https://youtu.be/bbbbbbbbbbb
+"""
+    items = [(title, link.id) for title, link in parser.parse_text(text)]
+
+    assert items == [("First", "aaaaaaaaaaa"), ("Second", "aaaaaaaaaaa"), ("Second", "bbbbbbbbbbb")]
+    assert (parser.sections, parser.links, parser.duplicates, parser.repeats) == (2, 3, 1, 1)
+
+
+def test_parse_file_reports_a_missing_file_before_reading(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        LinkParser().parse_file(str(tmp_path / "missing.txt"))
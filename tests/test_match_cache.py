@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from movify.MatchCache import MatchCache
+
+
+def test_entries_are_kept_per_scorer(tmp_path):
+    cache = MatchCache(str(tmp_path / "matches.sqlite"))
+    cache.put("Song", "['Artist']", "rules-id", 30)
+    cache.put("Song", "['Artist']", "fuzzy-id", 32, scorer="fuzzy")
+
+    assert cache.get(" song ", "['ARTIST']")["id"] == "rules-id"
+    assert cache.get("Song", "['Artist']", "fuzzy")["id"] == "fuzzy-id"
+    assert cache.get("Other", "['Artist']", "fuzzy") is None
+    cache.close()
+
+
+def test_memory_hits_count_for_least_recently_used_eviction(tmp_path, monkeypatch):
+    monkeypatch.setattr(MatchCache, "evict_every", 3)
+    path = str(tmp_path / "matches.sqlite")
+    cache = MatchCache(path, max_entries=2)
+    cache.put("First", "['A']", "first", 30)
+    cache.put("Second", "['A']", "second", 30)
+    assert cache.get("First", "['A']")["id"] == "first"  # Served from memory
+
+    cache.put("Third", "['A']", "third", 30)  # Third write: the store is trimmed to 2 entries
+    cache.close()
+
+    keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM matches")}
+    assert keys == {MatchCache._scored_key("rules", title, "['A']") for title in ("First", "Third")}
+
+
+def test_close_closes_the_connection_when_trimming_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(MatchCache, "busy_timeout", 0.1)
+    path = str(tmp_path / "matches.sqlite")
+    cache = MatchCache(path)
+    cache.put("Song", "['Artist']", "song-id", 30)
+    cache.get("Song", "['Artist']")  # A memory hit, flushed on close
+
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN EXCLUSIVE")
+    cache.close()
+    other_process.execute("ROLLBACK")
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache._conn.execute("SELECT 1")
@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from spotipy import SpotifyException
+
+from movify.RequestScheduler import RateLimitError, RequestScheduler
+
+from conftest import api_prefix, fake_client
+
+
+class CallLog:
+    """Stands in for RunMetrics: records the status and end time of every attempt the scheduler makes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def record_api_call(self, url, status, seconds):
+        self.calls.append((status, time.monotonic()))
+
+    @property
+    def statuses(self) -> list:
+        return [status for status, _ in self.calls]
+
+
+def throttled() -> SpotifyException:
+    return SpotifyException(429, -1, "Too Many Requests", headers={"Retry-After": "0"})
+
+
+def test_token_bucket_caps_the_request_rate(fake_spotify):
+    scheduler = RequestScheduler(rate=20, burst=5)
+    client = fake_client(fake_spotify, scheduler)
+
+    started = time.monotonic()
+    for number in range(15):
+        client.search(f"song {number}", limit=1)
+    elapsed = time.monotonic() - started
+
+    # The burst goes out at once, the other 10 requests at 20 per second
+    assert scheduler.requests == 15
+    assert 0.45 <= elapsed < 2
+
+
+@pytest.mark.parametrize("fake_server", ["steady:3"], indirect=True)
+def test_a_429_pauses_for_retry_after_then_resumes(fake_server):
+    log = CallLog()
+    scheduler = RequestScheduler(rate=10_000, metrics=log)
+    client = fake_client(api_prefix(fake_server), scheduler)
+
+    results = [client.search(f"song {number}", limit=1) for number in range(6)]
+
+    assert all("tracks" in result for result in results)
+    assert log.statuses == [200, 200, 200, 429, 200, 200, 200]
+    (_, throttled_at), (_, resumed_at) = log.calls[3:5]
+    assert resumed_at - throttled_at >= 0.9  # Retry-After: 1
+    assert (scheduler.throttled, scheduler.retries, scheduler.throttle_wait) == (1, 1, 1.0)
+
+
+@pytest.mark.parametrize("fake_server", ["steady:4"], indirect=True)
+def test_one_throttling_episode_halves_the_concurrency_once(fake_server):
+    scheduler = RequestScheduler(rate=10_000, max_concurrency=16)
+    client = fake_client(api_prefix(fake_server), scheduler)
+
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda number: client.search(f"song {number}", limit=1), range(8)))
+
+    assert len(results) == 8
+    assert fake_server.throttled == scheduler.throttled >= 4  # Several 429s in flight, one pause
+    assert scheduler.throttle_wait == 1.0
+    assert 8 <= scheduler.concurrency < 9
+
+
+def test_concurrency_backs_off_to_the_minimum_and_recovers():
+    scheduler = RequestScheduler(rate=10_000, max_concurrency=16, min_concurrency=2, max_retries=0)
+
+    def fail():
+        raise throttled()
+
+    for _ in range(5):
+        with pytest.raises(RateLimitError):
+            scheduler.call(fail)
+    assert scheduler.concurrency == 2
+
+    # Additive increase: about one more request in flight per window of successful requests
+    for _ in range(20):
+        scheduler.call(lambda: None)
+    assert 6 < scheduler.concurrency < 8
+    for _ in range(200):
+        scheduler.call(lambda: None)
+    assert scheduler.concurrency == 16
+
+
+def test_other_errors_are_raised_without_retrying():
+    scheduler = RequestScheduler(rate=10_000)
+    attempts = []
+
+    def not_found():
+        attempts.append(1)
+        raise SpotifyException(404, -1, "Not found")
+
+    with pytest.raises(SpotifyException):
+        scheduler.call(not_found)
+    assert (len(attempts), scheduler.throttled, scheduler.concurrency) == (1, 0, 16)
+
+
+@pytest.mark.parametrize("fake_server", ["steady:0"], indirect=True)
+def test_rate_limit_error_after_max_retries(fake_server):
+    scheduler = RequestScheduler(rate=10_000, max_retries=1)
+    client = fake_client(api_prefix(fake_server), scheduler)
+
+    with pytest.raises(RateLimitError):
+        client.search("song", limit=1)
+    # One attempt and one retry, each a single request: neither spotipy nor urllib3 retried the 429 on its own
+    assert fake_server.throttled == scheduler.throttled == 2
+    assert sum(fake_server.stats()["requests"].values()) == 2
+
+
+def test_spotipy_and_urllib3_leave_429_to_the_scheduler(fake_spotify):
+    client = fake_client(fake_spotify)
+
+    assert 429 not in client.status_forcelist
+    for prefix in ("http://", "https://"):
+        retry = client._session.get_adapter(prefix).max_retries
+        assert not retry.respect_retry_after_header
+        assert 429 not in (retry.status_forcelist or ())
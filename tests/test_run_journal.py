@@ -0,0 +1,136 @@
+import json
+
+from movify.RunJournal import RunJournal
+from movify.SpotifyTarget import SpotifyTarget
+from movify.TrackStore import TrackStore
+
+from conftest import api_prefix, fake_client
+
+A, B, C = (letter * 22 for letter in "abc")  # Spotify track IDs
+
+
+def test_pending_ids_counts_duplicates(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record_batch("Mix", [A, A, B])
+    journal.close()
+
+    resumed = RunJournal(path, resume=True)
+    assert resumed.pending_ids("Mix", [A, A, A, B, C]) == [A, C]
+    assert resumed.pending_ids("Mix", [A, B]) == [A, B]  # Each replayed addition is matched only once
+    assert resumed.pending_ids("Other", [A, B]) == [A, B]
+    resumed.close()
+
+
+def test_batches_of_this_run_are_not_pending_filtered(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    journal.record_batch("Mix", [A, B])
+
+    assert journal.pending_ids("Mix", [A, B]) == [A, B]
+    journal.close()
+
+
+def test_resume_replays_the_interrupted_run(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record_ingested("Mix", "https://music.youtube.com/playlist?list=PL1", [{"title": "Song"}])
+    journal.record_match("Song", "['Artist']", A, 38)
+    journal.record_match("Missing", "['Nobody']", None, 0)
+    journal.record_playlist("Mix", "playlist1")
+    journal.record_batch("Mix", [A, B])
+    journal.close()
+
+    resumed = RunJournal(path, resume=True)
+    assert resumed.ingested("Mix", "https://music.youtube.com/playlist?list=PL1") == [{"title": "Song"}]
+    assert resumed.match(" song ", "['ARTIST']") == (A, 38)
+    assert resumed.match("Missing", "['Nobody']") == (None, 0)
+    assert resumed.playlists == {"Mix": "playlist1"}
+    assert resumed.pending_ids("Mix", [A, B, C]) == [C]
+    resumed.close()
+
+
+def test_resume_ignores_a_cut_off_last_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.record_batch("Mix", [A])
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"type": "batch", "title": "Mix", "ids": [B]})[:20])
+
+    resumed = RunJournal(str(path), resume=True)
+    assert resumed.pending_ids("Mix", [A, B]) == [B]
+    resumed.close()
+
+
+def test_without_resume_the_journal_starts_over(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record_batch("Mix", [A])
+    journal.close()
+
+    fresh = RunJournal(path)
+    assert fresh.pending_ids("Mix", [A]) == [A]
+    fresh.close()
+
+    # The previous run is kept next to the new journal, so it can still be resumed by hand
+    previous = RunJournal(path + ".bak", resume=True)
+    assert previous.pending_ids("Mix", [A]) == []
+    previous.close()
+
+
+def section(song_ids: list) -> TrackStore:
+    store = TrackStore()
+    for number, _ in enumerate(song_ids):
+        store.append(f"Song {number}", ["Artist"], 200, "Mix")
+    store.set_spotify_ids(song_ids)
+    return store
+
+
+def add(target: SpotifyTarget, song_ids: list):
+    target.add_playlists_to_library(section(song_ids), "test", "test", "http://127.0.0.1/callback", "bench_user")
+
+
+def test_resumed_run_adds_only_the_missing_batches(tmp_path, fake_spotify):
+    client = fake_client(fake_spotify)
+    playlist_id = client.user_playlist_create("bench_user", "Mix", public=False)["id"]
+    client.playlist_add_items(playlist_id, [A, A])
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.record_playlist("Mix", playlist_id)
+    journal.record_batch("Mix", [A, A])
+    journal.close()
+
+    resumed = RunJournal(path, resume=True)
+    target = SpotifyTarget("test", "test", journal=resumed)
+    target._user_client = lambda *args: client
+    add(target, [A, A, B])
+    add(target, [A, C])  # A later section of the same title
+    resumed.close()
+
+    assert SpotifyTarget._playlist_track_ids(client, playlist_id) == [A, A, B, A, C]
+
+
+def test_sections_of_one_title_keep_repeated_songs(tmp_path, fake_spotify):
+    client = fake_client(fake_spotify)
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    target = SpotifyTarget("test", "test", journal=journal)
+    target._user_client = lambda *args: client
+    add(target, [A, B])
+    add(target, [A, C])
+    journal.close()
+
+    assert SpotifyTarget._playlist_track_ids(client, target.created_playlists["Mix"]) == [A, B, A, C]
+
+
+def test_resumed_run_saves_only_the_missing_albums(tmp_path, fake_server):
+    client = fake_client(api_prefix(fake_server))
+    path = str(tmp_path / "journal.jsonl")
+
+    for resume, album_ids in ((False, [A, B]), (True, [A, B, C])):
+        journal = RunJournal(path, resume=resume)
+        target = SpotifyTarget("test", "test", journal=journal)
+        target._user_client = lambda *args: client
+        target.add_albums_to_library(album_ids, "test", "test", "http://127.0.0.1/callback")
+        journal.close()
+
+    assert fake_server.saved_albums == [A, B, C]
@@ -0,0 +1,33 @@
+import sqlite3
+
+from movify.Candidate import TrackCandidate
+from movify.MatchCache import MatchCache
+from movify.ResponseCache import ResponseCache
+from movify.SpotifyTarget import SpotifyTarget
+
+
+def test_a_locked_match_cache_does_not_stop_the_lookup(tmp_path, monkeypatch):
+    monkeypatch.setattr(MatchCache, "busy_timeout", 0.1)
+    path = str(tmp_path / "matches.sqlite")
+    target = SpotifyTarget("test", "test", match_cache=MatchCache(path))
+    song = {"title": "Song", "artists": "['Artist']"}
+
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN EXCLUSIVE")
+    target._remember_match(song, TrackCandidate("a" * 22, "Song", ("Artist",)), 38)  # Logged, not raised
+    assert target._cached_match(song) is None
+    other_process.execute("ROLLBACK")
+
+    target._remember_match(song, TrackCandidate("a" * 22, "Song", ("Artist",)), 38)
+    assert target._cached_match(song)[0]["id"] == "a" * 22
+
+
+def test_a_locked_response_cache_still_returns_the_response(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResponseCache, "busy_timeout", 0.1)
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path)
+
+    other_process = sqlite3.connect(path, isolation_level=None)
+    other_process.execute("BEGIN EXCLUSIVE")
+    assert cache.get_or_fetch(("query",), lambda: {"items": [1]}) == {"items": [1]}
+    other_process.execute("ROLLBACK")
@@ -0,0 +1,82 @@
+import itertools
+import random
+import threading
+import time
+
+import pytest
+
+from movify.StreamingPipeline import StreamingPipeline
+
+
+def sections(count: int = None):
+    """Sections [n, n, ...] of varying length; endless without a count."""
+    for number in itertools.count() if count is None else range(count):
+        yield [number] * (number % 3 + 1)
+
+
+def run_in_time(pipeline: StreamingPipeline, items, seconds: float = 5):
+    """pipeline.run(items) in a thread; fails the test if it hangs. Returns the error it raised, if any."""
+    outcome = {}
+
+    def run():
+        try:
+            pipeline.run(items)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "pipeline did not stop"
+    return outcome.get("error")
+
+
+def test_sections_are_written_in_order():
+    rng = random.Random(1)
+    written = []
+
+    def match(section):
+        time.sleep(rng.random() / 200)
+        return section
+
+    pipeline = StreamingPipeline(match, written.append, queue_size=1)
+    assert run_in_time(pipeline, sections(40)) is None
+
+    assert written == list(sections(40))
+    assert (pipeline.sections_written, pipeline.tracks_written) == (40, sum(map(len, sections(40))))
+
+
+@pytest.mark.parametrize("stage", ["match", "write"])
+def test_a_failing_stage_is_reraised_while_upstream_queues_are_full(stage):
+    written = []
+
+    def match(section):
+        if stage == "match" and section[0] == 5:
+            raise ValueError("lookup failed")
+        return section
+
+    def write(section):
+        if stage == "write" and section[0] == 5:
+            raise ValueError("write failed")
+        time.sleep(0.01)  # Slower than ingest and lookup: the queues in front of it are full
+        written.append(section)
+
+    error = run_in_time(StreamingPipeline(match, write, queue_size=1), sections())
+
+    assert isinstance(error, ValueError)
+    # Sections before the failing one are written in order until the stages stop, none after it
+    assert written == list(sections(len(written)))
+    assert len(written) == 5 if stage == "write" else len(written) <= 5
+
+
+def test_a_failing_ingest_is_reraised_after_the_stages_stop():
+    written = []
+
+    def ingest():
+        yield from sections(3)
+        raise OSError("fetch failed")
+
+    error = run_in_time(StreamingPipeline(lambda section: section, written.append), ingest())
+
+    assert isinstance(error, OSError)
+    assert all(section in list(sections(3)) for section in written)
@@ -0,0 +1,84 @@
+from collections import Counter
+
+import pytest
+
+from movify.SpotifyTarget import SpotifyTarget
+from movify.TrackStore import TrackStore
+
+from conftest import fake_client
+
+A, B, C, D, X = (letter * 22 for letter in "abcdx")  # Spotify track IDs
+CREDENTIALS = ("test", "test", "http://127.0.0.1/callback", "bench_user")
+
+
+@pytest.fixture
+def client(fake_spotify):
+    return fake_client(fake_spotify)
+
+
+@pytest.fixture
+def target(client):
+    target = SpotifyTarget("test", "test")
+    target._user_client = lambda *args: client
+    return target
+
+
+def existing_playlist(client, title: str, song_ids: list) -> str:
+    playlist_id = client.user_playlist_create(client.current_user()["id"], title, public=False)["id"]
+    client.playlist_add_items(playlist_id, song_ids)
+    return playlist_id
+
+
+def section(title: str, song_ids: list) -> TrackStore:
+    store = TrackStore()
+    for number, _ in enumerate(song_ids):
+        store.append(f"Song {number}", ["Artist"], 200, title)
+    store.set_spotify_ids(song_ids)
+    return store
+
+
+def playlist_songs(client, playlist_id: str) -> Counter:
+    return Counter(SpotifyTarget._playlist_track_ids(client, playlist_id))
+
+
+def test_sync_adds_only_missing_occurrences(client, target):
+    playlist_id = existing_playlist(client, "Mix", [A, A, B])
+
+    target.add_playlists_to_library(section("Mix", [A, A, A, C]), *CREDENTIALS, sync=True)
+
+    assert target.created_playlists["Mix"] == playlist_id
+    assert playlist_songs(client, playlist_id) == Counter({A: 3, B: 1, C: 1})
+
+
+def test_resync_of_unchanged_playlist_writes_nothing(client, target, monkeypatch):
+    playlist_id = existing_playlist(client, "Mix", [A, B, B])
+    writes = []
+    monkeypatch.setattr(client, "playlist_add_items", lambda *args: writes.append(args))
+    monkeypatch.setattr(client, "playlist_remove_all_occurrences_of_items", lambda *args: writes.append(args))
+
+    target.add_playlists_to_library(section("Mix", [A, B, B]), *CREDENTIALS, sync=True, remove_stale=True)
+
+    assert writes == []
+    assert playlist_songs(client, playlist_id) == Counter({A: 1, B: 2})
+
+
+def test_remove_stale_removes_only_songs_no_longer_migrated(client, target):
+    playlist_id = existing_playlist(client, "Mix", [A, X, B, X])
+
+    target.add_playlists_to_library(section("Mix", [A, B, D]), *CREDENTIALS, sync=True, remove_stale=True)
+
+    assert playlist_songs(client, playlist_id) == Counter({A: 1, B: 1, D: 1})
+
+
+def test_remove_stale_keeps_songs_of_every_streamed_section(client, target):
+    playlist_id = existing_playlist(client, "Mix", [A, B, C, X])
+
+    # One title spread over non-consecutive sections, synced one section at a time as with --stream
+    target.add_playlists_to_library(section("Mix", [A, B]), *CREDENTIALS, sync=True)
+    target.add_playlists_to_library(section("Other", [D]), *CREDENTIALS, sync=True)
+    target.add_playlists_to_library(section("Mix", [C, D]), *CREDENTIALS, sync=True)
+    assert playlist_songs(client, playlist_id) == Counter({A: 1, B: 1, C: 1, D: 1, X: 1})
+
+    target.remove_stale_songs(*CREDENTIALS)
+
+    assert playlist_songs(client, playlist_id) == Counter({A: 1, B: 1, C: 1, D: 1})